@@ -1,12 +1,25 @@
-import requests
+import hashlib
 import logging
+import time
 import traceback
 
-from fastapi import APIRouter, status
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from fastapi import APIRouter, Depends, status
 from starlette.responses import JSONResponse
 
-from ergo.token_data_provider import TokenDataBuilder
-from ergo.schemas import AddressList, TokenStats, AddressTokenList
+from ergo.token_data_provider import CandleStore, TokenDataBuilder, TOKEN_STATS_WORKERS
+from ergo.schemas import (
+    AddressList,
+    TokenStats,
+    AddressTokenList,
+    TokenHistory,
+    TokenIdList,
+    TokenStatsBatch,
+)
+from db.crud.candles import get_candles
+from ergo import indexed_node_client
+from db.session import get_db
 from config import Config, Network
 from cache.cache import cache
 
@@ -99,14 +112,11 @@ def token_check(req: AddressTokenList):
         if cached:
             return cached
         result = {}
+        balances = indexed_node_client.get_balances(req.addresses)
         for addr in req.addresses:
-            ret = requests.post(
-                f"{CFG.node}/blockchain/balance",
-                data=addr,
-            )
-            if ret.ok:
+            if addr in balances:
                 balance = []
-                tokens = ret.json()["confirmed"]["tokens"]
+                tokens = balances[addr]["confirmed"]["tokens"]
                 for token in tokens:
                     if token["tokenId"] in req.tokens:
                         balance.append({token["tokenId"]: token["amount"]/(10**token["decimals"])})
@@ -120,13 +130,68 @@ def token_check(req: AddressTokenList):
         )
 
 
+@r.post("/token_stats", response_model=TokenStatsBatch, name="assets:get-token-stats-batch")
+def get_token_stats_batch(req: TokenIdList):
+    """
+    Token stats for several tokens, failures are reported per token in errors
+    """
+    try:
+        token_ids = list(dict.fromkeys(req.token_ids))
+        cached = cache.get_fresh_many([f"token_stats_cache_{x}" for x in token_ids])
+        stats = {x: value for x, value in zip(token_ids, cached) if value is not None}
+        errors = {}
+        missing = [x for x in token_ids if x not in stats]
+        if len(missing) > 0:
+            with ThreadPoolExecutor(
+                max_workers=min(TOKEN_STATS_WORKERS, len(missing))
+            ) as executor:
+                futures = {
+                    token_id: executor.submit(
+                        cache.get_or_compute,
+                        f"token_stats_cache_{token_id}",
+                        partial(build_token_stats, token_id),
+                    )
+                    for token_id in missing
+                }
+            for token_id, future in futures.items():
+                try:
+                    stats[token_id] = future.result()
+                except Exception as e:
+                    logging.error(traceback.format_exc())
+                    errors[token_id] = str(e)
+        return {"stats": stats, "errors": errors}
+    except Exception as e:
+        logging.error(traceback.format_exc())
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST, content=f"{str(e)}"
+        )
+
+
+def build_token_stats(token_id: str):
+    return TokenDataBuilder.build_stats_for_token_id(token_id).dict()
+
+
 @r.get("/token_stats/{token_id}", response_model=TokenStats, name="assets:get-token-stats")
-def get_token_stats(token_id: str):
+def get_token_stats(
+    token_id: str, start_time: int = None, end_time: int = None, db=Depends(get_db)
+):
+    """
+    start_time and end_time (unix seconds) add a custom_range summary
+    """
     try:
-        resp = cache.get(f"token_stats_cache_{token_id}")
-        if not resp:
-            resp = TokenDataBuilder.build_stats_for_token_id(token_id).dict()
-            cache.set(f"token_stats_cache_{token_id}", resp)
+        resp = cache.get_or_compute(
+            f"token_stats_cache_{token_id}",
+            lambda: TokenDataBuilder.build_stats_for_token_id(token_id, db=db).dict(),
+        )
+        if start_time is not None:
+            if end_time is None:
+                end_time = int(time.time())
+            resp = {
+                **resp,
+                "custom_range": TokenDataBuilder.summarize_range(
+                    db, token_id, start_time, end_time
+                ).dict(),
+            }
         return resp
     except Exception as e:
         logging.error(traceback.format_exc())
@@ -135,6 +200,39 @@ def get_token_stats(token_id: str):
         )
 
 
+@r.get(
+    "/token_history/{token_id}",
+    response_model=TokenHistory,
+    name="assets:get-token-history",
+)
+def get_token_history(
+    token_id: str,
+    resolution: str = "1D",
+    start_time: int = None,
+    end_time: int = None,
+    db=Depends(get_db),
+):
+    """
+    Stored OHLCV candles, resolution is one of 60, 1D or 1M
+    """
+    try:
+        if resolution not in CandleStore.BACKFILL:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content=f"invalid resolution {resolution}",
+            )
+        return TokenHistory(
+            token_id=token_id,
+            resolution=resolution,
+            candles=get_candles(db, token_id, resolution, start_time, end_time),
+        )
+    except Exception as e:
+        logging.error(traceback.format_exc())
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST, content=f"{str(e)}"
+        )
+
+
 def get_token_name_from_id(token_id):
     for token in TOKEN_CONFIG:
         if TOKEN_CONFIG[token]["token_id"] == token_id:
@@ -143,5 +241,6 @@ def get_token_name_from_id(token_id):
 
 
 def hash_string_list(address_list):
-    sorted_al = tuple(sorted(address_list))
-    return str(hash(sorted_al))
+    # stable across processes, unlike hash()
+    sorted_al = "\n".join(sorted(set(address_list)))
+    return hashlib.sha256(sorted_al.encode()).hexdigest()
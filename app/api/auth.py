@@ -295,13 +295,13 @@ async def change_primary_address(
 
 @r.websocket("/ws/{request_id}")
 async def websocket_endpoint(websocket: WebSocket, request_id: str):
-    await connection_manager.connect("ergoauth_" + request_id, websocket)
+    connection = await connection_manager.connect("ergoauth_" + request_id, websocket)
     try:
         while True:
             # pause loop
             await websocket.receive_text()
     except WebSocketDisconnect:
-        connection_manager.disconnect("ergoauth_" + request_id)
+        connection_manager.disconnect(connection)
 
 
 # [DEPRECATED]
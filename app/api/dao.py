@@ -3,11 +3,14 @@ import traceback
 import logging
 import typing as t
 import uuid
-import urllib
+
+from concurrent.futures import ThreadPoolExecutor
 
 from db.schemas import RestrictedAlphabetStr
 from cache.cache import cache
 from fastapi import APIRouter, Depends, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
 from starlette.responses import JSONResponse
 from paideia_state_client import util
 from db.schemas.util import SigningRequest, TokenAmount, Transaction, TransactionHistory
@@ -23,13 +26,9 @@ from db.crud.dao import (
     add_to_highlighted_projects,
     remove_from_highlighted_projects,
 )
-from db.crud.users import create_user_dao_profile
 from db.session import get_db
 from db.schemas.dao import (
     CreateOrUpdateDao,
-    CreateOrUpdateDaoDesign,
-    CreateOrUpdateGovernance,
-    CreateOrUpdateTokenomics,
     Dao,
     DaoConfigEntry,
     DaoTreasury,
@@ -37,7 +36,8 @@ from db.schemas.dao import (
     CreateOnChainDao,
 )
 from paideia_state_client import dao
-from ergo import indexed_node_client
+from ergo import indexed_node_client, token_registry
+from sync.sync_daos import sync_daos
 from util.util import is_uuid
 
 from config import Config, Network
@@ -45,6 +45,8 @@ from config import Config, Network
 
 dao_router = r = APIRouter()
 
+LABEL_FETCH_WORKERS = 16
+
 
 @r.get(
     "/",
@@ -59,111 +61,29 @@ def dao_list(
     Get all dao
     """
     try:
-        db_daos = get_all_daos(db)
-        state_daos = dao.get_all_daos()
-        for d in state_daos:
-            daoExistsInDB = False
-            for dbd in db_daos:
-                if dbd.dao_key == d:
-                    daoExistsInDB = True
-                    if not dbd.config_box_id or dbd.config_box_id != state_daos[d][2]:
-                        dao_config = dao.get_dao_config(d)
-                        try:
-                            edit_dao(
-                                db,
-                                dbd.id,
-                                CreateOrUpdateDao(
-                                    dao_name=state_daos[d][0],
-                                    dao_short_description=dao_config["im.paideia.dao.desc"][
-                                        "value"
-                                    ]
-                                    if "im.paideia.dao.desc" in dao_config
-                                    else "",
-                                    dao_url=urllib.parse.quote(dao_config["im.paideia.dao.url"][
-                                        "value"
-                                    ])
-                                    if "im.paideia.dao.url" in dao_config and not any(c not in "QWERTYUIOPASDFGHJKLZXCVBNMqwertyuiopasdfghjklzxcvbnm1234567890-.%+" for c in urllib.parse.quote(dao_config["im.paideia.dao.url"]["value"]))
-                                    else dbd.dao_url,
-                                    dao_key=d,
-                                    governance=CreateOrUpdateGovernance(
-                                        quorum=int(
-                                            dao_config["im.paideia.dao.quorum"]["value"]
-                                        ),
-                                        vote_duration__sec=int(
-                                            dao_config["im.paideia.dao.min.proposal.time"][
-                                                "value"
-                                            ]
-                                        )
-                                        / 1000,
-                                        support_needed=int(
-                                            dao_config["im.paideia.dao.threshold"]["value"]
-                                        ),
-                                    ),
-                                    tokenomics=CreateOrUpdateTokenomics(
-                                        token_id=dao_config["im.paideia.dao.tokenid"][
-                                            "value"
-                                        ]
-                                    ),
-                                    config_height=state_daos[d][1],
-                                    config_box_id=state_daos[d][2],
-                                    design=CreateOrUpdateDaoDesign(
-                                        logo_url=dao_config["im.paideia.dao.logo"]["value"] if "im.paideia.dao.logo" in dao_config else None,
-                                        show_banner=dao_config["im.paideia.dao.banner.enabled"]["value"] if "im.paideia.dao.banner.enabled" in dao_config else False,
-                                        banner_url=dao_config["im.paideia.dao.banner"]["value"] if "im.paideia.dao.banner" in dao_config else None,
-                                        show_footer=dao_config["im.paideia.dao.footer.enabled"]["value"] if "im.paideia.dao.footer.enabled" in dao_config else False,
-                                        footer_text=dao_config["im.paideia.dao.footer"]["value"] if "im.paideia.dao.footer" in dao_config else None
-                                    ),
-                                    is_draft=False,
-                                    is_published=True,
-                                ),
-                            )
-                        except Exception as e:
-                            logging.error(e)
-
-            if not daoExistsInDB:
-                dao_config = dao.get_dao_config(d)
-                new_dao = create_dao(
-                    db,
-                    CreateOrUpdateDao(
-                        dao_key=d,
-                        config_height=state_daos[d][1],
-                        dao_name=state_daos[d][0],
-                        dao_short_description=dao_config["im.paideia.dao.desc"][
-                            "value"
-                        ]
-                        if "im.paideia.dao.desc" in dao_config
-                        else "",
-                        dao_url=urllib.parse.quote(dao_config["im.paideia.dao.url"][
-                                    "value"
-                                ])
-                                if "im.paideia.dao.url" in dao_config and not any(c not in "QWERTYUIOPASDFGHJKLZXCVBNMqwertyuiopasdfghjklzxcvbnm1234567890-.%+" for c in urllib.parse.quote(dao_config["im.paideia.dao.url"]["value"]))
-                                else state_daos[d][0],
-                        governance=CreateOrUpdateGovernance(
-                            quorum=int(dao_config["im.paideia.dao.quorum"]["value"]),
-                            vote_duration__sec=int(
-                                dao_config["im.paideia.dao.min.proposal.time"]["value"]
-                            )
-                            / 1000,
-                            support_needed=int(
-                                dao_config["im.paideia.dao.threshold"]["value"]
-                            ),
-                        ),
-                        tokenomics=CreateOrUpdateTokenomics(
-                            token_id=dao_config["im.paideia.dao.tokenid"]["value"]
-                        ),
-                        design=CreateOrUpdateDaoDesign(
-                            logo_url=dao_config["im.paideia.dao.logo"]["value"] if "im.paideia.dao.logo" in dao_config else None,
-                            show_banner=dao_config["im.paideia.dao.banner.enabled"]["value"] if "im.paideia.dao.banner.enabled" in dao_config else False,
-                            banner_url=dao_config["im.paideia.dao.banner"]["value"] if "im.paideia.dao.banner" in dao_config else None,
-                            show_footer=dao_config["im.paideia.dao.footer.enabled"]["value"] if "im.paideia.dao.footer.enabled" in dao_config else False,
-                            footer_text=dao_config["im.paideia.dao.footer"]["value"] if "im.paideia.dao.footer" in dao_config else None
-                        ),
-                        is_draft=False,
-                        is_published=True,
-                    ),
-                )
-                create_user_dao_profile(db, Config[Network].admin_id, new_dao.id)
-        return get_all_daos(db)
+        cached = cache.get("get_all_daos")
+        if cached:
+            return cached
+        res = jsonable_encoder(list(map(VwDao.from_orm, get_all_daos(db))))
+        cache.set("get_all_daos", res, 60)
+        return res
+    except Exception as e:
+        logging.error(traceback.format_exc())
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST, content=f"{str(e)}"
+        )
+
+
+@r.post("/sync", name="dao:sync")
+def dao_sync(
+    db=Depends(get_db),
+    current_user=Depends(get_current_active_superuser),
+):
+    """
+    Sync on chain dao configs now instead of waiting for the background job
+    """
+    try:
+        return {"status": "success", "synced": sync_daos(db)}
     except Exception as e:
         logging.error(traceback.format_exc())
         return JSONResponse(
@@ -210,6 +130,113 @@ def get_treasury(dao_id: uuid.UUID, db=Depends(get_db)):
         )
 
 
+def label_treasury_transactions(
+    db: Session, treasury_address: str, transactions: t.List[dict]
+) -> t.List[Transaction]:
+    labeled = {}
+    for transaction in transactions:
+        cached = cache.get("labeled_transaction_" + str(transaction["id"]))
+        if cached:
+            labeled[transaction["id"]] = Transaction(**cached)
+    unlabeled = [x for x in transactions if x["id"] not in labeled]
+    if len(unlabeled) == 0:
+        return [labeled[x["id"]] for x in transactions]
+
+    # round 1: every input box on the page, confirmed ones come from the store
+    boxes = indexed_node_client.get_boxes_by_ids(
+        [input["boxId"] for x in unlabeled for input in x["inputs"]], db
+    )
+    amounts_by_transaction = {
+        x["id"]: treasury_amounts(treasury_address, x, boxes) for x in unlabeled
+    }
+
+    # round 2: contract signatures and token info are independent
+    addresses = list(
+        dict.fromkeys(
+            boxes[input["boxId"]]["address"]
+            for x in unlabeled
+            for input in x["inputs"]
+            if boxes[input["boxId"]]["address"] != treasury_address
+        )
+    )
+    token_ids = list(
+        dict.fromkeys(
+            key
+            for amounts in amounts_by_transaction.values()
+            for key in amounts
+            if key != "Erg" and amounts[key] != 0
+        )
+    )
+    with ThreadPoolExecutor(max_workers=LABEL_FETCH_WORKERS) as executor:
+        token_infos = executor.submit(token_registry.resolve_many, token_ids, db)
+        contract_sigs = executor.map(util.get_contract_sig, addresses)
+        contract_sigs = dict(zip(addresses, contract_sigs))
+        token_infos = token_infos.result()
+
+    for transaction in unlabeled:
+        amounts = amounts_by_transaction[transaction["id"]]
+        label = "default"
+        for input in transaction["inputs"]:
+            address = boxes[input["boxId"]]["address"]
+            if address == treasury_address:
+                continue
+            contract_sig = contract_sigs[address]
+            if contract_sig:
+                if "Profit" in contract_sig["className"]:
+                    label = "Profit Sharing"
+                elif "Snapshot" in contract_sig["className"]:
+                    label = "Stake Snapshot"
+                elif "Compound" in contract_sig["className"]:
+                    label = "Stake Compound"
+        amounts_labeled = []
+        for amount_key in amounts.keys():
+            if amount_key == "Erg" and amounts[amount_key] != 0:
+                amounts_labeled.append(
+                    TokenAmount(token_name="Erg", amount=amounts[amount_key] / 10**9)
+                )
+            elif amounts[amount_key] != 0:
+                token_info = token_infos[amount_key]
+                amounts_labeled.append(
+                    TokenAmount(
+                        token_name=token_info["name"],
+                        amount=amounts[amount_key]
+                        / 10 ** (int(token_info["decimals"])),
+                    )
+                )
+        if label == "default":
+            label = "Deposit" if amounts["Erg"] > 0 else "Withdrawal"
+        labeled_transaction = Transaction(
+            transaction_id=transaction["id"],
+            label=label,
+            amount=amounts_labeled,
+            time=transaction["timestamp"],
+        )
+        cache.set(
+            "labeled_transaction_" + str(transaction["id"]), labeled_transaction.dict()
+        )
+        labeled[transaction["id"]] = labeled_transaction
+    return [labeled[x["id"]] for x in transactions]
+
+
+def treasury_amounts(treasury_address: str, transaction: dict, boxes: dict):
+    # net change of erg and tokens held by the treasury
+    amounts = dict()
+    treasury_boxes = [
+        boxes[input["boxId"]]
+        for input in transaction["inputs"]
+        if boxes[input["boxId"]]["address"] == treasury_address
+    ]
+    for box, sign in [(x, -1) for x in treasury_boxes] + [
+        (x, 1) for x in transaction["outputs"] if x["address"] == treasury_address
+    ]:
+        amounts["Erg"] = amounts.get("Erg", 0) + sign * box["value"]
+        for asset in box["assets"]:
+            amounts[asset["tokenId"]] = (
+                amounts.get(asset["tokenId"], 0) + sign * asset["amount"]
+            )
+    return amounts
+
+
 @r.get(
     "/treasury/{dao_id}/transactions",
     response_model=TransactionHistory,
@@ -228,74 +255,9 @@ def get_treasury_transactions(
         treasury_transactions = indexed_node_client.get_transactions(
             treasury_address, offset, limit
         )
-        labeled_transactions = []
-        for transaction in treasury_transactions["items"]:
-            cache_key = "labeled_transaction_" + str(transaction["id"])
-            labeled_transaction = cache.get(cache_key)
-            if not labeled_transaction:
-                amounts = dict()
-                label = "default"
-                for input in transaction["inputs"]:
-                    input_box = indexed_node_client.get_box_by_id(input["boxId"])
-                    if input_box["address"] == treasury_address:
-                        if "Erg" in amounts:
-                            amounts["Erg"] -= input_box["value"]
-                        else:
-                            amounts["Erg"] = -1 * input_box["value"]
-                        for asset in input_box["assets"]:
-                            if asset["tokenId"] in amounts:
-                                amounts[asset["tokenId"]] -= asset["amount"]
-                            else:
-                                amounts[asset["tokenId"]] = -1 * asset["amount"]
-                    else:
-                        contract_sig = util.get_contract_sig(input_box["address"])
-                        if contract_sig:
-                            if "Profit" in contract_sig["className"]:
-                                label = "Profit Sharing"
-                            elif "Snapshot" in contract_sig["className"]:
-                                label = "Stake Snapshot"
-                            elif "Compound" in contract_sig["className"]:
-                                label = "Stake Compound"
-                for output in transaction["outputs"]:
-                    if output["address"] == treasury_address:
-                        if "Erg" in amounts:
-                            amounts["Erg"] += output["value"]
-                        else:
-                            amounts["Erg"] = output["value"]
-                        for asset in output["assets"]:
-                            if asset["tokenId"] in amounts:
-                                amounts[asset["tokenId"]] += asset["amount"]
-                            else:
-                                amounts[asset["tokenId"]] = asset["amount"]
-                amounts_labeled = []
-                for amount_key in amounts.keys():
-                    if amount_key == "Erg" and amounts[amount_key] != 0:
-                        amounts_labeled.append(
-                            TokenAmount(
-                                token_name="Erg", amount=amounts[amount_key] / 10**9
-                            )
-                        )
-                    elif amounts[amount_key] != 0:
-                        token_info = indexed_node_client.get_token_info(amount_key)
-                        amounts_labeled.append(
-                            TokenAmount(
-                                token_name=token_info["name"],
-                                amount=amounts[amount_key]
-                                / 10 ** (int(token_info["decimals"])),
-                            )
-                        )
-                if label == "default":
-                    label = "Deposit" if amounts["Erg"] > 0 else "Withdrawal"
-                labeled_transaction = Transaction(
-                        transaction_id=transaction["id"],
-                        label=label,
-                        amount=amounts_labeled,
-                        time=transaction["timestamp"],
-                    )
-                cache.set(cache_key, labeled_transaction.dict())
-            labeled_transactions.append(
-                labeled_transaction
-            )
+        labeled_transactions = label_treasury_transactions(
+            db, treasury_address, treasury_transactions["items"]
+        )
         res = TransactionHistory(transactions=labeled_transactions).dict()
         cache.set("get_treasury_transactions_" + str(dao_id), res)
         return res
@@ -375,7 +337,9 @@ def dao_create(
     Create a new dao (draft)
     """
     try:
-        return create_dao(db, dao)
+        ret = create_dao(db, dao)
+        cache.invalidate("get_all_daos")
+        return ret
     except Exception as e:
         logging.error(traceback.format_exc())
         return JSONResponse(
@@ -428,6 +392,7 @@ def dao_edit(
     """
     try:
         dao = edit_dao(db, id, dao)
+        cache.invalidate("get_all_daos")
         if not dao:
             return JSONResponse(
                 status_code=status.HTTP_404_NOT_FOUND, content="dao not found"
@@ -471,6 +436,7 @@ def dao_delete(
     """
     try:
         dao = delete_dao(db, id)
+        cache.invalidate("get_all_daos")
         if not dao:
             return JSONResponse(
                 status_code=status.HTTP_404_NOT_FOUND, content="dao not found"
@@ -1,9 +1,11 @@
+import datetime
 import typing as t
 import uuid
 import logging
 import traceback
 
-from fastapi import APIRouter, Depends, status, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, Query, status, WebSocket, WebSocketDisconnect
+from sqlalchemy.orm import Session
 from starlette.responses import JSONResponse
 
 from core.auth import get_current_active_superuser, get_current_active_user
@@ -12,10 +14,12 @@ from db.session import get_db
 from db.crud.notifications import (
     cleanup_notifications,
     create_notification,
+    create_notifications,
     mark_all_as_read,
     delete_notification,
     get_notifications,
     get_notification,
+    get_unread_counts,
 )
 from db.crud.users import get_user_details_by_id
 from db.schemas.notifications import CreateAndUpdateNotification, Notification
@@ -32,11 +36,15 @@ notification_router = r = APIRouter()
 )
 def notifications_list(
     user_details_id: uuid.UUID,
+    limit: int = Query(10, ge=1, le=100),
+    before_date: t.Optional[datetime.datetime] = None,
+    before_id: t.Optional[uuid.UUID] = None,
     db=Depends(get_db),
     current_user=Depends(get_current_active_user),
 ):
     """
-    Get all notifications for a user
+    Get notifications for a user, newest first. Pass the date and id of the
+    last notification received as before_date and before_id for the next page
     """
     try:
         user_details = get_user_details_by_id(db, user_details_id)
@@ -46,7 +54,32 @@ def notifications_list(
             return JSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED, content="user not authorized"
             )
-        return get_notifications(db, user_details_id)
+        return get_notifications(db, user_details_id, limit, before_date, before_id)
+    except Exception as e:
+        logging.error(traceback.format_exc())
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST, content=f"{str(e)}"
+        )
+
+
+@r.get("/unread_count/{user_details_id}", name="notifications:unread-count")
+def notifications_unread_count(
+    user_details_id: uuid.UUID,
+    db=Depends(get_db),
+    current_user=Depends(get_current_active_user),
+):
+    """
+    Number of unread notifications for a user
+    """
+    try:
+        user_details = get_user_details_by_id(db, user_details_id)
+        if type(user_details) == JSONResponse:
+            return user_details
+        if user_details.user_id != current_user.id:
+            return JSONResponse(
+                status_code=status.HTTP_401_UNAUTHORIZED, content="user not authorized"
+            )
+        return {"unread_count": get_unread_counts(db, [user_details_id])[user_details_id]}
     except Exception as e:
         logging.error(traceback.format_exc())
         return JSONResponse(
@@ -71,11 +104,9 @@ async def notification_create(
     """
     try:
         ret = create_notification(db, user_details_id, notification)
-        await connection_manager.send_personal_message(
-            "notification_user_details_id_" + str(user_details_id),
-            {"notifications": map_serialization(
-                get_notifications(db, user_details_id))},
-        )
+        if type(ret) == JSONResponse:
+            return ret
+        await connection_manager.broadcast_many(notification_messages(db, [ret]))
         return ret
     except Exception as e:
         logging.error(traceback.format_exc())
@@ -163,13 +194,59 @@ def notification_delete(
 @r.websocket("/ws/{user_details_id}")
 async def websocket_endpoint(websocket: WebSocket, user_details_id: str):
     key = "notification_user_details_id_" + user_details_id
-    await connection_manager.connect(key, websocket)
+    connection = await connection_manager.connect(key, websocket)
     try:
         while True:
             # pause loop
             await websocket.receive_text()
     except WebSocketDisconnect:
-        connection_manager.disconnect(key)
+        connection_manager.disconnect(connection)
+
+
+def create_and_push_notifications(
+    db: Session, notifications: t.List[CreateAndUpdateNotification]
+):
+    """
+    Store the notifications in one batch and push them to the users' sockets,
+    for code running outside the event loop
+    """
+    created = create_notifications(db, notifications)
+    try:
+        connection_manager.publish_many(notification_messages(db, created))
+    except Exception as e:
+        # the notifications are committed, clients catch up on their next fetch
+        logging.error(f"push notifications: {str(e)}")
+    return created
+
+
+async def create_and_broadcast_notifications(
+    db: Session, notifications: t.List[CreateAndUpdateNotification]
+):
+    """
+    Store the notifications in one batch and push them to the users' sockets,
+    for routes running in the event loop
+    """
+    created = create_notifications(db, notifications)
+    await connection_manager.broadcast_many(notification_messages(db, created))
+    return created
+
+
+def notification_messages(db: Session, notifications: t.List[Notification]):
+    # only the new notifications and the unread count go over the socket
+    by_user = {}
+    for notification in notifications:
+        by_user.setdefault(notification.user_details_id, []).append(notification)
+    unread_counts = get_unread_counts(db, list(by_user))
+    return [
+        (
+            "notification_user_details_id_" + str(user_details_id),
+            {
+                "new_notifications": map_serialization(user_notifications),
+                "unread_count": unread_counts[user_details_id],
+            },
+        )
+        for user_details_id, user_notifications in by_user.items()
+    ]
 
 
 def map_serialization(notifcations):
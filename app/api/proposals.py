@@ -1,5 +1,4 @@
 import typing as t
-import random
 import uuid
 import logging
 import traceback
@@ -9,7 +8,7 @@ from fastapi import APIRouter, Depends, status, WebSocket, WebSocketDisconnect
 from fastapi.encoders import jsonable_encoder
 from starlette.responses import JSONResponse
 
-from api.notifications import notification_create
+from api.notifications import create_and_broadcast_notifications, create_and_push_notifications
 from paideia_state_client import staking, dao, proposals
 from db.schemas.util import SigningRequest
 from db.session import get_db
@@ -19,6 +18,7 @@ from db.schemas.proposal import (
     ActionBase,
     CreateOnChainProposal,
     Proposal,
+    ProposalSummary,
     CreateProposal,
     LikeProposalRequest,
     FollowProposalRequest,
@@ -37,9 +37,10 @@ from db.crud.proposals import (
     get_proposal_by_id,
     get_proposal_by_slug,
     get_proposals_by_dao_id,
-    get_proposals_by_user_id,
+    get_proposal_summaries_by_dao_id,
+    hydrate_proposals,
     get_comment_by_id,
-    create_new_proposal,
+    create_new_proposal_with_activity,
     delete_proposal_by_id,
     set_likes_by_proposal_id,
     set_likes_by_comment_id,
@@ -49,11 +50,11 @@ from db.crud.proposals import (
     delete_comment_by_comment_id,
     add_addendum_by_proposal_id,
     add_reference_by_proposal_id,
+    proposal_status,
 )
 from db.crud.activity_log import create_user_activity
 from db.crud.notifications import generate_action
-from db.crud.users import get_ergo_addresses_by_user_id, get_primary_wallet_address_by_user_id, get_user_details_by_id, get_user, get_user_profile
-from core.async_handler import run_coroutine_in_sync
+from db.crud.users import get_ergo_addresses_by_user_id, get_primary_wallet_address_by_user_id, get_proposals_by_user_id, get_user_details_by_id
 from core.auth import get_current_active_user, get_current_active_superuser
 from websocket.connection_manager import connection_manager
 from util.util import is_uuid
@@ -64,20 +65,6 @@ from config import Config, Network
 proposal_router = r = APIRouter()
 
 
-def proposal_status(status_code: int) -> str:
-    match status_code:
-        case -2: 
-            return "Failed - Quorum"
-        case -1:
-            return "Active"
-        case 0:
-            return "Failed - Vote"
-        case 1:
-            return "Passed"
-        case _:
-            return "Unknown"
-
-
 @r.get(
     "/by_dao_id/{dao_id}",
     response_model=t.List[Proposal],
@@ -85,57 +72,33 @@ def proposal_status(status_code: int) -> str:
     name="proposals:all-proposals",
 )
 def get_proposals(dao_id: uuid.UUID, db=Depends(get_db)):
+    """
+    On chain proposals are reconciled in the background by sync.sync_proposals
+    """
     try:
-        db_proposals = get_proposals_by_dao_id(db, dao_id)
-        db_dao = get_dao(db, dao_id)
-        state_proposals = dao.get_proposals(db_dao.dao_key)
-        for p in state_proposals:
-            db_proposal = None
-            for dbp in db_proposals:
-                if dbp.on_chain_id == p["proposalIndex"]:
-                    if dbp.name == p["proposalName"]:
-                        db_proposal = dbp
-                    else:
-                        delete_proposal_by_id(db, dbp.id)
-            if db_proposal is None:
-                proposal = proposals.get_proposal(
-                    db_dao.dao_key, p["proposalIndex"])
-                create_proposal(db=db, user=get_user(db, Config[Network].admin_id), proposal=CreateProposal(
-                    dao_id=dao_id,
-                    user_details_id=get_user_profile(
-                        db, Config[Network].admin_id, dao_id).id,
-                    name=proposal["proposal"]["name"],
-                    voting_system=proposal["proposalType"],
-                    actions=proposal["proposal"]["actions"],
-                    is_proposal=True,
-                    box_height=proposal["proposal"]["box_height"],
-                    box_id=proposal["proposal"]["box_id"],
-                    on_chain_id=p["proposalIndex"],
-                    votes=proposal["proposal"]["votes"],
-                    attachments=[],
-                    status=proposal_status(proposal["proposal"]["passed"]),
-                    end_date=datetime.datetime.fromtimestamp(proposal["proposal"]["endTime"] // 1000)
-                ))
-            elif not db_proposal.box_id or db_proposal.box_id != p["proposalBoxId"]:
-                proposal = proposals.get_proposal(
-                    db_dao.dao_key, p["proposalIndex"])
-                edit_proposal_basic_by_id(db=db, user_details_id=db_proposal.user_details_id, id=db_proposal.id, proposal=UpdateProposalBasic(
-                    box_height=p["proposalHeight"],
-                    box_id=proposal["proposal"]["box_id"],
-                    dao_id=db_proposal.dao_id,
-                    user_details_id=db_proposal.user_details_id,
-                    name=db_proposal.name,
-                    votes=proposal["proposal"]["votes"],
-                    attachments=db_proposal.attachments,
-                    status=proposal_status(proposal["proposal"]["passed"]),
-                    end_date=datetime.datetime.fromtimestamp(proposal["proposal"]["endTime"] // 1000)
-                ))
         return get_proposals_by_dao_id(db, dao_id)
     except Exception as e:
         logging.error(traceback.format_exc())
         return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content=str(e))
 
 
+@r.get(
+    "/by_dao_id/{dao_id}/summary",
+    response_model=t.List[ProposalSummary],
+    response_model_exclude_none=True,
+    name="proposals:all-proposal-summaries",
+)
+def get_proposal_summaries(dao_id: uuid.UUID, db=Depends(get_db)):
+    """
+    Lightweight proposal list for the dao page, use /{proposal_slug} for details
+    """
+    try:
+        return get_proposal_summaries_by_dao_id(db, dao_id)
+    except Exception as e:
+        logging.error(traceback.format_exc())
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content=str(e))
+
+
 @r.get(
     "/by_user_details_id/{user_details_id}",
     response_model_exclude_none=True,
@@ -144,7 +107,7 @@ def get_proposals(dao_id: uuid.UUID, db=Depends(get_db)):
 def get_user_proposals(user_details_id: uuid.UUID, db=Depends(get_db)):
     try:
         basic_proposals = get_proposals_by_user_id(db, user_details_id)
-        return list(map(lambda x: get_proposal_by_id(db, x.id), basic_proposals))
+        return hydrate_proposals(db, basic_proposals)
     except Exception as e:
         logging.error(traceback.format_exc())
         return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content=str(e))
@@ -224,18 +187,7 @@ def create_proposal(
             return JSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED, content="user not authorized"
             )
-        proposal = create_new_proposal(db, proposal)
-        # add to activities
-        if type(proposal) != JSONResponse:
-            activity = CreateOrUpdateActivity(
-                user_details_id=user_details_id,
-                action=ActivityConstants.CREATED_DISCUSSION,
-                value=proposal.name,
-                category=ActivityConstants.PROPOSAL_CATEGORY,
-                link=str(proposal.id),
-            )
-            create_user_activity(db, user_details_id, activity)
-        return proposal
+        return create_new_proposal_with_activity(db, proposal)
     except Exception as e:
         logging.error(traceback.format_exc())
         return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content=str(e))
@@ -295,17 +247,7 @@ def create_on_chain_proposal(
         unsigned_tx = proposals.create_proposal(
             db_dao.dao_key, proposal.name, proposal.stake_key, main_address, all_addresses, proposal.end_time, sendFundsActions, updateConfigActions)
 
-        proposal = create_new_proposal(db, proposal)
-        # add to activities
-        if type(proposal) != JSONResponse:
-            activity = CreateOrUpdateActivity(
-                user_details_id=user_details_id,
-                action=ActivityConstants.CREATED_DISCUSSION,
-                value=proposal.name,
-                category=ActivityConstants.PROPOSAL_CATEGORY,
-                link=str(proposal.id),
-            )
-            create_user_activity(db, user_details_id, activity)
+        proposal = create_new_proposal_with_activity(db, proposal)
         return CreateOnChainProposalResponse(
             message="Sign message to create proposal",
             unsigned_transaction=unsigned_tx,
@@ -433,12 +375,7 @@ def like_proposal(
                     ),
                     proposal_id=proposal.id,
                 )
-                # handle async web sockets stuff
-                run_coroutine_in_sync(
-                    notification_create(
-                        proposal.user_details_id, notification, db, current_user=None
-                    )
-                )
+                create_and_push_notifications(db, [notification])
         return likes
     except Exception as e:
         logging.error(traceback.format_exc())
@@ -489,12 +426,7 @@ def follow_proposal(
                     ),
                     proposal_id=proposal.id,
                 )
-                # handle async web sockets stuff
-                run_coroutine_in_sync(
-                    notification_create(
-                        proposal.user_details_id, notification, db, current_user=None
-                    )
-                )
+                create_and_push_notifications(db, [notification])
         return followers
     except Exception as e:
         logging.error(traceback.format_exc())
@@ -523,7 +455,7 @@ async def comment_proposal(
         if type(comment_dict) == JSONResponse:
             return comment_dict
         # web sockets
-        await connection_manager.send_personal_message_by_substring_matcher(
+        await connection_manager.broadcast(
             "proposal_comments_" + str(proposal_id),
             {
                 "proposal_id": str(proposal_id),
@@ -542,33 +474,30 @@ async def comment_proposal(
         )
         create_user_activity(db, user_details_id, activity)
         # notifications
+        notifications = []
         if proposal.user_details_id != user_details_id:
-            notification = CreateAndUpdateNotification(
+            notifications.append(CreateAndUpdateNotification(
                 user_details_id=proposal.user_details_id,
                 action=generate_action(
                     user_details.name, NotificationConstants.COMMENTED_ON_DISCUSSION
                 ),
                 proposal_id=proposal.id,
-            )
-            await notification_create(
-                proposal.user_details_id, notification, db, current_user=None
-            )
+            ))
         if "parent" in comment_dict and comment_dict["parent"] != None:
             parent_comment_id = comment_dict["parent"]
             parent_user_details_id = get_comment_by_id(
                 db, parent_comment_id
             ).user_details_id
             if parent_user_details_id != user_details_id:
-                notification = CreateAndUpdateNotification(
+                notifications.append(CreateAndUpdateNotification(
                     user_details_id=parent_user_details_id,
                     action=generate_action(
                         user_details.name, NotificationConstants.COMMENT_REPLY
                     ),
                     proposal_id=proposal.id,
-                )
-                await notification_create(
-                    parent_user_details_id, notification, db, current_user=None
-                )
+                ))
+        if len(notifications) > 0:
+            await create_and_broadcast_notifications(db, notifications)
         return comment_dict
     except Exception as e:
         logging.error(traceback.format_exc())
@@ -645,12 +574,7 @@ def like_comment(
                     ),
                     proposal_id=proposal.id,
                 )
-                # handle async web sockets stuff
-                run_coroutine_in_sync(
-                    notification_create(
-                        proposal.user_details_id, notification, db, current_user=None
-                    )
-                )
+                create_and_push_notifications(db, [notification])
             return likes
     except Exception as e:
         logging.error(traceback.format_exc())
@@ -757,15 +681,13 @@ def delete_proposal(
 
 @r.websocket("/ws/{proposal_id}")
 async def websocket_endpoint(websocket: WebSocket, proposal_id: str):
-    random_key = "proposal_comments_" + \
-        proposal_id + "_" + str(random.random())
-    await connection_manager.connect(random_key, websocket)
+    connection = await connection_manager.connect("proposal_comments_" + proposal_id, websocket)
     try:
         while True:
             # pause loop
             await websocket.receive_text()
     except WebSocketDisconnect:
-        connection_manager.disconnect(random_key)
+        connection_manager.disconnect(connection)
 
 
 def transform_comment_dict(comment_dict):
@@ -11,7 +11,8 @@ from db.session import get_db
 from paideia_state_client import staking
 from db.crud.dao import get_dao
 from db.crud.users import get_ergo_addresses_by_user_id, get_primary_wallet_address_by_user_id
-from ergo.indexed_node_client import get_balance, get_token_info
+from ergo.indexed_node_client import get_balances_at_height, get_height
+from ergo.token_registry import resolve, resolve_many
 from starlette.responses import JSONResponse
 
 staking_router = r = APIRouter()
@@ -28,7 +29,7 @@ def stake(
 ):
     try:
         dao = get_dao(db, req.dao_id)
-        token_info = get_token_info(dao.tokenomics.token_id)
+        token_info = resolve(dao.tokenomics.token_id, db)
         main_address = get_primary_wallet_address_by_user_id(db, req.user_id)
         all_addresses = list(map(lambda ea: ea.address, get_ergo_addresses_by_user_id(db, req.user_id)))
         unsignedTransaction = staking.stake(dao.dao_key, round(req.amount*(10**token_info["decimals"])), main_address, all_addresses)
@@ -52,7 +53,7 @@ def stake(
 ):
     try:
         dao = get_dao(db, req.dao_id)
-        token_info = get_token_info(dao.tokenomics.token_id)
+        token_info = resolve(dao.tokenomics.token_id, db)
         main_address = get_primary_wallet_address_by_user_id(db, req.user_id)
         all_addresses = list(map(lambda ea: ea.address, get_ergo_addresses_by_user_id(db, req.user_id)))
         unsignedTransaction = staking.add_stake(dao.dao_key, req.stake_key, int(req.amount*(10**token_info["decimals"])), main_address, all_addresses)
@@ -84,7 +85,7 @@ def stake(
             if key.key_id == req.new_stake_key_info.key_id and key.stake > req.new_stake_key_info.stake and req.new_stake_key_info.stake > 0:
                 raise Exception("Partial unstaking not allowed")
         dao = get_dao(db, req.dao_id)
-        token_info = get_token_info(dao.tokenomics.token_id)
+        token_info = resolve(dao.tokenomics.token_id, db)
         main_address = get_primary_wallet_address_by_user_id(db, req.user_id)
         all_addresses = list(map(lambda ea: ea.address, get_ergo_addresses_by_user_id(db, req.user_id)))
         rewards = []
@@ -116,7 +117,7 @@ def get_dao_stake(
 ):
     try:
         dao = get_dao(db, dao_id)
-        token_info = get_token_info(dao.tokenomics.token_id)
+        token_info = resolve(dao.tokenomics.token_id, db)
         stakeInfo = staking.get_dao_stake(dao.dao_key)
         stakeEmissionAndProfit = stakeInfo["emission"]+stakeInfo["profit"][0]
         profit = []
@@ -154,45 +155,49 @@ def get_stake(
 ):
     try:
         dao = get_dao(db, req.dao_id)
-        token_info = get_token_info(dao.tokenomics.token_id)
+        token_info = resolve(dao.tokenomics.token_id, db)
         all_addresses = list(map(lambda ea: ea.address, get_ergo_addresses_by_user_id(db, req.user_id)))
-        stake_keys = []
-        for addr in all_addresses:
-            user_balance = get_balance(addr)
-            potential_keys = set()
+        # a stake key can be held by any of the addresses, ask for all candidates at once.
+        # stake state is read from chain so confirmed balances at the current height are enough
+        balances = get_balances_at_height(all_addresses, get_height())
+        potential_keys = set()
+        for user_balance in balances.values():
             for token in user_balance["confirmed"]["tokens"]:
                 potential_keys.add(token["tokenId"])
-            for token in user_balance["unconfirmed"]["tokens"]:
-                potential_keys.add(token["tokenId"])
-            stakeKeyInfos = staking.get_stake(dao.dao_key, potential_keys)
-            if stakeKeyInfos and len(stakeKeyInfos) > 0:
-                stakeKeyInfo = stakeKeyInfos[0]
-                participation_info = ParticipationInfo(
-                        proposals_voted_on=stakeKeyInfo["participationRecord"]["voted"],
-                        total_voting_power_used=stakeKeyInfo["participationRecord"]["votedTotal"]
-                    ) if "participationRecord" in stakeKeyInfo else ParticipationInfo(
-                    proposals_voted_on=0,total_voting_power_used=0)
-                ergProfit = stakeKeyInfo["stakeRecord"]["rewards"][0]
-                tokenProfit = stakeKeyInfo["stakeRecord"]["rewards"][1:]
-                profit = [ProfitInfo(
-                    token_name="Erg",
-                    token_id="",
-                    amount=ergProfit/(10**9)
-                )]
-                for i in range(len(tokenProfit)):
-                    profit_token_info = get_token_info(stakeKeyInfo["profitTokens"][i])
-                    profit.append(ProfitInfo(
-                        token_name=profit_token_info["name"],
-                        token_id=stakeKeyInfo["profitTokens"][i],
-                        amount=tokenProfit[i]/(10**profit_token_info["decimals"])
-                    ))
-                stake_keys.append(StakeKeyInfoWithParticipation(
-                    key_id=stakeKeyInfo["stakeKey"],
-                    locked_until=stakeKeyInfo["stakeRecord"]["lockedUntil"],
-                    participation_info=participation_info,
-                    stake=stakeKeyInfo["stakeRecord"]["stake"]/(10**token_info["decimals"]),
-                    profit=profit
+        stakeKeyInfos = staking.get_stake(dao.dao_key, potential_keys) if len(potential_keys) > 0 else None
+        stakeKeyInfos = list({x["stakeKey"]: x for x in stakeKeyInfos or []}.values())
+        profit_token_infos = resolve_many(
+            [token_id for stakeKeyInfo in stakeKeyInfos for token_id in stakeKeyInfo["profitTokens"]],
+            db
+        )
+        stake_keys = []
+        for stakeKeyInfo in stakeKeyInfos:
+            participation_info = ParticipationInfo(
+                    proposals_voted_on=stakeKeyInfo["participationRecord"]["voted"],
+                    total_voting_power_used=stakeKeyInfo["participationRecord"]["votedTotal"]
+                ) if "participationRecord" in stakeKeyInfo else ParticipationInfo(
+                proposals_voted_on=0,total_voting_power_used=0)
+            ergProfit = stakeKeyInfo["stakeRecord"]["rewards"][0]
+            tokenProfit = stakeKeyInfo["stakeRecord"]["rewards"][1:]
+            profit = [ProfitInfo(
+                token_name="Erg",
+                token_id="",
+                amount=ergProfit/(10**9)
+            )]
+            for i in range(len(tokenProfit)):
+                profit_token_info = profit_token_infos[stakeKeyInfo["profitTokens"][i]]
+                profit.append(ProfitInfo(
+                    token_name=profit_token_info["name"],
+                    token_id=stakeKeyInfo["profitTokens"][i],
+                    amount=tokenProfit[i]/(10**profit_token_info["decimals"])
                 ))
+            stake_keys.append(StakeKeyInfoWithParticipation(
+                key_id=stakeKeyInfo["stakeKey"],
+                locked_until=stakeKeyInfo["stakeRecord"]["lockedUntil"],
+                participation_info=participation_info,
+                stake=stakeKeyInfo["stakeRecord"]["stake"]/(10**token_info["decimals"]),
+                profit=profit
+            ))
         return StakeInfo(
             dao_id=req.dao_id,
             user_id=req.user_id,
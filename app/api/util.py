@@ -11,6 +11,9 @@ from starlette.responses import JSONResponse
 from config import Config, Network  # api specific config
 from core.auth import get_current_active_user, get_current_active_superuser
 from cache.cache import cache
+from core.http_client import upstream_metrics
+from core.async_handler import scheduler
+from websocket.connection_manager import connection_manager
 from aws.s3 import S3
 from util.image_optimizer import pillow_image_optimizer
 from util.util import generate_slug
@@ -144,6 +147,38 @@ class InvalidateCacheRequest(BaseModel):
     key: str
 
 
+@r.get("/upstream_metrics", name="util:upstream-metrics")
+def upstreamMetrics():
+    """
+    Request count, error count and latency per upstream for this worker
+    """
+    return upstream_metrics()
+
+
+@r.get("/scheduler_metrics", name="util:scheduler-metrics")
+def schedulerMetrics():
+    """
+    Runs, duration and start lag per background job, as last reported by the worker
+    """
+    return scheduler.cluster_metrics()
+
+
+@r.get("/cache_metrics", name="util:cache-metrics")
+def cacheMetrics():
+    """
+    Hit and miss counts per cache tier for this worker
+    """
+    return cache.stats()
+
+
+@r.get("/websocket_metrics", name="util:websocket-metrics")
+def websocketMetrics():
+    """
+    Open sockets and delivered, dropped and failed messages for this worker
+    """
+    return connection_manager.stats()
+
+
 @r.post("/force_invalidate_cache", name="util:cache-invalidate")
 def forceInvalidateCache(
     req: InvalidateCacheRequest, current_user=Depends(get_current_active_superuser)
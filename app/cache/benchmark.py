@@ -0,0 +1,108 @@
+"""
+Encode/decode time and stored size per cache codec, run from app/ with
+python -m cache.benchmark
+"""
+import time
+import uuid
+
+from cache.codec import AVAILABLE, CODECS, CacheCodec
+from db.schemas.util import TokenAmount, Transaction, TransactionHistory
+from ergo.schemas import (
+    TokenMarketCap,
+    TokenMarketSpecificStats,
+    TokenPriceHistorySummary,
+    TokenPriceRangeSummaryDataPoint,
+    TokenStats,
+    TokenSupplyStats,
+)
+
+
+def token_stats():
+    point = TokenPriceRangeSummaryDataPoint(
+        high=0.0123, low=0.0101, open=0.0111, close=0.0119, volume=123456.789
+    )
+    return TokenStats(
+        price=0.0119,
+        token_price_history_summary=TokenPriceHistorySummary(
+            hour_24=point,
+            yesterday=point,
+            day_7=point,
+            day_30=point,
+            day_90=point,
+            week_52=point,
+            all_time=point,
+        ),
+        market_cap=TokenMarketCap(market_cap=1234567.8, diluted_market_cap=2345678.9),
+        token_supply=TokenSupplyStats(total_supply=100000000, max_supply=200000000),
+        token_markets=[TokenMarketSpecificStats(price=0.0119, volume=123456.789)],
+    ).dict()
+
+
+def activities(n: int = 500):
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "name": "alias",
+            "user_details_id": str(uuid.uuid4()),
+            "img_url": "https://paideia.s3.amazonaws.com/profile.png",
+            "action": "created a proposal",
+            "value": "Fund the marketing campaign",
+            "date": "2023-05-01 12:00:00.000000+00:00",
+            "category": "Proposal",
+            "secondary_action": None,
+            "secondary_value": None,
+            "link": "/dao/proposal/" + str(uuid.uuid4()),
+        }
+        for _ in range(n)
+    ]
+
+
+def treasury_transactions(n: int = 100):
+    return TransactionHistory(
+        transactions=[
+            Transaction(
+                transaction_id=uuid.uuid4().hex * 2,
+                label="Deposit",
+                amount=[
+                    TokenAmount(token_name="Erg", amount=12.5),
+                    TokenAmount(token_name="Paideia", amount=1000),
+                ],
+                time=1682942400000 + i,
+            )
+            for i in range(n)
+        ]
+    ).dict()
+
+
+PAYLOADS = {
+    "token_stats": token_stats(),
+    "activities": activities(),
+    "treasury_transactions": treasury_transactions(),
+}
+CONFIGS = [(name, threshold) for name in CODECS for threshold in [0, 1024]]
+
+
+def benchmark(rounds: int = 50):
+    # encoded size is what redis stores for the value
+    for payload_name, payload in PAYLOADS.items():
+        for name, threshold in CONFIGS:
+            if CODECS[name].id not in AVAILABLE:
+                continue
+            codec = CacheCodec(name, threshold)
+            start = time.perf_counter()
+            for _ in range(rounds):
+                data = codec.encode(payload)
+            encode_time = (time.perf_counter() - start) / rounds
+            start = time.perf_counter()
+            for _ in range(rounds):
+                codec.decode(data)
+            decode_time = (time.perf_counter() - start) / rounds
+            print(
+                f"{payload_name:22} {name:8} zlib>{threshold:<5} "
+                f"encode {encode_time * 1e6:8.1f}us decode {decode_time * 1e6:8.1f}us "
+                f"size {len(data)}"
+            )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,27 +1,260 @@
 from cache.redis_client import redisClient
+from cache.lru import LRUCache
+from cache.codec import CacheCodec
+from config import Config, Network
 
-import json
+import logging
+import threading
+import time
+import typing as t
+import uuid
+
+
+CFG = Config[Network]
+INVALIDATION_CHANNEL = "cache_invalidation"
+LOCK_TIMEOUT = 30
+LOCK_POLL_INTERVAL = 0.05
+# delete the lock only if it still holds our token
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+# get_or_compute entries are wrapped, the prefix keeps them apart from plain
+# values cached under the same key by older releases. bump it if the wrapper changes
+FRESH_KEY_PREFIX = "fresh_v1_"
+# hot keys read many times per request, values must not be mutated by callers
+L1_PREFIXES = (
+    FRESH_KEY_PREFIX + "get_contract_sig_",
+    FRESH_KEY_PREFIX + "token_stats_cache_",
+)
 
 
 class RedisCache:
-    def __init__(self, timeout: int = 900):
+    def __init__(
+        self,
+        timeout: int = 900,
+        l1_size: int = CFG.cache_l1_size,
+        l1_timeout: int = CFG.cache_l1_timeout,
+    ):
         self.client = redisClient
         # default 15 mins
         self.timeout = timeout
+        self.codec = CacheCodec(CFG.cache_codec, CFG.cache_compress_threshold)
+        # optional in-process tier in front of redis, disabled with size 0
+        self.l1 = LRUCache(l1_size) if l1_size > 0 else None
+        self.l1_timeout = l1_timeout
+        self.l1_prefixes = L1_PREFIXES
+        self.worker_id = uuid.uuid4().hex
+        self.listener = None
+        self.listener_lock = threading.Lock()
+        self.counter_lock = threading.Lock()
+        self.counters = {"l1_hits": 0, "l1_misses": 0, "l2_hits": 0, "l2_misses": 0}
 
     def get(self, key: str):
-        val = self.client.get(key)
+        if not self.use_l1(key):
+            val = self.client.get(key)
+            self.count("l2_hits" if val else "l2_misses")
+            if val:
+                return self.codec.decode(val)
+            return None
+        val = self.l1.get(key)
+        if val is not None:
+            self.count("l1_hits")
+            return val
+        self.count("l1_misses")
+        pipe = self.client.pipeline()
+        pipe.get(key)
+        pipe.ttl(key)
+        val, ttl = pipe.execute()
+        self.count("l2_hits" if val else "l2_misses")
         if val:
-            return json.loads(val)
+            val = self.codec.decode(val)
+            # never keep a value in l1 longer than redis keeps it
+            if ttl is None or ttl < 0:
+                ttl = self.l1_timeout
+            self.l1.set(key, val, min(self.l1_timeout, ttl))
+            return val
+
+    def get_many(self, keys: t.List[str]):
+        """
+        Values for keys in order, redis is read with a single MGET
+        """
+        values = {}
+        for key in keys:
+            if self.use_l1(key):
+                val = self.l1.get(key)
+                self.count("l1_hits" if val is not None else "l1_misses")
+                if val is not None:
+                    values[key] = val
+        missing = [key for key in dict.fromkeys(keys) if key not in values]
+        if len(missing) > 0:
+            pipe = self.client.pipeline()
+            pipe.mget(missing)
+            for key in missing:
+                pipe.ttl(key)
+            res = pipe.execute()
+            for key, val, ttl in zip(missing, res[0], res[1:]):
+                self.count("l2_hits" if val else "l2_misses")
+                if not val:
+                    continue
+                values[key] = self.codec.decode(val)
+                if self.use_l1(key):
+                    if ttl is None or ttl < 0:
+                        ttl = self.l1_timeout
+                    self.l1.set(key, values[key], min(self.l1_timeout, ttl))
+        return [values.get(key) for key in keys]
 
     def set(self, key: str, value, timeout: int = -1):
         if timeout == -1:
             timeout = self.timeout
-        value = json.dumps(value)
-        self.client.setex(key, timeout, value)
+        encoded = self.codec.encode(value)
+        self.client.setex(key, timeout, encoded)
+        if self.use_l1(key):
+            self.publish_invalidation(key)
+            self.l1.set(key, self.codec.decode(encoded), min(self.l1_timeout, timeout))
+
+    def set_many(self, values: dict, timeout: int = -1):
+        """
+        Store several keys with the same timeout in one pipeline
+        """
+        if timeout == -1:
+            timeout = self.timeout
+        pipe = self.client.pipeline()
+        encoded = {key: self.codec.encode(value) for key, value in values.items()}
+        for key, data in encoded.items():
+            pipe.setex(key, timeout, data)
+        pipe.execute()
+        for key, data in encoded.items():
+            if self.use_l1(key):
+                self.publish_invalidation(key)
+                self.l1.set(key, self.codec.decode(data), min(self.l1_timeout, timeout))
+
+    def get_or_compute(
+        self, key: str, compute, timeout: int = -1, stale_timeout: int = 300
+    ):
+        """
+        Value of key, computed by a single worker at a time. For timeout seconds
+        the value is fresh. For stale_timeout seconds after that it is still
+        returned while the worker holding the lock recomputes it.
+        """
+        if timeout == -1:
+            timeout = self.timeout
+        entry = self.get_entry(key)
+        if entry is not None and entry["fresh_until"] > time.time():
+            return entry["value"]
+
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while not self.client.set("lock_" + key, token, nx=True, ex=LOCK_TIMEOUT):
+            if entry is not None:
+                return entry["value"]
+            # nothing to serve yet, wait for the lock holder to fill the key
+            if time.monotonic() > deadline:
+                return compute()
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry = self.get_entry(key)
+        try:
+            # the previous lock holder may have just filled the key
+            entry = self.get_entry(key)
+            if entry is not None and entry["fresh_until"] > time.time():
+                return entry["value"]
+            value = compute()
+            if value is not None:
+                self.set_fresh(key, value, timeout, stale_timeout)
+            return value
+        finally:
+            self.client.eval(RELEASE_LOCK_SCRIPT, 1, "lock_" + key, token)
+
+    def get_fresh_many(self, keys: t.List[str]):
+        """
+        Values of get_or_compute keys that are still fresh, None for the rest
+        """
+        now = time.time()
+        entries = self.get_many([FRESH_KEY_PREFIX + key for key in keys])
+        return [
+            entry["value"] if is_entry(entry) and entry["fresh_until"] > now else None
+            for entry in entries
+        ]
+
+    def set_fresh(self, key: str, value, timeout: int = -1, stale_timeout: int = 300):
+        """
+        Store a value for keys read with get_or_compute
+        """
+        if timeout == -1:
+            timeout = self.timeout
+        self.set(
+            FRESH_KEY_PREFIX + key,
+            {"value": value, "fresh_until": time.time() + timeout},
+            timeout + stale_timeout,
+        )
+
+    def get_entry(self, key: str):
+        entry = self.get(FRESH_KEY_PREFIX + key)
+        return entry if is_entry(entry) else None
 
     def invalidate(self, key):
-        return self.client.delete(key)
+        # also drops the get_or_compute entry stored for the key
+        ret = self.client.delete(key, FRESH_KEY_PREFIX + key)
+        if self.l1 is not None:
+            for cached in [key, FRESH_KEY_PREFIX + key]:
+                self.l1.invalidate(cached)
+                self.publish_invalidation(cached)
+        return ret
+
+    def stats(self):
+        with self.counter_lock:
+            ret = dict(self.counters)
+        ret["l1_size"] = len(self.l1) if self.l1 is not None else 0
+        return ret
+
+    def count(self, counter: str):
+        with self.counter_lock:
+            self.counters[counter] += 1
+
+    def use_l1(self, key: str):
+        if self.l1 is None or not key.startswith(self.l1_prefixes):
+            return False
+        self.start_listener()
+        return True
+
+    def publish_invalidation(self, key: str):
+        self.client.publish(INVALIDATION_CHANNEL, self.worker_id + ":" + key)
+
+    def start_listener(self):
+        if self.listener is not None:
+            return
+        with self.listener_lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, daemon=True)
+                self.listener.start()
+
+    def listen(self):
+        # evict keys changed by other workers, l1 is unsafe while disconnected
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                self.l1.clear()
+                for message in pubsub.listen():
+                    self.on_invalidation(message["data"])
+            except Exception as e:
+                logging.error(f"cache invalidation listener: {str(e)}")
+            self.l1.clear()
+            time.sleep(1)
+
+    def on_invalidation(self, data):
+        if isinstance(data, bytes):
+            data = data.decode()
+        worker_id, key = data.split(":", 1)
+        if worker_id != self.worker_id:
+            self.l1.invalidate(key)
+
+
+def is_entry(entry):
+    # anything else is a value from before get_or_compute wrapped them
+    return isinstance(entry, dict) and "fresh_until" in entry and "value" in entry
 
 
 cache = RedisCache()
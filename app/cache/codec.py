@@ -0,0 +1,94 @@
+import json
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# encoded values start with a header: MAGIC, codec id, flags
+# values without the header are plain json written before codecs existed
+MAGIC = 0
+FLAG_ZLIB = 1
+
+
+class JsonCodec:
+    id = 1
+
+    def dumps(self, value) -> bytes:
+        return json.dumps(value).encode()
+
+    def loads(self, data: bytes):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    id = 2
+
+    def dumps(self, value) -> bytes:
+        return orjson.dumps(value)
+
+    def loads(self, data: bytes):
+        return orjson.loads(data)
+
+
+class MsgpackCodec:
+    id = 3
+
+    def dumps(self, value) -> bytes:
+        return msgpack.packb(value)
+
+    def loads(self, data: bytes):
+        return msgpack.unpackb(data)
+
+
+CODECS = {"json": JsonCodec, "orjson": OrjsonCodec, "msgpack": MsgpackCodec}
+AVAILABLE = {
+    JsonCodec.id: JsonCodec(),
+    **({OrjsonCodec.id: OrjsonCodec()} if orjson else {}),
+    **({MsgpackCodec.id: MsgpackCodec()} if msgpack else {}),
+}
+
+
+class CacheCodec:
+    """
+    Encodes cache values with the configured codec, compressing them with zlib
+    above compress_threshold bytes (0 disables compression). Decoding reads the
+    header so values written with any codec stay readable after a switch.
+    """
+
+    def __init__(self, name: str = "json", compress_threshold: int = 0):
+        if name not in CODECS:
+            raise ValueError(f"unknown cache codec {name}")
+        if CODECS[name].id not in AVAILABLE:
+            raise ImportError(f"cache codec {name} is not installed")
+        self.codec = AVAILABLE[CODECS[name].id]
+        self.compress_threshold = compress_threshold
+
+    def encode(self, value) -> bytes:
+        data = self.codec.dumps(value)
+        flags = 0
+        if self.compress_threshold > 0 and len(data) > self.compress_threshold:
+            data = zlib.compress(data)
+            flags |= FLAG_ZLIB
+        elif self.codec.id == JsonCodec.id:
+            # plain json stays readable by workers without codec support
+            return data
+        return bytes([MAGIC, self.codec.id, flags]) + data
+
+    def decode(self, data: bytes):
+        if len(data) == 0 or data[0] != MAGIC:
+            return json.loads(data)
+        codec_id, flags = data[1], data[2]
+        if codec_id not in AVAILABLE:
+            raise ValueError(f"cache value written with unavailable codec {codec_id}")
+        data = data[3:]
+        if flags & FLAG_ZLIB:
+            data = zlib.decompress(data)
+        return AVAILABLE[codec_id].loads(data)
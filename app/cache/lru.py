@@ -0,0 +1,46 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread safe in-process cache that evicts the least recently used key.
+    Entries set with a timeout expire after that many seconds.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.data = OrderedDict()
+
+    def get(self, key: str):
+        with self.lock:
+            if key not in self.data:
+                return None
+            value, expires = self.data[key]
+            if expires is not None and expires <= time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, timeout: float = None):
+        expires = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            self.data[key] = (value, expires)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+    def invalidate(self, key: str):
+        with self.lock:
+            return self.data.pop(key, None) is not None
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
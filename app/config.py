@@ -59,6 +59,16 @@ Config = {
             "admin_id": uuid.UUID(os.getenv("ADMIN_ID")),
             "notifications_api": os.getenv("NOTIFICATIONS_API"),
             "crux_api": os.getenv("CRUX_API"),
+            "upstream_timeout": float(os.getenv("UPSTREAM_TIMEOUT", default="30")),
+            "upstream_pool_size": int(os.getenv("UPSTREAM_POOL_SIZE", default="20")),
+            "upstream_max_concurrency": int(os.getenv("UPSTREAM_MAX_CONCURRENCY", default="16")),
+            "upstream_retries": int(os.getenv("UPSTREAM_RETRIES", default="2")),
+            "cache_l1_size": int(os.getenv("CACHE_L1_SIZE", default="10000")),
+            "cache_l1_timeout": int(os.getenv("CACHE_L1_TIMEOUT", default="60")),
+            "cache_codec": os.getenv("CACHE_CODEC", default="json"),
+            "cache_compress_threshold": int(os.getenv("CACHE_COMPRESS_THRESHOLD", default="0")),
+            "websocket_queue_size": int(os.getenv("WEBSOCKET_QUEUE_SIZE", default="100")),
+            "websocket_send_timeout": float(os.getenv("WEBSOCKET_SEND_TIMEOUT", default="5")),
         }
     ),
     "mainnet": dotdict(
@@ -80,6 +90,16 @@ Config = {
             "admin_id": uuid.UUID(os.getenv("ADMIN_ID")),
             "notifications_api": os.getenv("NOTIFICATIONS_API"),
             "crux_api": os.getenv("CRUX_API"),
+            "upstream_timeout": float(os.getenv("UPSTREAM_TIMEOUT", default="30")),
+            "upstream_pool_size": int(os.getenv("UPSTREAM_POOL_SIZE", default="20")),
+            "upstream_max_concurrency": int(os.getenv("UPSTREAM_MAX_CONCURRENCY", default="16")),
+            "upstream_retries": int(os.getenv("UPSTREAM_RETRIES", default="2")),
+            "cache_l1_size": int(os.getenv("CACHE_L1_SIZE", default="10000")),
+            "cache_l1_timeout": int(os.getenv("CACHE_L1_TIMEOUT", default="60")),
+            "cache_codec": os.getenv("CACHE_CODEC", default="json"),
+            "cache_compress_threshold": int(os.getenv("CACHE_COMPRESS_THRESHOLD", default="0")),
+            "websocket_queue_size": int(os.getenv("WEBSOCKET_QUEUE_SIZE", default="100")),
+            "websocket_send_timeout": float(os.getenv("WEBSOCKET_SEND_TIMEOUT", default="5")),
         }
     ),
 }
@@ -1,36 +1,167 @@
 import asyncio
+import json
 import time
 import threading
 import logging
+import random
 import traceback
+import uuid
 
+from cache.redis_client import redisClient
 
-def run_coroutine_in_sync(coroutine):
-    return asyncio.run(coroutine)
 
+METRICS_KEY = "scheduler_metrics"
+# extend or drop the lease only while it still holds our token
+RELEASE_LEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
 
-class AsyncTaskRunner():
-    TIMEOUT = 15  # run crons every 15 sec
 
-    def __init__(self):
+class Job:
+    def __init__(self, func, interval: float, jitter: float, lease_timeout: float):
+        self.func = func
+        self.name = func.__name__
+        self.interval = interval
+        self.jitter = jitter
+        self.lease_timeout = lease_timeout
+        self.lock = threading.Lock()
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_run = None
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def record(self, lag: float, duration: float, failed: bool):
+        with self.lock:
+            self.runs += 1
+            self.failures += 1 if failed else 0
+            self.last_run = time.time()
+            self.last_duration = duration
+            self.max_duration = max(self.max_duration, duration)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+
+    def dict(self):
+        with self.lock:
+            return {
+                "interval": self.interval,
+                "runs": self.runs,
+                "failures": self.failures,
+                "skipped": self.skipped,
+                "last_run": self.last_run,
+                "last_duration": self.last_duration,
+                "max_duration": self.max_duration,
+                "last_lag": self.last_lag,
+                "max_lag": self.max_lag,
+            }
+
+
+class JobScheduler:
+    """
+    Runs registered sync functions on the event loop's thread pool. A redis
+    lease per job makes each run happen on one worker of the cluster, and the
+    lease is held until interval seconds after the run ends.
+    """
+
+    def __init__(self, client=redisClient):
+        self.client = client
+        self.worker_id = uuid.uuid4().hex
+        self.jobs = {}
         self.tasks = []
 
-    @staticmethod
-    def wrapped_func(func):
+    def register(
+        self,
+        func,
+        interval: float = 15,
+        jitter: float = 0.1,
+        lease_timeout: float = 600,
+    ):
+        # lease_timeout frees the lease if the worker running the job dies
+        self.jobs[func.__name__] = Job(func, interval, jitter, lease_timeout)
+
+    def start(self):
+        loop = asyncio.get_event_loop()
+        for job in self.jobs.values():
+            self.tasks.append(loop.create_task(self.run_job(job)))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def metrics(self):
+        return {name: job.dict() for name, job in self.jobs.items()}
+
+    def cluster_metrics(self):
+        # jobs run in the worker process, api processes read what it published
+        return {
+            name.decode(): json.loads(value)
+            for name, value in self.client.hgetall(METRICS_KEY).items()
+        }
+
+    async def run_job(self, job: Job):
+        due = time.monotonic()
         while True:
             try:
-                func()
+                wait = await self.run_once(job, due)
             except Exception as e:
                 logging.error(traceback.format_exc())
-            time.sleep(AsyncTaskRunner.TIMEOUT)
+                wait = job.interval
+            wait *= 1 + random.uniform(-job.jitter, job.jitter)
+            due = time.monotonic() + wait
+            await asyncio.sleep(wait)
 
-    def register(self, func):
-        self.tasks.append(func)
+    async def run_once(self, job: Job, due: float):
+        """
+        Run the job if this worker gets the lease, returns seconds until the
+        next attempt
+        """
+        lease = "scheduler_lease_" + job.name
+        token = self.worker_id + ":" + uuid.uuid4().hex
+        acquired = await asyncio.to_thread(
+            self.client.set, lease, token, nx=True, px=int(job.lease_timeout * 1000)
+        )
+        if not acquired:
+            with job.lock:
+                job.skipped += 1
+            # retry once the run elsewhere is done and its interval has passed
+            remaining = await asyncio.to_thread(self.client.pttl, lease)
+            if remaining == -2:
+                # expired in between
+                return 0
+            return remaining / 1000 if remaining > 0 else job.interval
 
-    def start(self):
-        threads = []
-        for task in self.tasks:
-            threads.append(threading.Thread(
-                target=AsyncTaskRunner.wrapped_func, args=(task,)))
-        for thread in threads:
-            thread.start()
+        start = time.monotonic()
+        failed = False
+        try:
+            await asyncio.to_thread(job.func)
+        except Exception as e:
+            failed = True
+            logging.error(traceback.format_exc())
+        duration = time.monotonic() - start
+        job.record(max(start - due, 0), duration, failed)
+        await asyncio.to_thread(
+            self.client.hset,
+            METRICS_KEY,
+            job.name,
+            json.dumps({"worker": self.worker_id, **job.dict()}),
+        )
+        await asyncio.to_thread(
+            self.client.eval,
+            RELEASE_LEASE_SCRIPT,
+            1,
+            lease,
+            token,
+            int(job.interval * 1000),
+        )
+        return job.interval
+
+
+scheduler = JobScheduler()
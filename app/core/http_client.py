@@ -0,0 +1,107 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import Config, Network
+
+
+CFG = Config[Network]
+
+
+class UpstreamMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0  # transport failures and 5xx responses
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, elapsed: float, error: bool):
+        with self.lock:
+            self.requests += 1
+            if error:
+                self.errors += 1
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+
+    def dict(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "avg_time": self.total_time / self.requests if self.requests else 0,
+                "max_time": self.max_time,
+            }
+
+
+class UpstreamClient:
+    """
+    Shared connection pool, timeouts, retries, concurrency bound and metrics
+    for one upstream. Only idempotent requests are retried.
+    """
+
+    registry = {}
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float = CFG.upstream_timeout,
+        pool_size: int = CFG.upstream_pool_size,
+        max_concurrency: int = CFG.upstream_max_concurrency,
+        retries: int = CFG.upstream_retries,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                # a slow upstream is not retried, the timeout is raised as is
+                read=False,
+                backoff_factor=0.1,
+                status_forcelist=(502, 503, 504),
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.metrics = UpstreamMetrics()
+        UpstreamClient.registry[name] = self
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        error = True
+        try:
+            with self.semaphore:
+                res = self.session.request(method, url, **kwargs)
+            error = res.status_code >= 500
+            return res
+        finally:
+            self.metrics.record(time.perf_counter() - start, error)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+def upstream_metrics():
+    return {
+        name: client.metrics.dict() for name, client in UpstreamClient.registry.items()
+    }
+
+
+paideia_state = UpstreamClient("paideia_state")
+node = UpstreamClient("node")
+crux = UpstreamClient("crux")
+notifications = UpstreamClient("notifications")
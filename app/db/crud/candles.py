@@ -0,0 +1,74 @@
+import typing as t
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from db.models.tokenomics import TokenCandle
+
+###################################
+### CRUD OPERATIONS FOR CANDLES ###
+###################################
+
+
+def get_candles(
+    db: Session,
+    token_id: str,
+    resolution: str,
+    start_time: int = None,
+    end_time: int = None,
+    count: int = None,
+):
+    query = db.query(TokenCandle).filter(
+        TokenCandle.token_id == token_id, TokenCandle.resolution == resolution
+    )
+    if start_time is not None:
+        query = query.filter(TokenCandle.time >= start_time)
+    if end_time is not None:
+        query = query.filter(TokenCandle.time <= end_time)
+    if count is not None:
+        # the last count candles, gaps in the series do not shorten it
+        return query.order_by(TokenCandle.time.desc()).limit(count).all()[::-1]
+    return query.order_by(TokenCandle.time).all()
+
+
+def get_candle_time_ranges(db: Session, token_id: str):
+    return {
+        x[0]: (x[1], x[2])
+        for x in db.query(
+            TokenCandle.resolution, func.min(TokenCandle.time), func.max(TokenCandle.time)
+        )
+        .filter(TokenCandle.token_id == token_id)
+        .group_by(TokenCandle.resolution)
+        .all()
+    }
+
+
+def upsert_candles(db: Session, token_id: str, resolution: str, ohclv: dict):
+    # the latest candle is still open, so existing rows are overwritten
+    rows = [
+        {
+            "token_id": token_id,
+            "resolution": resolution,
+            "time": int(ohclv["t"][i]),
+            "open": ohclv["o"][i],
+            "high": ohclv["h"][i],
+            "low": ohclv["l"][i],
+            "close": ohclv["c"][i],
+            "volume": ohclv["v"][i],
+        }
+        for i in range(len(ohclv["t"]))
+    ]
+    if len(rows) == 0:
+        return
+    dialect = sqlite if db.bind.dialect.name == "sqlite" else postgresql
+    stmt = dialect.insert(TokenCandle).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["token_id", "resolution", "time"],
+        set_={
+            key: getattr(stmt.excluded, key)
+            for key in ["open", "high", "low", "close", "volume"]
+        },
+    )
+    db.execute(stmt)
+    db.commit()
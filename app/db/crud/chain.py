@@ -0,0 +1,71 @@
+import typing as t
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from db.models.chain import ChainBox, ChainToken
+
+#################################
+### CRUD OPERATIONS FOR CHAIN ###
+#################################
+
+
+def get_chain_boxes(db: Session, box_ids: t.List[str]):
+    if len(box_ids) == 0:
+        return {}
+    return {
+        x.box_id: x.data
+        for x in db.query(ChainBox).filter(ChainBox.box_id.in_(box_ids)).all()
+    }
+
+
+def get_chain_tokens(db: Session, token_ids: t.List[str]):
+    if len(token_ids) == 0:
+        return {}
+    return {
+        x.token_id: {
+            "id": x.token_id,
+            "name": x.name,
+            "description": x.description,
+            "decimals": x.decimals,
+            "emissionAmount": x.emission_amount,
+        }
+        for x in db.query(ChainToken).filter(ChainToken.token_id.in_(token_ids)).all()
+    }
+
+
+def add_chain_boxes(db: Session, boxes: t.List[dict]):
+    insert_ignore_existing(
+        db,
+        ChainBox,
+        [
+            {"box_id": x["boxId"], "inclusion_height": x["inclusionHeight"], "data": x}
+            for x in boxes
+        ],
+    )
+
+
+def add_chain_tokens(db: Session, tokens: t.List[dict]):
+    insert_ignore_existing(
+        db,
+        ChainToken,
+        [
+            {
+                "token_id": x["id"],
+                "name": x["name"],
+                "description": x["description"],
+                "decimals": x["decimals"],
+                "emission_amount": x["emissionAmount"],
+            }
+            for x in tokens
+        ],
+    )
+
+
+def insert_ignore_existing(db: Session, model, rows: t.List[dict]):
+    # rows are immutable so concurrent writers of the same id can safely skip
+    if len(rows) == 0:
+        return
+    dialect = sqlite if db.bind.dialect.name == "sqlite" else postgresql
+    db.execute(dialect.insert(model).values(rows).on_conflict_do_nothing())
+    db.commit()
@@ -2,6 +2,7 @@ import typing as t
 import uuid
 import urllib
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import or_
 from db.models.tokenomics import (
     Distribution,
     TokenHolder,
@@ -26,7 +27,7 @@ from db.schemas.dao import (
     TokenHolder as TokenHolderSchema,
     Distribution as DistributionSchema,
 )
-from ergo import crux_client
+from ergo import token_registry
 
 ################################
 ### CRUD OPERATIONS FOR DAOS ###
@@ -316,13 +317,13 @@ def get_dao_tokenomics(db: Session, dao_id: uuid.UUID):
     distributions = get_dao_tokenomics_distributions(db, db_tokenomics.id)
 
     if db_tokenomics.token_name == None:
-        token_info = crux_client.get_token_info(db_tokenomics.token_id)
+        token_info = token_registry.resolve(db_tokenomics.token_id, db)
         if token_info:
             return edit_dao_tokenomics(db, dao_id,
                                 CreateOrUpdateTokenomics(
                                     token_id=db_tokenomics.token_id,
-                                    token_name=token_info["token_name"],
-                                    token_ticker=get_token_ticker(token_info["token_name"]),
+                                    token_name=token_info["name"],
+                                    token_ticker=get_token_ticker(token_info["name"]),
                                     token_decimals=token_info["decimals"],
                                     token_holders=token_holders,
                                     distributions=distributions
@@ -609,6 +610,31 @@ def get_dao_by_url(db: Session, name: str):
     return get_dao(db, dao_id)
 
 
+def get_dao_ids_by_urls(db: Session, names: t.List[str]):
+    # the same match as get_dao_by_url for a batch of names, reading two columns only
+    names = set(names) - {"dao"}
+    if len(names) == 0:
+        return {}
+    quoted = {urllib.parse.quote(name): name for name in names}
+    # the url ends with the name as its last path segment, or is the name itself
+    matches = (
+        db.query(vw_daos.id, vw_daos.dao_url)
+        .filter(
+            or_(
+                vw_daos.dao_url.in_(list(quoted)),
+                *[vw_daos.dao_url.endswith("/" + x, autoescape=True) for x in quoted],
+            )
+        )
+        .all()
+    )
+    ret = {}
+    for dao_id, dao_url in matches:
+        name = quoted.get(dao_url.split("/")[-1]) if dao_url else None
+        if name is not None and name not in ret:
+            ret[name] = dao_id
+    return ret
+
+
 def create_dao(db: Session, dao: CreateOrUpdateDao):
     db_dao = Dao(
         dao_name=dao.dao_name,
@@ -694,6 +720,89 @@ def edit_dao(db: Session, id: uuid.UUID, dao: CreateOrUpdateDao):
     )
 
 
+def upsert_on_chain_daos(db: Session, daos: t.List[CreateOrUpdateDao]):
+    # applies on chain dao configs in a single transaction
+    # only the config backed columns are written, child rows like footer links,
+    # governance whitelist, token holders and distributions are left untouched
+    if len(daos) == 0:
+        return []
+    db_daos = {
+        x.dao_key: x
+        for x in db.query(Dao).filter(Dao.dao_key.in_([x.dao_key for x in daos])).all()
+    }
+    dao_ids = [x.id for x in db_daos.values()]
+    db_designs = {
+        x.dao_id: x
+        for x in db.query(DaoDesign).filter(DaoDesign.dao_id.in_(dao_ids)).all()
+    }
+    db_governances = {
+        x.dao_id: x
+        for x in db.query(Governance).filter(Governance.dao_id.in_(dao_ids)).all()
+    }
+    db_tokenomics = {
+        x.dao_id: x
+        for x in db.query(Tokenomics).filter(Tokenomics.dao_id.in_(dao_ids)).all()
+    }
+
+    created = []
+    try:
+        for dao in daos:
+            db_dao = db_daos.get(dao.dao_key)
+            is_new = db_dao is None
+            if is_new:
+                db_dao = Dao(id=uuid.uuid4())
+                created.append(db_dao.id)
+            update_data = dao.dict(
+                exclude_unset=not is_new, exclude={"design", "governance", "tokenomics"}
+            )
+            for key, value in update_data.items():
+                setattr(db_dao, key, value)
+            db.add(db_dao)
+
+            db_design = db_designs.get(db_dao.id)
+            if not db_design:
+                db_design = DaoDesign(dao_id=db_dao.id)
+            update_data = dao.design.dict(
+                exclude_unset=db_dao.id in db_designs, exclude={"footer_social_links"}
+            )
+            for key, value in update_data.items():
+                setattr(db_design, key, value)
+            db.add(db_design)
+
+            db_governance = db_governances.get(db_dao.id)
+            if not db_governance:
+                db_governance = Governance(dao_id=db_dao.id)
+            update_data = dao.governance.dict(
+                exclude_unset=db_dao.id in db_governances,
+                exclude={"governance_whitelist"},
+            )
+            for key, value in update_data.items():
+                setattr(db_governance, key, value)
+            db.add(db_governance)
+
+            db_token = db_tokenomics.get(db_dao.id)
+            if not db_token:
+                db_token = Tokenomics(dao_id=db_dao.id)
+            elif db_token.token_id != dao.tokenomics.token_id:
+                # token details are filled lazily by get_dao_tokenomics
+                db_token.token_name = None
+                db_token.token_ticker = None
+                db_token.token_decimals = None
+            update_data = dao.tokenomics.dict(
+                exclude_unset=db_dao.id in db_tokenomics,
+                exclude={"token_holders", "distributions"},
+            )
+            for key, value in update_data.items():
+                setattr(db_token, key, value)
+            db.add(db_token)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+
+    return created
+
+
 def delete_dao(db: Session, id: uuid.UUID):
     db_dao = db.query(Dao).filter(Dao.id == id).first()
     if not db_dao:
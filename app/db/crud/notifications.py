@@ -1,10 +1,18 @@
 import datetime
+import typing as t
 import uuid
+from collections import Counter
 from fastapi import status
 from starlette.responses import JSONResponse
+from sqlalchemy import case, delete, func, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
-from db.models.notifications import Notification
+from db.models.notifications import (
+    Notification,
+    NotificationSyncCursor,
+    NotificationUnreadCount,
+)
 from db.models.proposals import Proposal
 from db.schemas.notifications import (
     Notification as NotificationSchema,
@@ -16,20 +24,35 @@ from db.schemas.notifications import (
 ### CRUD OPERATIONS FOR NOTIFICATIONS ###
 #########################################
 
+CLEANUP_BATCH_SIZE = 5000
+
 
 def get_notification(db: Session, id: uuid.UUID):
     return db.query(Notification).filter(Notification.id == id).first()
 
 
 def get_notifications(
-    db: Session, user_details_id: uuid.UUID, skip: int = 0, limit: int = 10
+    db: Session,
+    user_details_id: uuid.UUID,
+    limit: int = 10,
+    before_date: datetime.datetime = None,
+    before_id: uuid.UUID = None,
 ):
-    res = (
+    """
+    Newest notifications first. Pass the date and id of the last notification
+    of a page to get the next one.
+    """
+    query = (
         db.query(Notification, Proposal)
         .join(Proposal, Notification.proposal_id == Proposal.id, isouter=True)
         .filter(Notification.user_details_id == user_details_id)
-        .order_by(Notification.date.desc())
-        .offset(skip)
+    )
+    if before_date is not None and before_id is not None:
+        query = query.filter(
+            tuple_(Notification.date, Notification.id) < tuple_(before_date, before_id)
+        )
+    res = (
+        query.order_by(Notification.date.desc(), Notification.id.desc())
         .limit(limit)
         .all()
     )
@@ -54,20 +77,129 @@ def get_notifications(
 def create_notification(
     db: Session, user_details_id: uuid.UUID, notification: CreateAndUpdateNotification
 ):
-    db_notification = Notification(
-        user_details_id=user_details_id,
-        img=notification.img,
-        action=notification.action,
-        proposal_id=notification.proposal_id,
-        transaction_id=notification.transaction_id,
-        href=notification.href,
-        additional_text=notification.additional_text,
-        is_read=False,
+    created = create_notifications(
+        db, [notification.copy(update={"user_details_id": user_details_id})]
     )
-    db.add(db_notification)
+    if len(created) == 0:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content="notification for this event already exists",
+        )
+    return created[0]
+
+
+def create_notifications(db: Session, notifications: t.List[CreateAndUpdateNotification]):
+    """
+    Inserts the notifications in one statement. Notifications for an event
+    that is already stored are skipped, only the inserted ones are returned.
+    """
+    date = datetime.datetime.now(datetime.timezone.utc)
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "user_details_id": x.user_details_id,
+            "img": x.img,
+            "action": x.action,
+            "proposal_id": x.proposal_id,
+            "transaction_id": x.transaction_id,
+            "href": x.href,
+            "additional_text": x.additional_text,
+            "is_read": False,
+            "date": date,
+            "event_id": x.event_id,
+        }
+        for x in notifications
+    ]
+    if len(rows) == 0:
+        return []
+    # ids and dates are set here so rows do not need to be read back
+    dialect = sqlite if db.bind.dialect.name == "sqlite" else postgresql
+    inserted = set(
+        db.execute(
+            dialect.insert(Notification)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["event_id"])
+            .returning(Notification.id)
+        ).scalars()
+    )
+    rows = [x for x in rows if x["id"] in inserted]
+    add_unread_counts(db, Counter(x["user_details_id"] for x in rows))
     db.commit()
-    db.refresh(db_notification)
-    return db_notification
+    proposal_ids = set(x["proposal_id"] for x in rows if x["proposal_id"])
+    proposal_names = dict(
+        db.query(Proposal.id, Proposal.name).filter(Proposal.id.in_(proposal_ids)).all()
+    ) if len(proposal_ids) > 0 else {}
+    return [
+        NotificationSchema(**x, proposal_name=proposal_names.get(x["proposal_id"]))
+        for x in rows
+    ]
+
+
+def get_unread_counts(db: Session, user_details_ids: t.List[uuid.UUID]):
+    if len(user_details_ids) == 0:
+        return {}
+    counts = dict(
+        db.query(
+            NotificationUnreadCount.user_details_id, NotificationUnreadCount.unread_count
+        )
+        .filter(NotificationUnreadCount.user_details_id.in_(user_details_ids))
+        .all()
+    )
+    missing = [x for x in user_details_ids if x not in counts]
+    if len(missing) > 0:
+        # users without a counter yet, counted from their notifications
+        counts.update(
+            db.query(Notification.user_details_id, func.count())
+            .filter(
+                Notification.user_details_id.in_(missing),
+                Notification.is_read == False,
+            )
+            .group_by(Notification.user_details_id)
+            .all()
+        )
+    return {x: counts.get(x, 0) for x in user_details_ids}
+
+
+def add_unread_counts(db: Session, changes: t.Dict[uuid.UUID, int]):
+    """
+    Applies the changes after the notifications were written in the same
+    transaction. A missing counter starts from the user's unread
+    notifications, which already include the change.
+    """
+    changes = {x: change for x, change in changes.items() if change != 0}
+    if len(changes) == 0:
+        return
+    # same row order in every writer to avoid deadlocks
+    user_details_ids = sorted(changes, key=str)
+    dialect = sqlite if db.bind.dialect.name == "sqlite" else postgresql
+    created = set(
+        db.execute(
+            dialect.insert(NotificationUnreadCount)
+            .from_select(
+                ["user_details_id", "unread_count"],
+                select(Notification.user_details_id, func.count())
+                .where(
+                    Notification.user_details_id.in_(user_details_ids),
+                    Notification.is_read == False,
+                )
+                .group_by(Notification.user_details_id),
+            )
+            .on_conflict_do_nothing(index_elements=["user_details_id"])
+            .returning(NotificationUnreadCount.user_details_id)
+        ).scalars()
+    )
+    # relative updates, so concurrent inserts and reads never overwrite each other
+    by_change = {}
+    for x in user_details_ids:
+        if x not in created:
+            by_change.setdefault(changes[x], []).append(x)
+    for change, ids in by_change.items():
+        unread_count = NotificationUnreadCount.unread_count + change
+        db.execute(
+            update(NotificationUnreadCount)
+            .where(NotificationUnreadCount.user_details_id.in_(ids))
+            .values(unread_count=case((unread_count < 0, 0), else_=unread_count))
+        )
 
 
 def edit_notification(db: Session, id: uuid.UUID, notification: CreateAndUpdateNotification):
@@ -77,24 +209,31 @@ def edit_notification(db: Session, id: uuid.UUID, notification: CreateAndUpdateN
             status_code=status.HTTP_404_NOT_FOUND, content="notification not found"
         )
 
+    was_read = db_notification.is_read
     update_data = notification.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_notification, key, value)
 
     db.add(db_notification)
+    if was_read != db_notification.is_read:
+        add_unread_counts(
+            db, {db_notification.user_details_id: 1 if was_read else -1}
+        )
     db.commit()
     db.refresh(db_notification)
     return db_notification
 
 
 def mark_all_as_read(db: Session, user_details_id: uuid.UUID):
-    db_notifications = db.query(Notification).filter(
-        Notification.user_details_id == user_details_id
-    ).all()
-    for db_notification in db_notifications:
-        setattr(db_notification, "is_read", True)
-        db.add(db_notification)
-
+    updated = db.execute(
+        update(Notification)
+        .where(
+            Notification.user_details_id == user_details_id,
+            Notification.is_read == False,
+        )
+        .values(is_read=True)
+    ).rowcount
+    add_unread_counts(db, {user_details_id: -updated})
     db.commit()
     return get_notifications(db, user_details_id)
 
@@ -106,29 +245,56 @@ def delete_notification(db: Session, id: uuid.UUID):
             status_code=status.HTTP_404_NOT_FOUND, content="notification not found"
         )
     db.delete(notification)
+    if not notification.is_read:
+        add_unread_counts(db, {notification.user_details_id: -1})
     db.commit()
     return notification
 
 
-def cleanup_notifications(db: Session):
-    # delete month old notifications
-    date = datetime.datetime.utcnow() - datetime.timedelta(30)
-    ret = {
-        "deleted_rows": db.query(Notification)
-        .filter(Notification.date <= date)
-        .delete()
-    }
-    db.commit()
-    return ret
+def cleanup_notifications(db: Session, batch_size: int = CLEANUP_BATCH_SIZE):
+    # delete month old notifications, oldest first in short transactions
+    date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(30)
+    deleted_rows = 0
+    while True:
+        ids = (
+            select(Notification.id)
+            .where(Notification.date <= date)
+            .order_by(Notification.date)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        deleted = db.execute(
+            delete(Notification)
+            .where(Notification.id.in_(ids))
+            .returning(Notification.user_details_id, Notification.is_read)
+        ).all()
+        unread = Counter(x[0] for x in deleted if not x[1])
+        add_unread_counts(db, {x: -count for x, count in unread.items()})
+        db.commit()
+        deleted_rows += len(deleted)
+        if len(deleted) < batch_size:
+            break
+    return {"deleted_rows": deleted_rows}
 
 
-def filter_additional_text_exists(db: Session, additional_text: str):
-    db_notifcation = db.query(Notification).filter(
-        Notification.additional_text == additional_text
+def get_sync_cursor(db: Session, plugin_name: str):
+    db_cursor = db.query(NotificationSyncCursor).filter(
+        NotificationSyncCursor.plugin_name == plugin_name
     ).first()
-    if db_notifcation:
-        return True
-    return False
+    return db_cursor.cursor if db_cursor else None
+
+
+def set_sync_cursor(db: Session, plugin_name: str, cursor: str):
+    dialect = sqlite if db.bind.dialect.name == "sqlite" else postgresql
+    stmt = dialect.insert(NotificationSyncCursor).values(
+        plugin_name=plugin_name, cursor=cursor
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["plugin_name"], set_={"cursor": stmt.excluded.cursor}
+        )
+    )
+    db.commit()
 
 
 def generate_action(username: str, action: str):
@@ -7,14 +7,9 @@ from fastapi import status
 from fastapi.encoders import jsonable_encoder
 from starlette.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy.sql import or_
-from db.crud.users import (
-    get_followers_by_user_id,
-    get_proposals_by_user_id,
-    get_primary_wallet_address_by_user_id,
-    get_user_details_by_id,
-)
-from db.models.users import UserDetails
+from sqlalchemy.sql import case, func, or_
+from db.crud.activity_log import create_user_activity
+from db.models.users import UserDetails, UserFollower
 from db.models.proposals import (
     Proposal,
     ProposalReference,
@@ -24,9 +19,11 @@ from db.models.proposals import (
     Addendum,
     ProposalCommentLike,
 )
+from db.schemas.activity import CreateOrUpdateActivity, ActivityConstants
 from db.schemas.proposal import (
     ProposalReference as ProposalReferenceSchema,
     Proposal as ProposalSchema,
+    ProposalSummary as ProposalSummarySchema,
     CreateProposal as CreateProposalSchema,
     Comment as CommentSchema,
     UpdateProposalBasic as UpdateProposalBasicSchema,
@@ -333,63 +330,201 @@ def get_proposal_by_id(db: Session, id: uuid.UUID):
         return JSONResponse(
             status_code=status.HTTP_404_NOT_FOUND, content="proposal not found"
         )
-    likes = get_likes_by_proposal_id(db, id)
-    followers = get_followers_by_proposal_id(db, id)
-    references = get_references_by_proposal_id(db, id)
-    referenced = get_referenced_by_proposal_id(db, id)
-    comments = get_comments_by_proposal_id(db, id)
-    addendums = get_addendums_by_proposal_id(db, id)
-    tags = db_proposal.tags["tags_list"] if "tags_list" in db_proposal.tags else []
-    attachments = (
-        db_proposal.attachments["attachments_list"]
-        if "attachments_list" in db_proposal.attachments
-        else []
+    return hydrate_proposals(db, [db_proposal])[0]
+
+
+def hydrate_proposals(db: Session, db_proposals: t.List[Proposal]):
+    # builds full proposal schemas for a set of proposals
+    # every child collection is loaded with one IN (...) query for the whole set
+    # so the number of round trips does not depend on len(db_proposals)
+    if len(db_proposals) == 0:
+        return []
+    ids = [x.id for x in db_proposals]
+
+    # references in both directions
+    db_references = (
+        db.query(ProposalReference)
+        .filter(
+            or_(
+                ProposalReference.referring_proposal_id.in_(ids),
+                ProposalReference.referred_proposal_id.in_(ids),
+            )
+        )
+        .all()
     )
-    actions = (
-        db_proposal.actions["actions_list"]
-        if "actions_list" in db_proposal.actions
-        else []
+    references = {id: [] for id in ids}
+    referenced = {id: [] for id in ids}
+    for x in db_references:
+        if x.referring_proposal_id in references:
+            references[x.referring_proposal_id].append(x.referred_proposal_id)
+        if x.referred_proposal_id in referenced:
+            referenced[x.referred_proposal_id].append(x.referring_proposal_id)
+
+    # meta for referenced proposals that are not part of the current set
+    meta_proposals = {x.id: x for x in db_proposals}
+    missing_ids = set()
+    for x in db_references:
+        missing_ids.add(x.referring_proposal_id)
+        missing_ids.add(x.referred_proposal_id)
+    missing_ids -= meta_proposals.keys()
+    if len(missing_ids) > 0:
+        for x in db.query(Proposal).filter(Proposal.id.in_(missing_ids)).all():
+            meta_proposals[x.id] = x
+
+    # likes for the proposals and everything they reference
+    likes = {id: {"likes": [], "dislikes": []} for id in meta_proposals}
+    db_likes = (
+        db.query(ProposalLike)
+        .filter(ProposalLike.proposal_id.in_(list(meta_proposals.keys())))
+        .all()
     )
-    votes = (
-        db_proposal.votes["votes"]
-        if "votes" in db_proposal.votes
-        else []
+    for x in db_likes:
+        if x.liked:
+            likes[x.proposal_id]["likes"].append(x.user_details_id)
+        elif x.liked == False:
+            likes[x.proposal_id]["dislikes"].append(x.user_details_id)
+
+    followers = {id: [] for id in ids}
+    db_followers = (
+        db.query(ProposalFollower).filter(ProposalFollower.proposal_id.in_(ids)).all()
     )
-    user_details = get_user_details_by_id(db, db_proposal.user_details_id)
-    proposal = ProposalSchema(
-        id=db_proposal.id,
-        on_chain_id=db_proposal.on_chain_id,
-        box_height=db_proposal.box_height,
-        votes=votes,
-        dao_id=db_proposal.dao_id,
-        user_details_id=db_proposal.user_details_id,
-        name=db_proposal.name,
-        image_url=db_proposal.image_url,
-        category=db_proposal.category,
-        content=db_proposal.content,
-        voting_system=db_proposal.voting_system,
-        references=references["references"],
-        references_meta=references["references_meta"],
-        referenced=referenced["referenced"],
-        referenced_meta=referenced["referenced_meta"],
-        actions=actions,
-        comments=comments,
-        likes=likes["likes"],
-        dislikes=likes["dislikes"],
-        followers=followers["followers"],
-        tags=tags,
-        attachments=attachments,
-        addendums=addendums,
-        date=db_proposal.date,
-        end_date=db_proposal.end_date,
-        status=db_proposal.status,
-        is_proposal=db_proposal.is_proposal,
-        profile_img_url=user_details.profile_img_url,
-        alias=user_details.name,
-        user_followers=get_followers_by_user_id(db, user_details.id)["followers"],
-        created=len(get_proposals_by_user_id(db, user_details.id)),
+    for x in db_followers:
+        followers[x.proposal_id].append(x.user_details_id)
+
+    # comments with author details and comment likes
+    db_comments = (
+        db.query(Comment, UserDetails.name, UserDetails.profile_img_url)
+        .filter(Comment.proposal_id.in_(ids))
+        .join(UserDetails, Comment.user_details_id == UserDetails.id)
+        .all()
+    )
+    comment_likes = {x[0].id: {"likes": [], "dislikes": []} for x in db_comments}
+    if len(comment_likes) > 0:
+        db_comment_likes = (
+            db.query(ProposalCommentLike)
+            .filter(ProposalCommentLike.comment_id.in_(list(comment_likes.keys())))
+            .all()
+        )
+        for x in db_comment_likes:
+            if x.liked:
+                comment_likes[x.comment_id]["likes"].append(x.user_details_id)
+            elif x.liked == False:
+                comment_likes[x.comment_id]["dislikes"].append(x.user_details_id)
+    comments = {id: [] for id in ids}
+    for comment in db_comments:
+        comments[comment[0].proposal_id].append(
+            CommentSchema(
+                id=comment[0].id,
+                proposal_id=comment[0].proposal_id,
+                date=comment[0].date,
+                user_details_id=comment[0].user_details_id,
+                parent=comment[0].parent,
+                comment=comment[0].comment,
+                profile_img_url=comment[2],
+                alias=comment[1],
+                likes=comment_likes[comment[0].id]["likes"],
+                dislikes=comment_likes[comment[0].id]["dislikes"],
+            )
+        )
+
+    addendums = {id: [] for id in ids}
+    for x in db.query(Addendum).filter(Addendum.proposal_id.in_(ids)).all():
+        addendums[x.proposal_id].append(x)
+
+    # authors, their followers and their proposal counts
+    user_details_ids = list(set(x.user_details_id for x in db_proposals))
+    user_details = {
+        x.id: x
+        for x in db.query(UserDetails)
+        .filter(UserDetails.id.in_(user_details_ids))
+        .all()
+    }
+    user_followers = {id: [] for id in user_details_ids}
+    db_user_followers = (
+        db.query(UserFollower)
+        .filter(UserFollower.followee_id.in_(user_details_ids))
+        .all()
+    )
+    for x in db_user_followers:
+        user_followers[x.followee_id].append(x.follower_id)
+    created = dict(
+        db.query(Proposal.user_details_id, func.count(Proposal.id))
+        .filter(Proposal.user_details_id.in_(user_details_ids))
+        .group_by(Proposal.user_details_id)
+        .all()
     )
-    return proposal
+
+    def reference_meta(reference_ids: t.List[uuid.UUID]):
+        return [
+            ProposalReferenceSchema(
+                id=meta_proposals[x].id,
+                name=meta_proposals[x].name,
+                img=meta_proposals[x].image_url,
+                likes=likes[x]["likes"],
+                dislikes=likes[x]["dislikes"],
+                status=meta_proposals[x].status,
+                is_proposal=meta_proposals[x].is_proposal,
+            )
+            for x in reference_ids
+            if x in meta_proposals
+        ]
+
+    proposals = []
+    for db_proposal in db_proposals:
+        id = db_proposal.id
+        tags = db_proposal.tags["tags_list"] if "tags_list" in db_proposal.tags else []
+        attachments = (
+            db_proposal.attachments["attachments_list"]
+            if "attachments_list" in db_proposal.attachments
+            else []
+        )
+        actions = (
+            db_proposal.actions["actions_list"]
+            if "actions_list" in db_proposal.actions
+            else []
+        )
+        votes = (
+            db_proposal.votes["votes"]
+            if "votes" in db_proposal.votes
+            else []
+        )
+        author = user_details[db_proposal.user_details_id]
+        proposals.append(
+            ProposalSchema(
+                id=db_proposal.id,
+                on_chain_id=db_proposal.on_chain_id,
+                box_height=db_proposal.box_height,
+                votes=votes,
+                dao_id=db_proposal.dao_id,
+                user_details_id=db_proposal.user_details_id,
+                name=db_proposal.name,
+                image_url=db_proposal.image_url,
+                category=db_proposal.category,
+                content=db_proposal.content,
+                voting_system=db_proposal.voting_system,
+                references=references[id],
+                references_meta=reference_meta(references[id]),
+                referenced=referenced[id],
+                referenced_meta=reference_meta(referenced[id]),
+                actions=actions,
+                comments=comments[id],
+                likes=likes[id]["likes"],
+                dislikes=likes[id]["dislikes"],
+                followers=followers[id],
+                tags=tags,
+                attachments=attachments,
+                addendums=addendums[id],
+                date=db_proposal.date,
+                end_date=db_proposal.end_date,
+                status=db_proposal.status,
+                is_proposal=db_proposal.is_proposal,
+                profile_img_url=author.profile_img_url,
+                alias=author.name,
+                user_followers=user_followers[author.id],
+                created=created.get(author.id, 0),
+            )
+        )
+    return proposals
 
 
 def get_proposal_by_slug(db: Session, slug: str):
@@ -405,8 +540,69 @@ def get_proposal_by_slug(db: Session, slug: str):
 
 def get_proposals_by_dao_id(db: Session, dao_id: uuid.UUID):
     db_proposals = db.query(Proposal).filter(Proposal.dao_id == dao_id).all()
-    proposals = list(map(lambda x: get_proposal_by_id(db, x.id), db_proposals))
-    return proposals
+    return hydrate_proposals(db, db_proposals)
+
+
+def get_proposal_summaries_by_dao_id(db: Session, dao_id: uuid.UUID):
+    # list view projection, counts are aggregated in a single statement
+    likes = (
+        db.query(
+            ProposalLike.proposal_id,
+            func.count(case((ProposalLike.liked == True, 1))).label("likes"),
+            func.count(case((ProposalLike.liked == False, 1))).label("dislikes"),
+        )
+        .group_by(ProposalLike.proposal_id)
+        .subquery()
+    )
+    followers = (
+        db.query(
+            ProposalFollower.proposal_id,
+            func.count(ProposalFollower.id).label("followers"),
+        )
+        .group_by(ProposalFollower.proposal_id)
+        .subquery()
+    )
+    comments = (
+        db.query(Comment.proposal_id, func.count(Comment.id).label("comments"))
+        .group_by(Comment.proposal_id)
+        .subquery()
+    )
+    db_summaries = (
+        db.query(
+            Proposal,
+            func.coalesce(likes.c.likes, 0),
+            func.coalesce(likes.c.dislikes, 0),
+            func.coalesce(followers.c.followers, 0),
+            func.coalesce(comments.c.comments, 0),
+        )
+        .outerjoin(likes, likes.c.proposal_id == Proposal.id)
+        .outerjoin(followers, followers.c.proposal_id == Proposal.id)
+        .outerjoin(comments, comments.c.proposal_id == Proposal.id)
+        .filter(Proposal.dao_id == dao_id)
+        .all()
+    )
+    return list(
+        map(
+            lambda x: ProposalSummarySchema(
+                id=x[0].id,
+                dao_id=x[0].dao_id,
+                on_chain_id=x[0].on_chain_id,
+                user_details_id=x[0].user_details_id,
+                name=x[0].name,
+                image_url=x[0].image_url,
+                category=x[0].category,
+                status=x[0].status,
+                is_proposal=x[0].is_proposal,
+                date=x[0].date,
+                end_date=x[0].end_date,
+                likes=x[1],
+                dislikes=x[2],
+                followers=x[3],
+                comments=x[4],
+            ),
+            db_summaries,
+        )
+    )
 
 
 def create_new_proposal(db: Session, proposal: CreateProposalSchema):
@@ -435,6 +631,36 @@ def create_new_proposal(db: Session, proposal: CreateProposalSchema):
     return get_proposal_by_id(db, db_proposal.id)
 
 
+def create_new_proposal_with_activity(db: Session, proposal: CreateProposalSchema):
+    db_proposal = create_new_proposal(db, proposal)
+    # add to activities
+    if type(db_proposal) != JSONResponse:
+        activity = CreateOrUpdateActivity(
+            user_details_id=proposal.user_details_id,
+            action=ActivityConstants.CREATED_DISCUSSION,
+            value=db_proposal.name,
+            category=ActivityConstants.PROPOSAL_CATEGORY,
+            link=str(db_proposal.id),
+        )
+        create_user_activity(db, proposal.user_details_id, activity)
+    return db_proposal
+
+
+def proposal_status(status_code: int) -> str:
+    # passed value of an on chain proposal
+    match status_code:
+        case -2:
+            return "Failed - Quorum"
+        case -1:
+            return "Active"
+        case 0:
+            return "Failed - Vote"
+        case 1:
+            return "Passed"
+        case _:
+            return "Unknown"
+
+
 def create_proposal_references(db: Session, id: uuid.UUID, references: t.List[uuid.UUID]):
     for reference in references:
         temp_proposal = get_proposal_by_id(db, reference)
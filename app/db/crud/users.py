@@ -118,6 +118,26 @@ def get_user_by_wallet_addresses(db: Session, addresses: t.List[str]):
     return user[0]
 
 
+def get_user_details_ids_by_addresses(
+    db: Session, addresses: t.List[str], dao_ids: t.List[uuid.UUID]
+):
+    # (address, dao_id) -> user_details_id for every pair with a profile
+    if len(addresses) == 0 or len(dao_ids) == 0:
+        return {}
+    return {
+        (x[0], x[1]): x[2]
+        for x in db.query(
+            models.ErgoAddress.address,
+            models.UserDetails.dao_id,
+            models.UserDetails.id,
+        )
+        .filter(models.UserDetails.user_id == models.ErgoAddress.user_id)
+        .filter(models.ErgoAddress.address.in_(set(addresses)))
+        .filter(models.UserDetails.dao_id.in_(set(dao_ids)))
+        .all()
+    }
+
+
 def get_primary_wallet_address_by_user_id(db: Session, user_id: uuid.UUID):
     db_ret = (
         db.query(models.User, models.ErgoAddress)
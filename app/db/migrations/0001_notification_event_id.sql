@@ -0,0 +1,26 @@
+-- notifications synced from chain events are deduplicated by event_id,
+-- the sync resumes from a cursor per plugin
+
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS event_id VARCHAR;
+
+-- rows synced before carry the event in additional_text as
+-- "eventId=<id>&timestamp=<timestamp>", the oldest row of an event keeps it
+UPDATE notifications n
+SET event_id = e.event_id
+FROM (
+    SELECT DISTINCT ON (event_id) id, event_id
+    FROM (
+        SELECT id, date, substring(additional_text FROM '^eventId=([^&]*)') AS event_id
+        FROM notifications
+        WHERE event_id IS NULL AND additional_text LIKE 'eventId=%'
+    ) parsed
+    ORDER BY event_id, date, id
+) e
+WHERE n.id = e.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_notifications_event_id ON notifications (event_id);
+
+CREATE TABLE IF NOT EXISTS notification_sync_cursors (
+    plugin_name VARCHAR PRIMARY KEY,
+    cursor VARCHAR
+);
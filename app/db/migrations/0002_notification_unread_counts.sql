@@ -0,0 +1,18 @@
+-- keyset pages per user, date ranged cleanup and unread counters per user
+
+CREATE INDEX IF NOT EXISTS ix_notifications_user_details_id_date_id
+    ON notifications (user_details_id, date, id);
+CREATE INDEX IF NOT EXISTS ix_notifications_date ON notifications (date);
+
+CREATE TABLE IF NOT EXISTS notification_unread_counts (
+    user_details_id UUID PRIMARY KEY,
+    unread_count INTEGER
+);
+
+-- counters of existing notifications, users missing here are counted on first use
+INSERT INTO notification_unread_counts (user_details_id, unread_count)
+SELECT user_details_id, COUNT(*)
+FROM notifications
+WHERE is_read = false AND user_details_id IS NOT NULL
+GROUP BY user_details_id
+ON CONFLICT (user_details_id) DO NOTHING;
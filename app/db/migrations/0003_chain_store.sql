@@ -0,0 +1,15 @@
+-- confirmed boxes and token metadata, immutable once stored
+
+CREATE TABLE IF NOT EXISTS chain_boxes (
+    box_id VARCHAR PRIMARY KEY,
+    inclusion_height INTEGER,
+    data JSON
+);
+
+CREATE TABLE IF NOT EXISTS chain_tokens (
+    token_id VARCHAR PRIMARY KEY,
+    name VARCHAR,
+    description VARCHAR,
+    decimals INTEGER,
+    emission_amount BIGINT
+);
@@ -0,0 +1,13 @@
+-- ohlcv candles per token and resolution, bars are final once the next one starts
+
+CREATE TABLE IF NOT EXISTS token_candles (
+    token_id VARCHAR NOT NULL,
+    resolution VARCHAR NOT NULL,
+    time BIGINT NOT NULL,
+    open FLOAT,
+    high FLOAT,
+    low FLOAT,
+    close FLOAT,
+    volume FLOAT,
+    PRIMARY KEY (token_id, resolution, time)
+);
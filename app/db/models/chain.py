@@ -0,0 +1,23 @@
+from sqlalchemy import BigInteger, Column, Integer, String, JSON
+
+from db.session import Base
+
+# CONFIRMED CHAIN DATA, IMMUTABLE ONCE STORED
+
+
+class ChainBox(Base):
+    __tablename__ = "chain_boxes"
+
+    box_id = Column(String, primary_key=True)
+    inclusion_height = Column(Integer)
+    data = Column(JSON)
+
+
+class ChainToken(Base):
+    __tablename__ = "chain_tokens"
+
+    token_id = Column(String, primary_key=True)
+    name = Column(String)
+    description = Column(String)
+    decimals = Column(Integer)
+    emission_amount = Column(BigInteger)
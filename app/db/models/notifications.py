@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
 from sqlalchemy.sql import func
 import uuid
 from sqlalchemy.dialects.postgresql import UUID
@@ -9,6 +9,13 @@ from db.session import Base
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # keyset pagination per user and date ranged cleanup
+        Index("ix_notifications_user_details_id_date_id", "user_details_id", "date", "id"),
+        Index("ix_notifications_date", "date"),
+        # an event is stored once, see db/migrations/0001_notification_event_id.sql
+        Index("ix_notifications_event_id", "event_id", unique=True),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
     user_details_id = Column(UUID(as_uuid=True))
@@ -23,3 +30,19 @@ class Notification(Base):
 
     date = Column(DateTime(timezone=True), server_default=func.now())
     is_read = Column(Boolean)
+    # id of the synced chain event
+    event_id = Column(String)
+
+
+class NotificationSyncCursor(Base):
+    __tablename__ = "notification_sync_cursors"
+
+    plugin_name = Column(String, primary_key=True)
+    cursor = Column(String)
+
+
+class NotificationUnreadCount(Base):
+    __tablename__ = "notification_unread_counts"
+
+    user_details_id = Column(UUID(as_uuid=True), primary_key=True)
+    unread_count = Column(Integer)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, Float
+from sqlalchemy import BigInteger, Boolean, Column, Integer, String, Float
 import uuid
 from sqlalchemy.dialects.postgresql import UUID
 from db.session import Base
@@ -74,3 +74,16 @@ class DistributionConfig(Base):
     property_name = Column(String)
     property_value = Column(String)
     property_data_type = Column(String)
+
+
+class TokenCandle(Base):
+    __tablename__ = "token_candles"
+
+    token_id = Column(String, primary_key=True)
+    resolution = Column(String, primary_key=True)
+    time = Column(BigInteger, primary_key=True)
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float)
+    volume = Column(Float)
@@ -30,6 +30,7 @@ class CreateAndUpdateNotification(BaseModel):
     href: t.Optional[str]
     additional_text: t.Optional[str]
     is_read: bool = False
+    event_id: t.Optional[str]
 
 
 class Notification(CreateAndUpdateNotification):
@@ -146,6 +146,27 @@ class Proposal(CreateOrUpdateProposal):
     class Config:
         orm_mode = True
 
+class ProposalSummary(BaseModel):
+    id: uuid.UUID
+    dao_id: uuid.UUID
+    on_chain_id: t.Optional[int]
+    user_details_id: uuid.UUID
+    name: str
+    image_url: t.Optional[str]
+    category: t.Optional[str]
+    status: t.Optional[str]
+    is_proposal: bool = False
+    date: datetime.datetime
+    end_date: t.Optional[datetime.datetime]
+    likes: int = 0
+    dislikes: int = 0
+    followers: int = 0
+    comments: int = 0
+
+    class Config:
+        orm_mode = True
+
+
 class ProposalVote(BaseModel):
     stake_key: str
     vote: t.List[int]
@@ -1,10 +1,10 @@
-import requests
+from core.http_client import crux
 import logging
 
 from config import Config, Network
 
 def get_token_info(token_id: str):
-    res = requests.get(Config[Network].crux_api + "/crux/token_info/" + token_id)
+    res = crux.get(Config[Network].crux_api + "/crux/token_info/" + token_id)
     if res.ok:
         return res.json()
     else:
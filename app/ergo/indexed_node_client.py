@@ -1,51 +1,156 @@
-import requests
+import logging
+import threading
+import time
+import traceback
+import typing as t
 
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
+
+from core.http_client import node
 from cache.cache import cache
+from cache.lru import LRUCache
 from config import Config, Network
+from db.crud.chain import add_chain_boxes, get_chain_boxes
+from db.session import SessionLocal
 
-def get_token_info(token_id: str):
-    cached = cache.get("get_token_info_" + token_id)
-    if cached:
-        return cached
-    #res = requests.get(Config[Network].node+":9053/blockchain/token/byId/"+token_id)
-    res = requests.get("https://api.cruxfinance.io/crux/token_info/"+token_id)
-    if res.ok:      
-        #temp fix start#
-        resJson = res.json()
-        token_info = {
-        "id": token_id,
-        "boxId": token_id,
-        "emissionAmount": resJson["minted"],
-        "name": resJson["token_name"],
-        "description": resJson["token_description"],
-        "decimals": resJson["decimals"]
-        }
-        ##temp fix end##
-        
-        #token_info = res.json()
-        
-        cache.set("get_token_info_" + token_id, token_info)
-        return token_info
-    else:
-        return None
-    
-def get_balance(address: str):
-    res = requests.post(Config[Network].node+"/blockchain/balance", data=address)
+
+CHAIN_FETCH_WORKERS = 16
+HEIGHT_POLL_INTERVAL = 5
+# upper bound only, entries are replaced as soon as a new height is seen
+BALANCE_CACHE_TIMEOUT = 600
+height_lock = threading.Lock()
+height_state = {"height": None, "polled": 0.0}
+# confirmed boxes never change, the lru fronts the chain_boxes table
+box_lru = LRUCache(10000)
+
+def get_height():
+    """
+    Node height, polled from /info at most every HEIGHT_POLL_INTERVAL seconds
+    """
+    with height_lock:
+        if time.monotonic() - height_state["polled"] < HEIGHT_POLL_INTERVAL:
+            return height_state["height"]
+        # claim the poll, other threads keep the last known height meanwhile
+        height_state["polled"] = time.monotonic()
+    try:
+        res = node.get(Config[Network].node+"/info")
+        if res.ok:
+            height = res.json()["fullHeight"]
+            with height_lock:
+                height_state["height"] = height
+    except Exception as e:
+        logging.error(f"get_height: {str(e)}")
+    return height_state["height"]
+
+def fetch_balance(address: str):
+    res = node.post(Config[Network].node+"/blockchain/balance", data=address)
     if res.ok:
         return res.json()
     else:
         return None
+
+def get_balance(address: str, unconfirmed: bool = False):
+    """
+    Balance served from cache until a new block is seen. The unconfirmed part
+    of a cached balance is as of when it was fetched, pass unconfirmed=True
+    to refresh it.
+    """
+    if unconfirmed:
+        return get_balances_at_height([address], get_height(), True).get(address)
+    return get_balances([address]).get(address)
+
+def get_balances(addresses: t.List[str]):
+    return get_balances_at_height(addresses, get_height())
+
+def get_balances_at_height(addresses: t.List[str], height: int, refresh: bool = False):
+    addresses = list(dict.fromkeys(addresses))
+    balances = {}
+    if not refresh:
+        cached = cache.get_many(["get_balance_" + x for x in addresses])
+        # entries from a later height written by a worker that polled sooner are fine too
+        balances = {
+            x: entry["balance"]
+            for x, entry in zip(addresses, cached)
+            if entry is not None and height is not None and entry["height"] >= height
+        }
+    missing = [x for x in addresses if x not in balances]
+    if len(missing) > 0:
+        with ThreadPoolExecutor(max_workers=min(CHAIN_FETCH_WORKERS, len(missing))) as executor:
+            fetched = dict(zip(missing, executor.map(fetch_balance, missing)))
+        found = {x: balance for x, balance in fetched.items() if balance is not None}
+        if len(found) > 0 and height is not None:
+            cache.set_many(
+                {"get_balance_" + x: {"height": height, "balance": balance} for x, balance in found.items()},
+                BALANCE_CACHE_TIMEOUT,
+            )
+        balances.update(found)
+    return balances
     
 def get_transactions(address: str, offset: int, limit: int):
-    res = requests.post(Config[Network].node+'/blockchain/transaction/byAddress?offset='+str(offset)+'&limit='+str(limit), data=address)
+    res = node.post(Config[Network].node+'/blockchain/transaction/byAddress?offset='+str(offset)+'&limit='+str(limit), data=address)
     if res.ok:
         return res.json()
     else:
         return None
-    
-def get_box_by_id(boxId: str):
-    res = requests.get(Config[Network].node+'/blockchain/box/byId/'+boxId)
+
+def get_box_by_id(boxId: str, db: Session = None):
+    return get_boxes_by_ids([boxId], db)[boxId]
+
+def get_boxes_by_ids(boxIds: t.List[str], db: Session = None):
+    """
+    Boxes by id, served from the lru and chain_boxes table when confirmed.
+    spentTransactionId is left out since it changes once the box is spent.
+    """
+    return with_session(db, get_boxes_from_store, boxIds)
+
+def get_boxes_from_store(db: Session, boxIds: t.List[str]):
+    boxIds = list(dict.fromkeys(boxIds))
+    found = {id: box_lru.get(id) for id in boxIds}
+    missing = [id for id in boxIds if found[id] is None]
+    if len(missing) > 0:
+        stored = get_chain_boxes(db, missing)
+        for id, box in stored.items():
+            box_lru.set(id, box)
+        found.update(stored)
+        missing = [id for id in missing if id not in stored]
+    if len(missing) > 0:
+        with ThreadPoolExecutor(max_workers=min(CHAIN_FETCH_WORKERS, len(missing))) as executor:
+            fetched = list(executor.map(fetch_box, missing))
+        found.update(zip(missing, fetched))
+        store_confirmed_boxes(db, [x for x in fetched if x is not None])
+    return {id: immutable_box(found[id]) if found[id] else None for id in boxIds}
+
+def fetch_box(boxId: str):
+    res = node.get(Config[Network].node+'/blockchain/box/byId/'+boxId)
     if res.ok:
         return res.json()
     else:
-        return None
\ No newline at end of file
+        return None
+
+def with_session(db: Session, func, *args):
+    if db is not None:
+        return func(db, *args)
+    db = SessionLocal()
+    try:
+        return func(db, *args)
+    finally:
+        db.close()
+
+def store_confirmed_boxes(db: Session, boxes: t.List[dict]):
+    # only boxes included in a block are final, mempool ones are refetched
+    confirmed = [immutable_box(x) for x in boxes if x.get("inclusionHeight")]
+    confirmed = [x for x in confirmed if box_lru.get(x["boxId"]) is None]
+    if len(confirmed) == 0:
+        return
+    try:
+        add_chain_boxes(db, confirmed)
+    except Exception:
+        db.rollback()
+        logging.error(traceback.format_exc())
+        return
+    for x in confirmed:
+        box_lru.set(x["boxId"], x)
+
+def immutable_box(box: dict):
+    return {k: v for k, v in box.items() if k != "spentTransactionId"}
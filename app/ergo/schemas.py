@@ -12,6 +12,10 @@ class AddressTokenList(BaseModel):
     tokens: t.List[str]
 
 
+class TokenIdList(BaseModel):
+    token_ids: t.List[str]
+
+
 class TokenPriceRangeDataPoint(BaseModel):
     high: t.Optional[float]
     low: t.Optional[float]
@@ -63,3 +67,26 @@ class TokenStats(BaseModel):
     market_cap: TokenMarketCap
     token_supply: TokenSupplyStats
     token_markets: t.List[TokenMarketSpecificStats]
+    custom_range: t.Optional[TokenPriceRangeSummaryDataPoint]
+
+
+class TokenStatsBatch(BaseModel):
+    stats: t.Dict[str, TokenStats]
+    errors: t.Dict[str, str]
+
+class TokenCandle(BaseModel):
+    time: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+    class Config:
+        orm_mode = True
+
+
+class TokenHistory(BaseModel):
+    token_id: str
+    resolution: str
+    candles: t.List[TokenCandle]
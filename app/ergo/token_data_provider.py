@@ -1,17 +1,22 @@
 import datetime
-import requests
 import logging
 import traceback
+import typing as t
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session
 
 from config import Config, Network
+from core.http_client import crux
 from cache.cache import cache
-from db.session import get_db
+from db.session import SessionLocal, get_db
+from db.crud.candles import get_candles, get_candle_time_ranges, upsert_candles
 from db.models.tokenomics import Tokenomics
 from ergo.schemas import TokenStats, TokenPriceHistorySummary, TokenSupplyStats, TokenMarketCap, TokenPriceRangeSummaryDataPoint, TokenMarketSpecificStats
 
 
 CFG = Config[Network]
+TOKEN_STATS_WORKERS = 4
 
 
 class DataProviderException(Exception):
@@ -36,7 +41,7 @@ class BaseDataProvider:
     @staticmethod
     def get_ergo_price():
         try:
-            resp = requests.get(
+            resp = crux.get(
                 f"{BaseDataProvider.CRUX_API}/coingecko/erg_price"
             )
             if (resp.status_code != 200):
@@ -48,7 +53,7 @@ class BaseDataProvider:
     @staticmethod
     def get_token_details_by_id(token_id: str):
         try:
-            resp = requests.get(
+            resp = crux.get(
                 f"{BaseDataProvider.CRUX_API}/crux/token_info/{token_id}"
             )
             if (resp.status_code != 200):
@@ -60,7 +65,7 @@ class BaseDataProvider:
     @staticmethod
     def get_ohclv_by_token_name(token_name: str, start_time: int, end_time: int, resolution: str, countback: int):
         try:
-            resp = requests.get(
+            resp = crux.get(
                 f"{BaseDataProvider.CRUX_API}/trading_view/history?symbol={token_name}_ERG&resolution={resolution}&from={start_time}&to={end_time}&countback={countback}"
             )
             if (resp.status_code != 200):
@@ -70,29 +75,159 @@ class BaseDataProvider:
             raise DataProviderException(e)
 
 
-class TokenDataBuilder:
+class OhlcvSeries:
+    """
+    One ohclv response as numpy arrays, summarized over timestamp windows
+    """
+
+    # bar length in seconds, months use the average month
+    STEP = {"60": 60 * 60, "1D": 24 * 60 * 60, "1M": 2629800}
+
+    def __init__(self, ohclv: dict, resolution: str):
+        ok = ohclv.get("s") == "ok"
+        self.step = OhlcvSeries.STEP[resolution]
+        self.t = np.asarray(ohclv["t"] if ok else [], dtype=np.int64)
+        self.o, self.h, self.l, self.c, self.v = (
+            np.asarray(ohclv[key] if ok else [], dtype=np.float64) for key in ["o", "h", "l", "c", "v"]
+        )
+
+    def last_bars(self, count: int, end_time: int = None):
+        """
+        Window from the count-th last bar starting at or before end_time to the
+        last one, by bar count so gaps in the series do not shorten it
+        """
+        before = self.t if end_time is None else self.t[self.t <= end_time]
+        if len(before) == 0:
+            # matches no bar
+            return 0, -1
+        return int(before[-count:][0]), int(before[-1])
+
+    def summarize(self, windows: t.List[t.Tuple[int, int]]):
+        """
+        Summary per (start_time, end_time) window, bars are included by start time
+        """
+        if len(self.t) == 0:
+            return [TokenPriceRangeSummaryDataPoint() for _ in windows]
+        bounds = np.asarray(windows, dtype=np.int64)
+        mask = (self.t >= bounds[:, :1]) & (self.t <= bounds[:, 1:])
+        found = mask.any(axis=1)
+        first = mask.argmax(axis=1)
+        last = len(self.t) - 1 - mask[:, ::-1].argmax(axis=1)
+        high = np.where(mask, self.h, -np.inf).max(axis=1)
+        low = np.where(mask, self.l, np.inf).min(axis=1)
+        volume = mask @ self.v
+        open = self.o[first]
+        close = self.c[last]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = np.where(open != 0, (close - open) / open, 0)
+
+        return [
+            TokenPriceRangeSummaryDataPoint(
+                high=float(high[i]),
+                low=float(low[i]),
+                open=float(open[i]),
+                close=float(close[i]),
+                volume=float(volume[i]),
+                start_time=str(self.t[first[i]]),
+                end_time=str(self.t[last[i]]),
+                abs_change=float(close[i] - open[i]),
+                change_percentage=float(change[i]),
+            )
+            if found[i]
+            else TokenPriceRangeSummaryDataPoint()
+            for i in range(len(windows))
+        ]
+
+
+class CandleStore:
+    """
+    OHLCV candles per token and resolution in the token_candles table. Crux is
+    only asked for candles from the last stored one on.
+    """
+
+    # candles fetched the first time a token and resolution is synced
+    BACKFILL = {"60": 24 * 30, "1D": 365 * 2, "1M": 60}
+    MAX_RANGE_CANDLES = 1000
+
     @staticmethod
-    def summarize_last_hours(token_name: str, end_time: int, resolution: str, countback: int):
-        ohclv = BaseDataProvider.get_ohclv_by_token_name(token_name, 0, end_time, resolution, countback)
-        if ohclv["s"] != "ok" or len(ohclv["t"]) == 0:
-            return TokenPriceRangeSummaryDataPoint()
-
-        summary = TokenPriceRangeSummaryDataPoint(
-            high=max(ohclv["h"]),
-            low=min(ohclv["l"]),
-            open=ohclv["o"][0],
-            close=ohclv["c"][-1],
-            volume=sum(ohclv["v"]),
-            start_time=ohclv["t"][0],
-            end_time=ohclv["t"][-1],
-            abs_change=ohclv["c"][-1] - ohclv["o"][0],
-            change_percentage=(ohclv["c"][-1] - ohclv["o"][0]) / (ohclv["o"][0])
+    def sync(db: Session, token_id: str, token_name: str, end_time: int):
+        ranges = get_candle_time_ranges(db, token_id)
+
+        def fetch(resolution: str):
+            if resolution not in ranges:
+                return BaseDataProvider.get_ohclv_by_token_name(
+                    token_name, 0, end_time, resolution, CandleStore.BACKFILL[resolution]
+                )
+            # the last stored candle may still have been open, fetch it again
+            last = ranges[resolution][1]
+            countback = (end_time - last) // OhlcvSeries.STEP[resolution] + 2
+            return BaseDataProvider.get_ohclv_by_token_name(
+                token_name, last, end_time, resolution, countback
+            )
+
+        with ThreadPoolExecutor(max_workers=len(CandleStore.BACKFILL)) as executor:
+            fetched = dict(zip(CandleStore.BACKFILL, executor.map(fetch, CandleStore.BACKFILL)))
+        for resolution, ohclv in fetched.items():
+            if ohclv["s"] == "ok":
+                upsert_candles(db, token_id, resolution, ohclv)
+
+    @staticmethod
+    def get_series(
+        db: Session,
+        token_id: str,
+        resolution: str,
+        start_time: int = None,
+        end_time: int = None,
+        count: int = None,
+    ):
+        candles = get_candles(db, token_id, resolution, start_time, end_time, count)
+        return OhlcvSeries(
+            {
+                "s": "ok",
+                "t": [x.time for x in candles],
+                "o": [x.open for x in candles],
+                "h": [x.high for x in candles],
+                "l": [x.low for x in candles],
+                "c": [x.close for x in candles],
+                "v": [x.volume for x in candles],
+            },
+            resolution
         )
-        return summary
 
     @staticmethod
-    def build_stats_for_token_id(token_id: str):
-        erg_usd = BaseDataProvider.get_ergo_price()["price"]
+    def resolution_for_range(db: Session, token_id: str, start_time: int, end_time: int):
+        """
+        Finest resolution with stored candles back to start_time and at most
+        MAX_RANGE_CANDLES candles in the range
+        """
+        ranges = get_candle_time_ranges(db, token_id)
+        for resolution in CandleStore.BACKFILL:
+            if (end_time - start_time) / OhlcvSeries.STEP[resolution] > CandleStore.MAX_RANGE_CANDLES:
+                continue
+            if resolution in ranges and ranges[resolution][0] <= start_time:
+                return resolution
+        return "1M"
+
+
+class TokenDataBuilder:
+    # candles needed per resolution for the summary windows
+    SERIES = {"60": 24, "1D": 30, "1M": 60}
+
+    @staticmethod
+    def summarize_range(db: Session, token_id: str, start_time: int, end_time: int):
+        """
+        Summary of an arbitrary range from the candle store
+        """
+        resolution = CandleStore.resolution_for_range(db, token_id, start_time, end_time)
+        series = CandleStore.get_series(db, token_id, resolution, start_time, end_time)
+        return series.summarize([(start_time, end_time)])[0]
+
+    @staticmethod
+    def build_stats_for_token_id(token_id: str, erg_usd: float = None, db: Session = None):
+        if db is None:
+            db = next(get_db())
+        if erg_usd is None:
+            erg_usd = BaseDataProvider.get_ergo_price()["price"]
         token_details = BaseDataProvider.get_token_details_by_id(token_id)
         # we can fill basic details from this
         token_price_in_erg = token_details["value_in_erg"]
@@ -102,28 +237,28 @@ class TokenDataBuilder:
         now = int(datetime.datetime.now().timestamp())
         hr = 60 * 60
         day = 24 * hr
+        CandleStore.sync(db, token_id, token_details["token_name"], now)
+        hourly, daily, monthly = (
+            CandleStore.get_series(db, token_id, resolution, end_time=now, count=count)
+            for resolution, count in TokenDataBuilder.SERIES.items()
+        )
+        hourly_yesterday = CandleStore.get_series(
+            db, token_id, "60", end_time=now - day, count=TokenDataBuilder.SERIES["60"]
+        )
+        hour_24 = hourly.summarize([hourly.last_bars(24)])[0]
+        yesterday = hourly_yesterday.summarize([hourly_yesterday.last_bars(24)])[0]
+        day_7, day_30 = daily.summarize([daily.last_bars(7), daily.last_bars(30)])
+        day_90, week_52, all_time = monthly.summarize(
+            [monthly.last_bars(3), monthly.last_bars(12), monthly.last_bars(60)]
+        )
         token_price_history_summary = TokenPriceHistorySummary(
-            hour_24=TokenDataBuilder.summarize_last_hours(
-                token_details["token_name"], now, "60", 24
-            ),
-            yesterday=TokenDataBuilder.summarize_last_hours(
-                token_details["token_name"], now - day, "60", 24
-            ),
-            day_7=TokenDataBuilder.summarize_last_hours(
-                token_details["token_name"], now, "1D", 7
-            ),
-            day_30=TokenDataBuilder.summarize_last_hours(
-                token_details["token_name"], now, "1D", 30
-            ),
-            day_90=TokenDataBuilder.summarize_last_hours(
-                token_details["token_name"], now, "1M", 3
-            ),
-            week_52=TokenDataBuilder.summarize_last_hours(
-                token_details["token_name"], now, "1M", 12
-            ),
-            all_time=TokenDataBuilder.summarize_last_hours(
-                token_details["token_name"], now, "1M", 60
-            )
+            hour_24=hour_24,
+            yesterday=yesterday,
+            day_7=day_7,
+            day_30=day_30,
+            day_90=day_90,
+            week_52=week_52,
+            all_time=all_time
         )
 
         # market_cap
@@ -157,12 +292,23 @@ class TokenDataBuilder:
 
 def update_token_data_cache():
     token_ids = LocalDataProvider.get_dao_token_ids()
-    for token_id in token_ids:
-        try:
-            token_stats = TokenDataBuilder.build_stats_for_token_id(
-                token_id
-            ).dict()
-            cache.set(f"token_stats_cache_{token_id}", token_stats)
-            logging.info(f"token_stats_cache_{token_id}_updated")
-        except Exception as e:
-            logging.error(traceback.format_exc())
+    if len(token_ids) == 0:
+        return
+    # one erg price for the whole cycle
+    erg_usd = BaseDataProvider.get_ergo_price()["price"]
+    with ThreadPoolExecutor(max_workers=min(TOKEN_STATS_WORKERS, len(token_ids))) as executor:
+        list(executor.map(lambda token_id: update_token_stats(token_id, erg_usd), token_ids))
+
+
+def update_token_stats(token_id: str, erg_usd: float):
+    db = SessionLocal()
+    try:
+        token_stats = TokenDataBuilder.build_stats_for_token_id(
+            token_id, erg_usd, db
+        ).dict()
+        cache.set_fresh(f"token_stats_cache_{token_id}", token_stats)
+        logging.info(f"token_stats_cache_{token_id}_updated")
+    except Exception as e:
+        logging.error(traceback.format_exc())
+    finally:
+        db.close()
@@ -0,0 +1,70 @@
+import logging
+import traceback
+import typing as t
+
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
+
+from cache.lru import LRUCache
+from db.crud.chain import add_chain_tokens, get_chain_tokens
+from ergo import crux_client
+from ergo.indexed_node_client import with_session
+
+
+TOKEN_FETCH_WORKERS = 16
+# name, decimals and emission amount are fixed when a token is minted
+token_lru = LRUCache(10000)
+
+
+def resolve(token_id: str, db: Session = None):
+    return resolve_many([token_id], db).get(token_id)
+
+
+def resolve_many(token_ids: t.List[str], db: Session = None):
+    """
+    Token metadata by id, served from the lru and the chain_tokens table.
+    Unknown ids are fetched concurrently and stored, tokens that can not be
+    found are left out.
+    """
+    return with_session(db, resolve_from_store, token_ids)
+
+
+def resolve_from_store(db: Session, token_ids: t.List[str]):
+    token_ids = list(dict.fromkeys(token_ids))
+    found = {}
+    for token_id in token_ids:
+        token = token_lru.get(token_id)
+        if token is not None:
+            found[token_id] = token
+    missing = [x for x in token_ids if x not in found]
+    if len(missing) > 0:
+        stored = get_chain_tokens(db, missing)
+        for token_id, token in stored.items():
+            token_lru.set(token_id, token)
+        found.update(stored)
+        missing = [x for x in missing if x not in stored]
+    if len(missing) > 0:
+        with ThreadPoolExecutor(max_workers=min(TOKEN_FETCH_WORKERS, len(missing))) as executor:
+            fetched = [x for x in executor.map(fetch_token, missing) if x is not None]
+        try:
+            add_chain_tokens(db, fetched)
+        except Exception:
+            db.rollback()
+            logging.error(traceback.format_exc())
+        for token in fetched:
+            token_lru.set(token["id"], token)
+            found[token["id"]] = token
+    return {x: found[x] for x in token_ids if x in found}
+
+
+def fetch_token(token_id: str):
+    token_info = crux_client.get_token_info(token_id)
+    if token_info is None:
+        return None
+    return {
+        "id": token_id,
+        "name": token_info["token_name"],
+        "description": token_info["token_description"],
+        "decimals": token_info["decimals"],
+        "emissionAmount": token_info["minted"],
+    }
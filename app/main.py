@@ -18,9 +18,6 @@ from api.blogs import blogs_router
 from api.faq import faq_router
 from api.quotes import quotes_router
 from api.staking import staking_router
-from core.async_handler import AsyncTaskRunner
-from ergo.token_data_provider import update_token_data_cache
-from notifcations.sync_notifications import sync_notifications
 
 from config import Config, Network
 
@@ -93,13 +90,5 @@ app.include_router(util_router, prefix="/util", tags=["util"])
 app.include_router(staking_router, prefix="/staking", tags=["staking"])
 
 
-# setup background tasks
-if not CFG.DEBUG:
-    runner = AsyncTaskRunner()
-    runner.register(update_token_data_cache)
-    runner.register(sync_notifications)
-    runner.start()
-
-
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", reload=True, port=8000)
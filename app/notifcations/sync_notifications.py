@@ -1,18 +1,14 @@
-import requests
 import traceback
 import logging
-import uuid
 
-from sqlalchemy.orm import Session
-
-from api.notifications import notification_create
-from core.async_handler import run_coroutine_in_sync
-from db.crud.dao import get_dao_by_url
-from db.crud.notifications import filter_additional_text_exists
-from db.crud.users import get_user_by_wallet_address, get_user_details_from_user
+from api.notifications import create_and_push_notifications
+from db.crud.dao import get_dao_ids_by_urls
+from db.crud.notifications import get_sync_cursor, set_sync_cursor
+from db.crud.users import get_user_details_ids_by_addresses
 from db.schemas.notifications import CreateAndUpdateNotification, NotificationConstants
-from db.session import get_db
+from db.session import SessionLocal
 
+from core.http_client import notifications as notifications_client
 from config import Config, Network
 
 
@@ -22,6 +18,8 @@ PLUGIN_NAMES = [
     "PaideiaVotingPlugin",
     "PaideiaProposalPlugin"
 ]
+# events of addresses without a profile are retried this long, epoch milliseconds
+PROFILE_RETRY_WINDOW = 7 * 24 * 60 * 60 * 1000
 
 
 def sync_notifications():
@@ -30,51 +28,68 @@ def sync_notifications():
 
 
 def sync_notifications_for_plugin(plugin_name: str):
+    db = SessionLocal()
     try:
-        db = next(get_db())
-        res = requests.get(CFG.notifications_api + "/sync_events/" + plugin_name)
-        resj = res.json()
-        for event in resj:
-            address = event["address"]
-            dao_url = event["body"]["dao"]
-            dao_details = get_dao_by_url(db, dao_url)
-            if not dao_details:
-                # logging.error("dao_details not found for dao: " + dao_url)
+        cursor = get_sync_cursor(db, plugin_name)
+        # since is only a hint, an upstream that ignores it returns every event
+        # and the filter below drops the ones before the cursor
+        params = {"since": cursor} if cursor else None
+        res = notifications_client.get(CFG.notifications_api + "/sync_events/" + plugin_name, params=params)
+        # events at the cursor time are taken again, ones already stored are skipped on insert
+        events = [x for x in res.json() if cursor is None or event_order(x) >= event_order_key(cursor)]
+        if len(events) == 0:
+            return
+        # every lookup for the batch is one query
+        dao_ids = get_dao_ids_by_urls(db, [x["body"]["dao"] for x in events])
+        user_details_ids = get_user_details_ids_by_addresses(
+            db, [x["address"] for x in events], list(dao_ids.values())
+        )
+        notifications = {}
+        skipped = []
+        for event in events:
+            dao_id = dao_ids.get(event["body"]["dao"])
+            if not dao_id:
                 # this should never happen
                 continue
-            dao_id = dao_details.id
-            if filter_additional_text_exists(db, get_additional_text(event)):
-                #logging.info("Ignoring duplicate event: " + event["id"])
-                continue
-            user_details_id = get_user_details_id(address, dao_id, db)
+            user_details_id = user_details_ids.get((event["address"], dao_id))
             if not user_details_id:
-                #logging.info("Event does not have a coresponding user profile: " + event["id"])
+                # event does not have a coresponding user profile (yet)
+                skipped.append(event)
                 continue
-            notification = CreateAndUpdateNotification(
+            notifications[event["id"]] = CreateAndUpdateNotification(
                     user_details_id=user_details_id,
                     action=get_action_from_event(event),
                     transaction_id=event["transactionId"],
-                    additional_text=get_additional_text(event)
+                    additional_text=get_additional_text(event),
+                    event_id=event["id"],
                 )
-            # handle async web sockets stuff
-            run_coroutine_in_sync(
-                notification_create(
-                    user_details_id, notification, db, current_user=None
-                )
-            )
+        # events stored by an earlier run are skipped by the unique event_id
+        create_and_push_notifications(db, list(notifications.values()))
+        set_sync_cursor(db, plugin_name, next_cursor(events, skipped))
     except Exception as e:
         logging.error(traceback.format_exc())
+    finally:
+        db.close()
+
+
+def next_cursor(events, skipped):
+    # held back at skipped events so they are stored once the profile exists
+    latest = max(events, key=event_order)["timestamp"]
+    pending = [
+        x for x in skipped if int(latest) - int(x["timestamp"]) < PROFILE_RETRY_WINDOW
+    ]
+    if len(pending) > 0:
+        return min(pending, key=event_order)["timestamp"]
+    return latest
+
+
+def event_order(event):
+    return event_order_key(event["timestamp"])
 
 
-def get_user_details_id(address: str, dao_id: uuid.UUID, db: Session):
-    user = get_user_by_wallet_address(db, address)
-    if not user:
-        return user
-    user_id = user.id
-    user_details = get_user_details_from_user(db, user_id, dao_id)
-    if not user_details:
-        return user_details
-    return user_details.id
+def event_order_key(timestamp: str):
+    # numeric timestamps of different lengths sort by length first
+    return (len(timestamp), timestamp)
 
 
 def get_action_from_event(event):
@@ -1,17 +1,17 @@
-import requests
+from core.http_client import paideia_state
 from db.schemas.dao import CreateOnChainDao
 from config import Config, Network
 import typing as t
 
 def get_all_daos():
-    res = requests.get(Config[Network].paideia_state+'/dao')
+    res = paideia_state.get(Config[Network].paideia_state+'/dao')
     if res.ok:
         return res.json()
     else:
         raise Exception(res.text)
     
 def get_dao_config(daoKey: str):
-    res = requests.get(Config[Network].paideia_state+'/dao/'+daoKey+'/config')
+    res = paideia_state.get(Config[Network].paideia_state+'/dao/'+daoKey+'/config')
     if res.ok:
         resDict = {}
         for entry in res.json():
@@ -21,21 +21,21 @@ def get_dao_config(daoKey: str):
         raise Exception(res.text)
     
 def get_dao_treasury(daoKey: str):
-    res = requests.get(Config[Network].paideia_state+'/dao/'+daoKey+'/treasury')
+    res = paideia_state.get(Config[Network].paideia_state+'/dao/'+daoKey+'/treasury')
     if res.ok:
         return res.json()
     else:
         raise Exception(res.text)
     
 def get_proposals(daoKey: str):
-    res = requests.get(Config[Network].paideia_state+'/dao/'+daoKey+'/proposals')
+    res = paideia_state.get(Config[Network].paideia_state+'/dao/'+daoKey+'/proposals')
     if res.ok:
         return res.json()
     else:
         raise Exception(res.text)
 
 def create_dao(dao: CreateOnChainDao):
-    res = requests.post(Config[Network].paideia_state+'/dao/', json={
+    res = paideia_state.post(Config[Network].paideia_state+'/dao/', json={
         "name": dao.name,
         "url": dao.url,
         "description": dao.description,
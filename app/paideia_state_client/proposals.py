@@ -1,17 +1,17 @@
-import requests
+from core.http_client import paideia_state
 from config import Config, Network
 import typing as t
 import logging
 
 def get_proposal(daoKey: str, index: int):
-    res = requests.get(Config[Network].paideia_state+'/proposal/' + daoKey + '/' + str(index))
+    res = paideia_state.get(Config[Network].paideia_state+'/proposal/' + daoKey + '/' + str(index))
     if res.ok:
         return res.json()
     else:
         raise Exception(res.text)
     
 def cast_vote(daoKey: str, stakeKey: str, proposalIndex: int, votes: t.List[int], mainAddress: str, allAddresses: t.List[str]):
-    res = requests.post(Config[Network].paideia_state+'/proposal/vote', json={
+    res = paideia_state.post(Config[Network].paideia_state+'/proposal/vote', json={
         "daoKey": daoKey,
         "stakeKey": stakeKey,
         "proposalIndex": proposalIndex,
@@ -35,7 +35,7 @@ def create_proposal(daoKey: str, name: str, stakeKey: str, mainAddress: str, all
         "sendFundsActions": sendFundsActions,
         "updateConfigActions": updateConfigActions
     })
-    res = requests.post(Config[Network].paideia_state+'/proposal', json={
+    res = paideia_state.post(Config[Network].paideia_state+'/proposal', json={
         "daoKey": daoKey,
         "name": name,
         "voteKey": stakeKey,
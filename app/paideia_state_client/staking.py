@@ -1,10 +1,10 @@
-import requests
+from core.http_client import paideia_state
 from db.schemas.staking import NewStakeRecord
 from config import Config, Network
 import typing as t
 
 def stake(daoKey: str, amount: int, mainAddress: str, allAddresses: t.List[str]):
-    res = requests.post(Config[Network].paideia_state+'/stake', json={
+    res = paideia_state.post(Config[Network].paideia_state+'/stake', json={
         "daoKey": daoKey,
         "stakeAmount": amount,
         "userAddress": mainAddress,
@@ -16,21 +16,21 @@ def stake(daoKey: str, amount: int, mainAddress: str, allAddresses: t.List[str])
         raise Exception(res.text)
     
 def get_dao_stake(daoKey: str):
-    res = requests.get(Config[Network].paideia_state+'/stake/'+daoKey)
+    res = paideia_state.get(Config[Network].paideia_state+'/stake/'+daoKey)
     if res.ok:
         return res.json()
     else:
         return None
     
 def get_stake(daoKey: str, stakeKeys: t.Set[str]):
-    res = requests.post(Config[Network].paideia_state+'/stake/'+daoKey+'/stakes', json = {"potentialKeys": list(stakeKeys)})
+    res = paideia_state.post(Config[Network].paideia_state+'/stake/'+daoKey+'/stakes', json = {"potentialKeys": list(stakeKeys)})
     if res.ok:
         return res.json()
     else:
         return None
     
 def add_stake(daoKey: str, stakeKey: str, amount: int, mainAddress: str, allAddresses: t.List[str]):
-    res = requests.post(Config[Network].paideia_state+'/stake/add', json={
+    res = paideia_state.post(Config[Network].paideia_state+'/stake/add', json={
         "daoKey": daoKey,
         "stakeKey": stakeKey,
         "addStakeAmount": amount,
@@ -43,7 +43,7 @@ def add_stake(daoKey: str, stakeKey: str, amount: int, mainAddress: str, allAddr
         raise Exception(res.text)
     
 def unstake(daoKey: str, stakeKey: str, newStakeRecord: NewStakeRecord, mainAddress: str, allAddresses: t.List[str]):
-    res = requests.post(Config[Network].paideia_state+'/stake/remove', json={
+    res = paideia_state.post(Config[Network].paideia_state+'/stake/remove', json={
         "daoKey": daoKey,
         "stakeKey": stakeKey,
         "newStakeRecord": newStakeRecord.dict(),
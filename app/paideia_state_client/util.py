@@ -1,4 +1,4 @@
-import requests
+from core.http_client import paideia_state
 from cache.cache import cache
 from config import Config, Network
 import typing as t
@@ -7,15 +7,17 @@ import typing as t
 def get_contract_sig(address: str):
     if len(address) == 52 and address[0] == "9":
         return None
-    cached = cache.get("get_contract_sig_" + str(address))
-    if cached:
-        return cached
-    res = requests.post(
+    return cache.get_or_compute(
+        "get_contract_sig_" + str(address), lambda: fetch_contract_sig(address)
+    )
+
+
+def fetch_contract_sig(address: str):
+    res = paideia_state.post(
         Config[Network].paideia_state + "/util/contractSignature",
         json={"contractAddress": address},
     )
     if res.ok:
-        cache.set("get_contract_sig_" + str(address), res.json())
         return res.json()
     else:
         return None
@@ -0,0 +1,121 @@
+import logging
+import traceback
+import typing as t
+import urllib
+
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
+
+from cache.cache import cache
+from db.crud.dao import get_all_daos, upsert_on_chain_daos
+from db.crud.users import create_user_dao_profile
+from db.schemas.dao import (
+    CreateOrUpdateDao,
+    CreateOrUpdateDaoDesign,
+    CreateOrUpdateGovernance,
+    CreateOrUpdateTokenomics,
+)
+from db.session import get_db
+from paideia_state_client import dao
+
+from config import Config, Network
+
+
+CFG = Config[Network]
+CONFIG_FETCH_WORKERS = 8
+DAO_URL_ALPHABET = "QWERTYUIOPASDFGHJKLZXCVBNMqwertyuiopasdfghjklzxcvbnm1234567890-.%+"
+
+
+def sync_daos(db: Session = None):
+    if db is None:
+        db = next(get_db())
+    # state_daos maps dao_key to [name, config_height, config_box_id]
+    state_daos = dao.get_all_daos()
+    db_daos = {x.dao_key: x for x in get_all_daos(db) if x.dao_key}
+    changed = list(
+        filter(
+            lambda key: key not in db_daos
+            or not db_daos[key].config_box_id
+            or db_daos[key].config_box_id != state_daos[key][2],
+            state_daos,
+        )
+    )
+    if len(changed) == 0:
+        return []
+
+    with ThreadPoolExecutor(
+        max_workers=min(CONFIG_FETCH_WORKERS, len(changed))
+    ) as executor:
+        dao_configs = dict(zip(changed, executor.map(fetch_dao_config, changed)))
+
+    daos = []
+    for key in changed:
+        if dao_configs[key] is None:
+            continue
+        try:
+            daos.append(
+                dao_from_config(
+                    key,
+                    state_daos[key],
+                    dao_configs[key],
+                    db_daos[key].dao_url if key in db_daos else state_daos[key][0],
+                )
+            )
+        except Exception as e:
+            logging.error(traceback.format_exc())
+
+    created = upsert_on_chain_daos(db, daos)
+    for dao_id in created:
+        create_user_dao_profile(db, CFG.admin_id, dao_id)
+    cache.invalidate("get_all_daos")
+    return list(map(lambda x: x.dao_key, daos))
+
+
+def fetch_dao_config(dao_key: str):
+    try:
+        return dao.get_dao_config(dao_key)
+    except Exception as e:
+        logging.error(traceback.format_exc())
+        return None
+
+
+def config_value(dao_config: dict, key: str, default=None):
+    return dao_config[key]["value"] if key in dao_config else default
+
+
+def dao_from_config(
+    dao_key: str, state_dao: t.List, dao_config: dict, fallback_url: str
+):
+    dao_url = fallback_url
+    if "im.paideia.dao.url" in dao_config:
+        quoted_url = urllib.parse.quote(dao_config["im.paideia.dao.url"]["value"])
+        if not any(c not in DAO_URL_ALPHABET for c in quoted_url):
+            dao_url = quoted_url
+    return CreateOrUpdateDao(
+        dao_key=dao_key,
+        dao_name=state_dao[0],
+        config_height=state_dao[1],
+        config_box_id=state_dao[2],
+        dao_short_description=config_value(dao_config, "im.paideia.dao.desc", ""),
+        dao_url=dao_url,
+        governance=CreateOrUpdateGovernance(
+            quorum=int(dao_config["im.paideia.dao.quorum"]["value"]),
+            vote_duration__sec=int(
+                dao_config["im.paideia.dao.min.proposal.time"]["value"]
+            )
+            / 1000,
+            support_needed=int(dao_config["im.paideia.dao.threshold"]["value"]),
+        ),
+        tokenomics=CreateOrUpdateTokenomics(
+            token_id=dao_config["im.paideia.dao.tokenid"]["value"]
+        ),
+        design=CreateOrUpdateDaoDesign(
+            logo_url=config_value(dao_config, "im.paideia.dao.logo"),
+            show_banner=config_value(dao_config, "im.paideia.dao.banner.enabled", False),
+            banner_url=config_value(dao_config, "im.paideia.dao.banner"),
+            show_footer=config_value(dao_config, "im.paideia.dao.footer.enabled", False),
+            footer_text=config_value(dao_config, "im.paideia.dao.footer"),
+        ),
+        is_draft=False,
+        is_published=True,
+    )
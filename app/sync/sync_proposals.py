@@ -0,0 +1,147 @@
+import datetime
+import logging
+import traceback
+import typing as t
+import uuid
+
+from sqlalchemy.orm import Session
+from starlette.responses import JSONResponse
+
+from db.crud.dao import get_all_daos
+from db.crud.proposals import (
+    create_new_proposal_with_activity,
+    delete_proposal_by_id,
+    edit_proposal_basic_by_id,
+    proposal_status,
+)
+from db.crud.users import get_user_profile
+from db.models.proposals import Proposal
+from db.schemas.proposal import CreateProposal, UpdateProposalBasic
+from db.session import get_db
+from paideia_state_client import dao, proposals
+
+from config import Config, Network
+
+
+CFG = Config[Network]
+
+# last reconciled proposalBoxId by on chain proposal index for each dao
+# boxes are immutable so an unchanged box id means nothing to sync
+proposal_box_watermarks: t.Dict[uuid.UUID, t.Dict[int, str]] = {}
+
+
+def sync_proposals():
+    db = next(get_db())
+    for db_dao in get_all_daos(db):
+        if not db_dao.dao_key:
+            continue
+        try:
+            sync_proposals_for_dao(db, db_dao.id, db_dao.dao_key)
+        except Exception as e:
+            logging.error(traceback.format_exc())
+
+
+def sync_proposals_for_dao(db: Session, dao_id: uuid.UUID, dao_key: str):
+    state_proposals = dao.get_proposals(dao_key)
+    watermarks = proposal_box_watermarks.setdefault(dao_id, {})
+    changed = list(
+        filter(
+            lambda p: watermarks.get(p["proposalIndex"]) != p["proposalBoxId"],
+            state_proposals,
+        )
+    )
+    if len(changed) == 0:
+        return 0
+
+    db_proposals = (
+        db.query(Proposal)
+        .filter(Proposal.dao_id == dao_id)
+        .filter(Proposal.on_chain_id.in_([p["proposalIndex"] for p in changed]))
+        .all()
+    )
+    db_proposals_by_index = {}
+    for dbp in db_proposals:
+        db_proposals_by_index.setdefault(dbp.on_chain_id, []).append(dbp)
+
+    for p in changed:
+        db_proposal = None
+        for dbp in db_proposals_by_index.get(p["proposalIndex"], []):
+            if dbp.name == p["proposalName"]:
+                db_proposal = dbp
+            else:
+                delete_proposal_by_id(db, dbp.id)
+        try:
+            if db_proposal is None:
+                create_proposal_from_chain(db, dao_id, dao_key, p["proposalIndex"])
+            elif not db_proposal.box_id or db_proposal.box_id != p["proposalBoxId"]:
+                update_proposal_from_chain(
+                    db, dao_key, db_proposal, p["proposalHeight"]
+                )
+        except Exception as e:
+            # watermark stays behind so the box is retried on the next run
+            db.rollback()
+            logging.error(traceback.format_exc())
+            continue
+        watermarks[p["proposalIndex"]] = p["proposalBoxId"]
+    return len(changed)
+
+
+def create_proposal_from_chain(
+    db: Session, dao_id: uuid.UUID, dao_key: str, proposal_index: int
+):
+    proposal = proposals.get_proposal(dao_key, proposal_index)
+    db_proposal = create_new_proposal_with_activity(
+        db=db,
+        proposal=CreateProposal(
+            dao_id=dao_id,
+            user_details_id=get_user_profile(db, CFG.admin_id, dao_id).id,
+            name=proposal["proposal"]["name"],
+            voting_system=proposal["proposalType"],
+            actions=proposal["proposal"]["actions"],
+            is_proposal=True,
+            box_height=proposal["proposal"]["box_height"],
+            box_id=proposal["proposal"]["box_id"],
+            on_chain_id=proposal_index,
+            votes=proposal["proposal"]["votes"],
+            attachments=[],
+            status=proposal_status(proposal["proposal"]["passed"]),
+            end_date=datetime.datetime.fromtimestamp(
+                proposal["proposal"]["endTime"] // 1000
+            ),
+        ),
+    )
+    if type(db_proposal) == JSONResponse:
+        raise Exception(f"create proposal {proposal_index}: {db_proposal.body.decode()}")
+    return db_proposal
+
+
+def update_proposal_from_chain(
+    db: Session, dao_key: str, db_proposal: Proposal, box_height: int
+):
+    proposal = proposals.get_proposal(dao_key, db_proposal.on_chain_id)
+    attachments = (
+        db_proposal.attachments["attachments_list"]
+        if "attachments_list" in db_proposal.attachments
+        else []
+    )
+    updated = edit_proposal_basic_by_id(
+        db=db,
+        user_details_id=db_proposal.user_details_id,
+        id=db_proposal.id,
+        proposal=UpdateProposalBasic(
+            box_height=box_height,
+            box_id=proposal["proposal"]["box_id"],
+            dao_id=db_proposal.dao_id,
+            user_details_id=db_proposal.user_details_id,
+            name=db_proposal.name,
+            votes=proposal["proposal"]["votes"],
+            attachments=attachments,
+            status=proposal_status(proposal["proposal"]["passed"]),
+            end_date=datetime.datetime.fromtimestamp(
+                proposal["proposal"]["endTime"] // 1000
+            ),
+        ),
+    )
+    if type(updated) == JSONResponse:
+        raise Exception(f"update proposal {db_proposal.id}: {updated.body.decode()}")
+    return updated
@@ -1,3 +1,141 @@
 from dotenv import load_dotenv
 
 load_dotenv("test/.env.test")
+import json
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import pytest
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from db.session import Base
+from db.models import (
+    activity_log,
+    chain,
+    dao,
+    dao_design,
+    governance,
+    notifications,
+    proposals,
+    tokenomics,
+    users,
+)
+
+# governance ids are integer columns in the models but hold uuids in postgres,
+# stored in the same hex form sqlalchemy binds uuid values with
+sqlite3.register_adapter(uuid.UUID, lambda x: x.hex)
+
+
+@compiles(UUID, "sqlite")
+def compile_uuid(type_, compiler, **kw):
+    # text affinity, otherwise sqlite stores all digit uuids as integers
+    return "CHAR(32)"
+
+
+@pytest.fixture
+def db():
+    # in memory database with the api models, no postgres needed
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    # keep-alive so pooled connections are reused
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.route("GET", None)
+
+    def do_POST(self):
+        self.route("POST", self.rfile.read(int(self.headers["Content-Length"])).decode())
+
+    def route(self, method: str, body: str):
+        upstream = self.server
+        with upstream.lock:
+            upstream.requests.append(self.path)
+            upstream.clients.append(self.client_address[1])
+            if body is not None:
+                upstream.bodies.append(body)
+            upstream.in_flight += 1
+            upstream.peak = max(upstream.peak, upstream.in_flight)
+        try:
+            handler = next(
+                handler
+                for route_method, prefix, handler in upstream.routes
+                if route_method == method and self.path.startswith(prefix)
+            )
+            result = handler(self.path, body)
+            time.sleep(upstream.delay)
+        finally:
+            with upstream.lock:
+                upstream.in_flight -= 1
+        status, result = result if isinstance(result, tuple) else (200, result)
+        payload = result if isinstance(result, bytes) else json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeUpstream(ThreadingHTTPServer):
+    """
+    Local http server standing in for the node, paideia state and other
+    upstreams. Handlers get the path and post body and return the response
+    body, or a (status, body) tuple, after delay seconds.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0.0):
+        super().__init__(("127.0.0.1", 0), FakeUpstreamHandler)
+        self.delay = delay
+        self.routes = []
+        self.requests = []
+        self.clients = []
+        self.bodies = []
+        self.lock = threading.Lock()
+        # concurrent requests being served, and the most seen at once
+        self.in_flight = 0
+        self.peak = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def route(self, method: str, prefix: str, handler):
+        self.routes.append((method, prefix, handler))
+
+    def handle_error(self, request, client_address):
+        # clients that time out close the connection before the reply
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+@pytest.fixture
+def fake_upstream(request):
+    # options can be passed with indirect parametrize, e.g. {"delay": 0.5}
+    upstream = FakeUpstream(**getattr(request, "param", {}))
+    thread = threading.Thread(target=upstream.serve_forever, daemon=True)
+    thread.start()
+    yield upstream
+    upstream.shutdown()
+    upstream.server_close()
@@ -0,0 +1,84 @@
+import pytest
+
+from config import Config, Network
+from cache.cache import cache
+from api import assets
+from ergo import indexed_node_client
+from ergo.schemas import AddressTokenList
+
+
+DELAY = 0.05
+
+
+BALANCE = {
+    "confirmed": {
+        "nanoErgs": 10**9,
+        "tokens": [{"tokenId": "paideia", "amount": 12345, "decimals": 4}],
+    },
+    "unconfirmed": {"nanoErgs": 0, "tokens": []},
+}
+
+
+@pytest.fixture
+def fake_node(fake_upstream, monkeypatch):
+    # /info and /blockchain/balance with a fixed latency, balance posts are logged in bodies
+    fake_upstream.delay = DELAY
+    fake_upstream.height = 1000
+    fake_upstream.route("GET", "/info", lambda path, body: {"fullHeight": fake_upstream.height})
+    fake_upstream.route("POST", "/blockchain/balance", lambda path, body: BALANCE)
+    monkeypatch.setitem(Config[Network], "node", fake_upstream.url)
+    stored = {}
+    monkeypatch.setattr(cache, "get", lambda key: stored.get(key))
+    monkeypatch.setattr(cache, "set", lambda key, value, timeout=-1: stored.update({key: value}))
+    monkeypatch.setattr(cache, "get_many", lambda keys: [stored.get(x) for x in keys])
+    monkeypatch.setattr(cache, "set_many", lambda values, timeout=-1: stored.update(values))
+    monkeypatch.setattr(indexed_node_client, "height_state", {"height": None, "polled": 0.0})
+    return fake_upstream
+
+
+def test_hash_string_list_is_stable():
+    assert assets.hash_string_list(["b", "a"]) == assets.hash_string_list(["a", "b", "a"])
+    # sha256, the same in every worker process
+    assert assets.hash_string_list(["a"]) == (
+        "ca978112ca1bbdcafac231b39a23dc4da786eff8147c4e72b9807785afee48bb"
+    )
+
+
+def test_token_check_fetches_balances_concurrently(fake_node):
+    addresses = [f"address_{i}" for i in range(10)]
+    res = assets.token_check(AddressTokenList(addresses=addresses, tokens=["paideia"]))
+
+    assert res["address_0"] == [{"paideia": 1.2345}]
+    assert sorted(fake_node.bodies) == sorted(addresses)
+    # the balances are fetched together, not one after another
+    assert fake_node.peak >= len(addresses) / 2
+
+    # overlapping address sets reuse the per address balances
+    fake_node.bodies = []
+    assets.token_check(AddressTokenList(addresses=addresses[5:] + ["address_10"], tokens=["paideia"]))
+    assert fake_node.bodies == ["address_10"]
+
+
+def test_balances_are_cached_until_next_block(fake_node, monkeypatch):
+    monkeypatch.setattr(indexed_node_client, "HEIGHT_POLL_INTERVAL", 0)
+    assert indexed_node_client.get_balance("a")["confirmed"]["nanoErgs"] == 10**9
+    indexed_node_client.get_balance("a")
+    assert fake_node.bodies == ["a"]
+
+    # unconfirmed balances are refreshed on demand
+    indexed_node_client.get_balance("a", unconfirmed=True)
+    assert fake_node.bodies == ["a", "a"]
+
+    fake_node.height += 1
+    indexed_node_client.get_balance("a")
+    assert fake_node.bodies == ["a", "a", "a"]
+
+
+def test_height_falls_back_to_last_known_when_node_is_down(fake_node, monkeypatch):
+    assert indexed_node_client.get_height() == 1000
+    monkeypatch.setattr(indexed_node_client, "HEIGHT_POLL_INTERVAL", 0)
+    monkeypatch.setitem(Config[Network], "node", "http://127.0.0.1:1")
+    polled = indexed_node_client.height_state["polled"]
+
+    assert indexed_node_client.get_height() == 1000
+    assert indexed_node_client.height_state["polled"] > polled
@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+
+from cache.cache import FRESH_KEY_PREFIX, RedisCache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.published = []
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def ttl(self, key):
+        return 900 if key in self.data else -2
+
+    def setex(self, key, timeout, value):
+        self.data[key] = value if isinstance(value, bytes) else value.encode()
+
+    def set(self, key, value, nx=False, ex=None):
+        with self.lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value
+            return True
+
+    def eval(self, script, numkeys, key, token):
+        with self.lock:
+            if self.data.get(key) == token:
+                del self.data[key]
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def publish(self, channel, message):
+        self.published.append(message)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def get(self, key):
+        self.calls.append(lambda: self.client.get(key))
+
+    def ttl(self, key):
+        self.calls.append(lambda: self.client.ttl(key))
+
+    def mget(self, keys):
+        self.calls.append(lambda: [self.client.get(key) for key in keys])
+
+    def execute(self):
+        return [x() for x in self.calls]
+
+
+def fake_cache():
+    cache = RedisCache(l1_size=10, l1_timeout=60)
+    cache.client = FakeRedis()
+    # no subscriber thread, invalidation messages are delivered by hand
+    cache.start_listener = lambda: None
+    return cache
+
+
+def test_hot_keys_are_served_from_l1():
+    cache = fake_cache()
+    cache.client.setex(FRESH_KEY_PREFIX + "get_contract_sig_abc", 900, json.dumps({"name": "abc"}))
+
+    assert cache.get(FRESH_KEY_PREFIX + "get_contract_sig_abc") == {"name": "abc"}
+    assert cache.get(FRESH_KEY_PREFIX + "get_contract_sig_abc") == {"name": "abc"}
+    assert cache.get("get_all_daos") is None
+    stats = cache.stats()
+    assert stats["l1_hits"] == 1
+    assert stats["l1_misses"] == 1
+    assert stats["l2_hits"] == 1
+    assert stats["l2_misses"] == 1
+
+
+def test_invalidation_from_other_worker_evicts_l1():
+    cache = fake_cache()
+    cache.set(FRESH_KEY_PREFIX + "get_contract_sig_abc", {"className": "Old"})
+    cache.on_invalidation(cache.client.published[-1])
+    # own messages are ignored
+    assert cache.l1.get(FRESH_KEY_PREFIX + "get_contract_sig_abc") == {"className": "Old"}
+
+    cache.client.setex(FRESH_KEY_PREFIX + "get_contract_sig_abc", 900, json.dumps({"className": "New"}))
+    cache.on_invalidation(b"other_worker:" + FRESH_KEY_PREFIX.encode() + b"get_contract_sig_abc")
+    assert cache.get(FRESH_KEY_PREFIX + "get_contract_sig_abc") == {"className": "New"}
+
+
+def test_get_or_compute_single_flight():
+    cache = fake_cache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"price": 1}
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_or_compute("token_stats_cache_abc", compute))
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"price": 1}] * 8
+
+
+def test_get_or_compute_serves_stale_while_refreshing():
+    cache = fake_cache()
+    cache.set_fresh("get_aggregated_activities_abc", ["old"], timeout=0)
+    # another worker holds the refresh lock
+    cache.client.set("lock_get_aggregated_activities_abc", "other", nx=True)
+    assert cache.get_or_compute("get_aggregated_activities_abc", lambda: ["new"]) == ["old"]
+
+    cache.client.eval(None, 1, "lock_get_aggregated_activities_abc", "other")
+    assert cache.get_or_compute("get_aggregated_activities_abc", lambda: ["new"]) == ["new"]
+
+
+def test_get_many_reads_redis_once():
+    cache = fake_cache()
+    cache.set_fresh("token_stats_cache_a", {"price": 1})
+    cache.client.setex("get_all_daos", 900, json.dumps(["dao"]))
+    cache.l1.clear()
+    pipelines = []
+    pipeline = cache.client.pipeline
+    cache.client.pipeline = lambda: pipelines.append(1) or pipeline()
+
+    assert cache.get_fresh_many(["token_stats_cache_a", "token_stats_cache_b"]) == [{"price": 1}, None]
+    assert cache.get_many(["get_all_daos", FRESH_KEY_PREFIX + "token_stats_cache_a"])[0] == ["dao"]
+    # the second call found token_stats_cache_a in l1
+    assert len(pipelines) == 2
+    assert cache.stats()["l1_hits"] == 1
+
+
+def test_values_cached_before_wrapping_are_a_miss():
+    cache = fake_cache()
+    # plain values left by an older release under the same name
+    cache.client.setex("token_stats_cache_a", 900, json.dumps({"price": 1}))
+    cache.client.setex(FRESH_KEY_PREFIX + "token_stats_cache_b", 900, json.dumps({"price": 2}))
+
+    assert cache.get_fresh_many(["token_stats_cache_a", "token_stats_cache_b"]) == [None, None]
+    assert cache.get_or_compute("token_stats_cache_a", lambda: {"price": 3}) == {"price": 3}
+    assert cache.get("token_stats_cache_a") == {"price": 1}
+    cache.invalidate("token_stats_cache_a")
+    assert cache.get_fresh_many(["token_stats_cache_a"]) == [None]
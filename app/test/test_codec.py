@@ -0,0 +1,42 @@
+import json
+import pytest
+
+from cache.benchmark import CONFIGS, PAYLOADS
+from cache.codec import AVAILABLE, CODECS, CacheCodec
+
+
+@pytest.mark.parametrize("name,threshold", CONFIGS)
+def test_codec_round_trip(name, threshold):
+    if CODECS[name].id not in AVAILABLE:
+        pytest.skip(f"{name} not installed")
+    codec = CacheCodec(name, threshold)
+    for payload in PAYLOADS.values():
+        assert codec.decode(codec.encode(payload)) == payload
+
+
+def test_codec_switch_keeps_old_values_readable():
+    legacy = json.dumps(PAYLOADS["activities"]).encode()
+    encoded = [
+        CacheCodec(name, 1024).encode(PAYLOADS["activities"])
+        for name in CODECS
+        if CODECS[name].id in AVAILABLE
+    ]
+    reader = CacheCodec("json")
+    assert reader.decode(legacy) == PAYLOADS["activities"]
+    for data in encoded:
+        assert reader.decode(data) == PAYLOADS["activities"]
+    # default codec writes plain json
+    assert CacheCodec().encode(PAYLOADS["activities"]) == legacy
+
+
+@pytest.mark.parametrize("name", list(CODECS))
+def test_values_above_threshold_are_compressed(name):
+    if CODECS[name].id not in AVAILABLE:
+        pytest.skip(f"{name} not installed")
+    small = {"price": 0.0119}
+    # encoded size is what redis stores for the value
+    assert CacheCodec(name, 1024).encode(small) == CacheCodec(name, 0).encode(small)
+    for payload in PAYLOADS.values():
+        compressed = CacheCodec(name, 1024).encode(payload)
+        assert len(compressed) < len(CacheCodec(name, 0).encode(payload)) / 2
+        assert CacheCodec("json").decode(compressed) == payload
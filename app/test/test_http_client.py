@@ -0,0 +1,53 @@
+import pytest
+import requests
+
+from core.http_client import UpstreamClient
+
+
+@pytest.fixture
+def upstream(fake_upstream):
+    fake_upstream.failures = 0
+
+    def info(path, body):
+        with fake_upstream.lock:
+            fail = fake_upstream.failures > 0
+            if fail:
+                fake_upstream.failures -= 1
+        return (503, b"unavailable") if fail else b"ok"
+
+    fake_upstream.route("GET", "/info", info)
+    return fake_upstream
+
+
+def test_sequential_requests_reuse_one_connection(upstream):
+    client = UpstreamClient("test_pool")
+    for _ in range(10):
+        assert client.get(upstream.url + "/info").text == "ok"
+    # every request came from the same client port
+    assert len(upstream.clients) == 10
+    assert len(set(upstream.clients)) == 1
+    assert client.metrics.dict()["requests"] == 10
+
+
+def test_unavailable_upstream_is_retried(upstream):
+    client = UpstreamClient("test_retry", retries=2)
+    upstream.failures = 2
+    res = client.get(upstream.url + "/info")
+    assert res.status_code == 200
+    assert len(upstream.requests) == 3
+    # retries happen inside one call
+    assert client.metrics.dict()["errors"] == 0
+
+    upstream.failures = 3
+    assert client.get(upstream.url + "/info").status_code == 503
+    assert client.metrics.dict()["errors"] == 1
+
+
+@pytest.mark.parametrize("fake_upstream", [{"delay": 0.5}], indirect=True)
+def test_slow_upstream_times_out(upstream):
+    client = UpstreamClient("test_timeout", timeout=0.1, retries=2)
+    with pytest.raises(requests.exceptions.Timeout):
+        client.get(upstream.url + "/info")
+    assert len(upstream.requests) == 1
+    assert client.metrics.dict()["errors"] == 1
+    assert client.metrics.dict()["max_time"] < 0.5
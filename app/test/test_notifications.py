@@ -0,0 +1,284 @@
+import asyncio
+import datetime
+import uuid
+
+from types import SimpleNamespace
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+from starlette.responses import JSONResponse
+
+from api import notifications as notifications_api
+from db.crud.dao import get_dao_ids_by_urls
+from db.crud.notifications import (
+    cleanup_notifications,
+    create_notification,
+    delete_notification,
+    get_notifications,
+    get_sync_cursor,
+    get_unread_counts,
+    mark_all_as_read,
+)
+from db.models.dao import vw_daos
+from db.models.notifications import Notification, NotificationUnreadCount
+from db.models.proposals import Proposal
+from db.models.users import ErgoAddress, UserDetails
+from notifcations import sync_notifications
+from db.schemas.notifications import CreateAndUpdateNotification
+
+
+class FakeManager:
+    def __init__(self):
+        self.published = []
+
+    def publish_many(self, messages):
+        self.published.extend(messages)
+
+    async def broadcast_many(self, messages):
+        self.publish_many(messages)
+
+
+def test_new_notifications_are_pushed_as_deltas(db, monkeypatch):
+    manager = FakeManager()
+    monkeypatch.setattr(notifications_api, "connection_manager", manager)
+    proposal = Proposal(id=uuid.uuid4(), name="Fund the marketing campaign")
+    db.add(proposal)
+    db.commit()
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+
+    notifications_api.create_and_push_notifications(
+        db, [CreateAndUpdateNotification(user_details_id=alice, action="first")]
+    )
+    created = notifications_api.create_and_push_notifications(
+        db,
+        [
+            CreateAndUpdateNotification(user_details_id=alice, action="second", proposal_id=proposal.id),
+            CreateAndUpdateNotification(user_details_id=bob, action="third"),
+        ],
+    )
+
+    assert [x.proposal_name for x in created] == ["Fund the marketing campaign", None]
+    assert len(get_notifications(db, alice)) == 2
+    # one message per user with only the new notifications
+    topic, message = manager.published[1]
+    assert topic == "notification_user_details_id_" + str(alice)
+    assert [x["action"] for x in message["new_notifications"]] == ["second"]
+    assert message["new_notifications"][0]["proposal_name"] == "Fund the marketing campaign"
+    assert message["unread_count"] == 2
+    assert manager.published[2][1]["unread_count"] == 1
+
+
+def test_push_failure_keeps_created_notifications(db, monkeypatch):
+    class BrokenManager:
+        def publish_many(self, messages):
+            raise ConnectionError("redis unavailable")
+
+    monkeypatch.setattr(notifications_api, "connection_manager", BrokenManager())
+    alice = uuid.uuid4()
+
+    created = notifications_api.create_and_push_notifications(
+        db, [CreateAndUpdateNotification(user_details_id=alice, action="liked")]
+    )
+
+    assert len(created) == 1
+    assert len(get_notifications(db, alice)) == 1
+    assert get_unread_counts(db, [alice])[alice] == 1
+
+
+def test_routes_in_the_event_loop_broadcast_one_batch(db, monkeypatch):
+    manager = FakeManager()
+    monkeypatch.setattr(notifications_api, "connection_manager", manager)
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+
+    created = asyncio.run(
+        notifications_api.create_and_broadcast_notifications(
+            db,
+            [
+                CreateAndUpdateNotification(user_details_id=alice, action="commented"),
+                CreateAndUpdateNotification(user_details_id=bob, action="replied"),
+            ],
+        )
+    )
+
+    assert [x.action for x in created] == ["commented", "replied"]
+    assert [topic for topic, message in manager.published] == [
+        "notification_user_details_id_" + str(alice),
+        "notification_user_details_id_" + str(bob),
+    ]
+
+
+class FakeEvents:
+    def __init__(self, events):
+        self.events = events
+        self.calls = []
+
+    def get(self, url, params=None):
+        self.calls.append(params)
+        since = (params or {}).get("since")
+        events = [x for x in self.events if since is None or int(x["timestamp"]) >= int(since)]
+        return SimpleNamespace(json=lambda: events)
+
+
+def event(id: str, timestamp: int, address: str, dao: str = "my-dao"):
+    return {
+        "id": id,
+        "timestamp": str(timestamp),
+        "address": address,
+        "transactionId": "tx" + id,
+        "body": {"dao": dao, "type": "vote", "status": "confirmed"},
+    }
+
+
+def test_sync_notifications_resumes_from_cursor(db, monkeypatch):
+    manager = FakeManager()
+    monkeypatch.setattr(notifications_api, "connection_manager", manager)
+    monkeypatch.setattr(sync_notifications, "SessionLocal", sessionmaker(bind=db.bind))
+    dao_id, user_id, user_details_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    db.add(vw_daos(id=dao_id, dao_url="https://app.paideia.im/my-dao"))
+    db.add(ErgoAddress(id=uuid.uuid4(), user_id=user_id, address="alice"))
+    db.add(UserDetails(id=user_details_id, user_id=user_id, dao_id=dao_id))
+    db.commit()
+    upstream = FakeEvents(
+        [
+            event("1", 900, "alice"),
+            event("2", 1000, "alice"),
+            event("3", 1000, "nobody"),
+            event("4", 1000, "alice", dao="unknown"),
+        ]
+    )
+    monkeypatch.setattr(sync_notifications, "notifications_client", upstream)
+    monkeypatch.setitem(sync_notifications.CFG, "notifications_api", "http://notifications")
+
+    sync_notifications.sync_notifications_for_plugin("PaideiaVotingPlugin")
+    assert len(get_notifications(db, user_details_id)) == 2
+    assert get_sync_cursor(db, "PaideiaVotingPlugin") == "1000"
+
+    upstream.events.append(event("5", 1100, "alice"))
+    sync_notifications.sync_notifications_for_plugin("PaideiaVotingPlugin")
+    assert upstream.calls[-1] == {"since": "1000"}
+    # event 2 comes again with the cursor time and is not stored twice
+    assert sorted(x.transaction_id for x in get_notifications(db, user_details_id)) == ["tx1", "tx2", "tx5"]
+    assert [len(x[1]["new_notifications"]) for x in manager.published] == [2, 1]
+    assert manager.published[-1][1]["unread_count"] == 3
+
+
+def test_events_without_profile_hold_the_cursor(db, monkeypatch):
+    monkeypatch.setattr(notifications_api, "connection_manager", FakeManager())
+    monkeypatch.setattr(sync_notifications, "SessionLocal", sessionmaker(bind=db.bind))
+    dao_id, user_id = uuid.uuid4(), uuid.uuid4()
+    db.add(vw_daos(id=dao_id, dao_url="https://app.paideia.im/my-dao"))
+    db.add(ErgoAddress(id=uuid.uuid4(), user_id=user_id, address="bob"))
+    db.commit()
+    day = 24 * 60 * 60 * 1000
+    upstream = FakeEvents(
+        [
+            event("1", 1000, "bob"),
+            event("2", 1000 + 5 * day, "bob"),
+            event("3", 1000 + 9 * day, "carol"),
+        ]
+    )
+    monkeypatch.setattr(sync_notifications, "notifications_client", upstream)
+    monkeypatch.setitem(sync_notifications.CFG, "notifications_api", "http://notifications")
+
+    sync_notifications.sync_notifications_for_plugin("PaideiaVotingPlugin")
+    # event 1 is older than the retry window and given up on
+    assert get_sync_cursor(db, "PaideiaVotingPlugin") == str(1000 + 5 * day)
+
+    user_details_id = uuid.uuid4()
+    db.add(UserDetails(id=user_details_id, user_id=user_id, dao_id=dao_id))
+    db.commit()
+    sync_notifications.sync_notifications_for_plugin("PaideiaVotingPlugin")
+    assert [x.transaction_id for x in get_notifications(db, user_details_id)] == ["tx2"]
+    assert get_sync_cursor(db, "PaideiaVotingPlugin") == str(1000 + 9 * day)
+
+
+def test_dao_ids_are_matched_on_the_last_url_segment(db):
+    ids = [uuid.uuid4() for _ in range(4)]
+    db.add(vw_daos(id=ids[0], dao_url="https://app.paideia.im/my_dao"))
+    db.add(vw_daos(id=ids[1], dao_url="https://app.paideia.im/myxdao"))
+    db.add(vw_daos(id=ids[2], dao_url="https://app.paideia.im/my%20dao"))
+    db.add(vw_daos(id=ids[3], dao_url="plain"))
+    db.commit()
+
+    assert get_dao_ids_by_urls(db, ["my_dao", "my dao", "plain", "dao", "other"]) == {
+        "my_dao": ids[0],
+        "my dao": ids[2],
+        "plain": ids[3],
+    }
+
+
+def test_duplicate_event_conflicts(db):
+    alice = uuid.uuid4()
+    notification = CreateAndUpdateNotification(user_details_id=alice, action="vote", event_id="1")
+
+    assert create_notification(db, alice, notification).event_id == "1"
+    duplicate = create_notification(db, alice, notification)
+    assert type(duplicate) == JSONResponse
+    assert duplicate.status_code == 409
+
+
+def test_keyset_pages_and_unread_counter(db, monkeypatch):
+    monkeypatch.setattr(notifications_api, "connection_manager", FakeManager())
+    alice = uuid.uuid4()
+    # one batch shares a date, pages still split on the id
+    created = notifications_api.create_and_push_notifications(
+        db, [CreateAndUpdateNotification(user_details_id=alice, action=str(i)) for i in range(25)]
+    )
+    pages = []
+    page = get_notifications(db, alice)
+    while len(page) > 0:
+        pages.append(page)
+        page = get_notifications(db, alice, 10, page[-1].date, page[-1].id)
+    assert [len(x) for x in pages] == [10, 10, 5]
+    assert sorted(x.id for page in pages for x in page) == sorted(x.id for x in created)
+    assert get_unread_counts(db, [alice]) == {alice: 25}
+
+    delete_notification(db, created[0].id)
+    assert get_unread_counts(db, [alice]) == {alice: 24}
+    assert all(x.is_read for x in mark_all_as_read(db, alice))
+    assert get_unread_counts(db, [alice]) == {alice: 0}
+
+
+def test_counters_start_from_existing_unread_notifications(db, monkeypatch):
+    monkeypatch.setattr(notifications_api, "connection_manager", FakeManager())
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+    # stored before the counters existed
+    for i in range(3):
+        db.add(Notification(id=uuid.uuid4(), user_details_id=alice, action=str(i), is_read=i == 0))
+    db.add(Notification(id=uuid.uuid4(), user_details_id=bob, action="old", is_read=False))
+    db.commit()
+    assert get_unread_counts(db, [alice, bob]) == {alice: 2, bob: 1}
+
+    notifications_api.create_and_push_notifications(
+        db, [CreateAndUpdateNotification(user_details_id=alice, action="new")]
+    )
+    assert db.get(NotificationUnreadCount, alice).unread_count == 3
+    mark_all_as_read(db, bob)
+    assert get_unread_counts(db, [alice, bob]) == {alice: 3, bob: 0}
+
+    # a counter that drifted below the real count never goes negative
+    db.get(NotificationUnreadCount, alice).unread_count = 1
+    db.commit()
+    mark_all_as_read(db, alice)
+    assert get_unread_counts(db, [alice]) == {alice: 0}
+
+
+def test_cleanup_deletes_old_notifications_in_batches(db, monkeypatch):
+    monkeypatch.setattr(notifications_api, "connection_manager", FakeManager())
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+    created = notifications_api.create_and_push_notifications(
+        db,
+        [CreateAndUpdateNotification(user_details_id=alice) for _ in range(7)]
+        + [CreateAndUpdateNotification(user_details_id=bob) for _ in range(3)],
+    )
+    mark_all_as_read(db, bob)
+    old = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(31)
+    db.execute(
+        update(Notification)
+        .where(Notification.id.in_([x.id for x in created[1:]]))
+        .values(date=old)
+    )
+    db.commit()
+
+    assert cleanup_notifications(db, batch_size=4) == {"deleted_rows": 9}
+    assert [x.id for x in get_notifications(db, alice)] == [created[0].id]
+    assert get_unread_counts(db, [alice, bob]) == {alice: 1, bob: 0}
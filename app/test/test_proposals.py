@@ -0,0 +1,125 @@
+import uuid
+
+from sqlalchemy import event
+
+from db.models.users import UserDetails, UserFollower
+from db.models.proposals import (
+    Proposal,
+    ProposalReference,
+    ProposalLike,
+    ProposalFollower,
+    Comment,
+    Addendum,
+    ProposalCommentLike,
+)
+from db.crud.proposals import (
+    get_proposal_by_id,
+    get_proposals_by_dao_id,
+    get_proposal_summaries_by_dao_id,
+)
+
+
+def seed_dao(db, n: int):
+    dao_id = uuid.uuid4()
+    author = UserDetails(id=uuid.uuid4(), dao_id=dao_id, name="author")
+    fan = UserDetails(id=uuid.uuid4(), dao_id=dao_id, name="fan")
+    db.add_all([author, fan])
+    db.add(UserFollower(follower_id=fan.id, followee_id=author.id))
+    previous = None
+    for i in range(n):
+        proposal = Proposal(
+            id=uuid.uuid4(),
+            dao_id=dao_id,
+            user_details_id=author.id,
+            name=f"proposal {i}",
+            actions={},
+            tags={"tags_list": ["tag"]},
+            attachments={},
+            votes={},
+            status="discussion",
+            is_proposal=False,
+        )
+        db.add(proposal)
+        db.add(ProposalLike(proposal_id=proposal.id, user_details_id=fan.id, liked=True))
+        db.add(ProposalFollower(proposal_id=proposal.id, user_details_id=fan.id))
+        db.add(Addendum(proposal_id=proposal.id, name="addendum"))
+        comment = Comment(id=uuid.uuid4(), proposal_id=proposal.id, user_details_id=fan.id, comment="hi")
+        db.add(comment)
+        db.add(ProposalCommentLike(comment_id=comment.id, user_details_id=author.id, liked=False))
+        if previous:
+            db.add(ProposalReference(referring_proposal_id=proposal.id, referred_proposal_id=previous.id))
+        previous = proposal
+    db.commit()
+    return dao_id
+
+
+def count_queries(db, func, *args):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        ret = func(db, *args)
+    finally:
+        event.remove(db.bind, "before_cursor_execute", before_cursor_execute)
+    return ret, len(statements)
+
+
+def test_get_proposals_by_dao_id_query_count_is_constant(db):
+    small_dao_id = seed_dao(db, 2)
+    large_dao_id = seed_dao(db, 40)
+
+    small, small_count = count_queries(db, get_proposals_by_dao_id, small_dao_id)
+    large, large_count = count_queries(db, get_proposals_by_dao_id, large_dao_id)
+
+    assert len(small) == 2
+    assert len(large) == 40
+    assert small_count == large_count
+
+
+def test_get_proposals_by_dao_id_hydrates_every_proposal(db):
+    dao_id = seed_dao(db, 3)
+    author = db.query(UserDetails).filter(UserDetails.dao_id == dao_id, UserDetails.name == "author").one()
+    fan = db.query(UserDetails).filter(UserDetails.dao_id == dao_id, UserDetails.name == "fan").one()
+    ids = [
+        db.query(Proposal).filter(Proposal.dao_id == dao_id, Proposal.name == f"proposal {i}").one().id
+        for i in range(3)
+    ]
+
+    def check(proposal, i):
+        assert proposal.id == ids[i]
+        assert (proposal.likes, proposal.dislikes, proposal.followers) == ([fan.id], [], [fan.id])
+        assert [(x.comment, x.alias, x.likes, x.dislikes) for x in proposal.comments] == [
+            ("hi", "fan", [], [author.id])
+        ]
+        assert [x.name for x in proposal.addendums] == ["addendum"]
+        # every proposal refers to the one seeded before it
+        assert proposal.references == ids[:i][-1:]
+        assert [(x.id, x.likes, x.dislikes) for x in proposal.references_meta] == [
+            (x, [fan.id], []) for x in ids[:i][-1:]
+        ]
+        assert proposal.referenced == ids[i + 1 : i + 2]
+        assert [x.id for x in proposal.referenced_meta] == ids[i + 1 : i + 2]
+        assert (proposal.alias, proposal.user_followers, proposal.created) == ("author", [fan.id], 3)
+        assert proposal.tags == ["tag"]
+
+    proposals = sorted(get_proposals_by_dao_id(db, dao_id), key=lambda x: ids.index(x.id))
+    assert len(proposals) == 3
+    for i, proposal in enumerate(proposals):
+        check(proposal, i)
+        check(get_proposal_by_id(db, ids[i]), i)
+
+
+def test_get_proposal_summaries_by_dao_id(db):
+    dao_id = seed_dao(db, 3)
+    summaries, count = count_queries(db, get_proposal_summaries_by_dao_id, dao_id)
+
+    assert count == 1
+    assert len(summaries) == 3
+    for summary in summaries:
+        assert summary.likes == 1
+        assert summary.dislikes == 0
+        assert summary.followers == 1
+        assert summary.comments == 1
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+from core.async_handler import JobScheduler
+
+
+class FakeRedis:
+    # just enough of redis for leases: set nx px, pttl and the release script
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def alive(self, key):
+        return key in self.data and self.data[key][1] > time.monotonic()
+
+    def set(self, key, value, nx=False, px=None):
+        with self.lock:
+            if nx and self.alive(key):
+                return None
+            self.data[key] = (value, time.monotonic() + px / 1000)
+            return True
+
+    def pttl(self, key):
+        with self.lock:
+            if not self.alive(key):
+                return -2
+            return int((self.data[key][1] - time.monotonic()) * 1000)
+
+    def hset(self, key, field, value):
+        with self.lock:
+            self.data.setdefault(key, {})[field.encode()] = value.encode()
+
+    def hgetall(self, key):
+        return self.data.get(key, {})
+
+    def eval(self, script, numkeys, key, token, px):
+        with self.lock:
+            if self.alive(key) and self.data[key][0] == token:
+                self.data[key] = (token, time.monotonic() + int(px) / 1000)
+
+
+def test_job_runs_once_per_interval_across_workers():
+    client = FakeRedis()
+    running = []
+    overlaps = []
+    runs = []
+
+    def job():
+        if running:
+            overlaps.append(1)
+        running.append(1)
+        runs.append(time.monotonic())
+        time.sleep(0.05)
+        running.pop()
+
+    async def run_workers():
+        workers = [JobScheduler(client) for _ in range(4)]
+        for worker in workers:
+            worker.register(job, interval=0.2, jitter=0.1)
+            worker.start()
+        await asyncio.sleep(1.1)
+        for worker in workers:
+            await worker.stop()
+        return workers
+
+    workers = asyncio.run(run_workers())
+
+    # 4 workers without a lease would have run it about 16 times
+    assert 3 <= len(runs) <= 6
+    assert overlaps == []
+    metrics = [x.metrics()["job"] for x in workers]
+    # a run cut off by stop() is not recorded
+    assert sum(x["runs"] for x in metrics) in [len(runs) - 1, len(runs)]
+    assert sum(x["skipped"] for x in metrics) > 0
+    assert all(x["failures"] == 0 for x in metrics)
+    assert workers[0].cluster_metrics()["job"]["runs"] >= 1
+
+
+def test_failing_job_is_recorded_and_retried():
+    def broken():
+        raise Exception("upstream down")
+
+    async def run_worker():
+        worker = JobScheduler(FakeRedis())
+        worker.register(broken, interval=0.1, jitter=0)
+        worker.start()
+        await asyncio.sleep(0.35)
+        await worker.stop()
+        return worker
+
+    metrics = asyncio.run(run_worker()).metrics()["broken"]
+    assert metrics["runs"] >= 3
+    assert metrics["failures"] == metrics["runs"]
@@ -0,0 +1,82 @@
+import threading
+import time
+import uuid
+
+from types import SimpleNamespace
+
+from api import staking as staking_api
+from db.schemas.staking import GetStakeRequest
+from ergo import indexed_node_client, token_registry
+from cache.lru import LRUCache
+
+
+DELAY = 0.05
+
+
+def stake_key_info(key, profit_tokens):
+    return {
+        "stakeKey": key,
+        "stakeRecord": {"stake": 10000, "lockedUntil": 0, "rewards": [10**9] + [100] * len(profit_tokens)},
+        "profitTokens": profit_tokens,
+    }
+
+
+def test_get_stake_resolves_all_addresses_in_one_call(monkeypatch, db):
+    addresses = [f"address_{i}" for i in range(8)]
+    fetched = []
+    stake_calls = []
+    token_info_calls = []
+    lock = threading.Lock()
+    in_flight = {"now": 0, "peak": 0}
+
+    def fetch_balance(address):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        time.sleep(DELAY)
+        with lock:
+            in_flight["now"] -= 1
+            fetched.append(address)
+        tokens = [{"tokenId": "key_" + address}] if address in ["address_1", "address_5"] else []
+        return {"confirmed": {"tokens": tokens}, "unconfirmed": {"tokens": []}}
+
+    def get_stake(dao_key, potential_keys):
+        stake_calls.append(set(potential_keys))
+        return [stake_key_info(x, ["profit"]) for x in sorted(potential_keys)]
+
+    def fetch_token(token_id):
+        with lock:
+            token_info_calls.append(token_id)
+        return {"id": token_id, "name": "name_" + token_id, "description": "", "decimals": 2, "emissionAmount": 1}
+
+    dao = SimpleNamespace(dao_key="dao", tokenomics=SimpleNamespace(token_id="paideia"))
+    monkeypatch.setattr(staking_api, "get_dao", lambda db, dao_id: dao)
+    monkeypatch.setattr(
+        staking_api,
+        "get_ergo_addresses_by_user_id",
+        lambda db, user_id: [SimpleNamespace(address=x) for x in addresses],
+    )
+    monkeypatch.setattr(staking_api, "get_height", lambda: 1000)
+    monkeypatch.setattr(staking_api.staking, "get_stake", get_stake)
+    monkeypatch.setattr(token_registry, "fetch_token", fetch_token)
+    monkeypatch.setattr(token_registry, "token_lru", LRUCache())
+    monkeypatch.setattr(indexed_node_client, "fetch_balance", fetch_balance)
+    stored = {}
+    monkeypatch.setattr(indexed_node_client.cache, "get_many", lambda keys: [stored.get(x) for x in keys])
+    monkeypatch.setattr(indexed_node_client.cache, "set_many", lambda values, timeout=-1: stored.update(values))
+
+    res = staking_api.get_stake(GetStakeRequest(dao_id=uuid.uuid4(), user_id=uuid.uuid4()), db)
+
+    assert sorted(fetched) == addresses
+    # balances of all addresses are fetched together
+    assert in_flight["peak"] >= len(addresses) / 2
+    assert stake_calls == [{"key_address_1", "key_address_5"}]
+    # every stake key is returned, not only the first one per address
+    assert [x.key_id for x in res.stake_keys] == ["key_address_1", "key_address_5"]
+    assert res.stake_keys[0].profit[1].token_name == "name_profit"
+    assert res.stake_keys[0].profit[1].amount == 1.0
+    assert sorted(token_info_calls) == ["paideia", "profit"]
+
+    # confirmed balances at the same height come from the cache
+    staking_api.get_stake(GetStakeRequest(dao_id=uuid.uuid4(), user_id=uuid.uuid4()), db)
+    assert sorted(fetched) == addresses
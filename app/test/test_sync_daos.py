@@ -0,0 +1,100 @@
+import pytest
+
+from cache.cache import cache
+from db.models.dao import Dao
+from db.models.dao_design import DaoDesign, FooterSocialLinks
+from db.models.governance import Governance, GovernanceWhitelist
+from db.models.tokenomics import Distribution, Tokenomics
+from sync import sync_daos
+
+
+def dao_config(token_id: str):
+    return {
+        "im.paideia.dao.quorum": {"value": "50"},
+        "im.paideia.dao.min.proposal.time": {"value": "86400000"},
+        "im.paideia.dao.threshold": {"value": "60"},
+        "im.paideia.dao.tokenid": {"value": token_id},
+        "im.paideia.dao.desc": {"value": "on chain description"},
+        "im.paideia.dao.logo": {"value": "https://logo"},
+        "im.paideia.dao.url": {"value": "My Dao"},
+    }
+
+
+class FakeState:
+    def __init__(self):
+        # dao_key to [name, config_height, config_box_id]
+        self.daos = {}
+        self.configs = {}
+
+    def get_all_daos(self):
+        return self.daos
+
+    def get_dao_config(self, dao_key: str):
+        return self.configs[dao_key]
+
+
+@pytest.fixture
+def state(monkeypatch):
+    fake = FakeState()
+    profiles = []
+    monkeypatch.setattr(sync_daos, "dao", fake)
+    monkeypatch.setattr(
+        sync_daos, "create_user_dao_profile", lambda db, user_id, dao_id: profiles.append(dao_id)
+    )
+    monkeypatch.setattr(cache, "invalidate", lambda key: None)
+    fake.profiles = profiles
+    return fake
+
+
+def test_new_dao_gets_design_governance_and_tokenomics(db, state):
+    state.daos["dao_key"] = ["My Dao", 100, "box_1"]
+    state.configs["dao_key"] = dao_config("token_1")
+
+    assert sync_daos.sync_daos(db) == ["dao_key"]
+
+    db_dao = db.query(Dao).filter(Dao.dao_key == "dao_key").one()
+    assert db_dao.dao_url == "My%20Dao"
+    assert db_dao.config_box_id == "box_1"
+    assert state.profiles == [db_dao.id]
+    assert db.query(DaoDesign).filter(DaoDesign.dao_id == db_dao.id).one().logo_url == "https://logo"
+    governance = db.query(Governance).filter(Governance.dao_id == db_dao.id).one()
+    assert (governance.quorum, governance.support_needed) == (50, 60)
+    tokenomics = db.query(Tokenomics).filter(Tokenomics.dao_id == db_dao.id).one()
+    assert tokenomics.token_id == "token_1"
+
+
+def test_token_change_clears_token_details_only(db, state):
+    state.daos["dao_key"] = ["My Dao", 100, "box_1"]
+    state.configs["dao_key"] = dao_config("token_1")
+    sync_daos.sync_daos(db)
+    db_dao = db.query(Dao).filter(Dao.dao_key == "dao_key").one()
+    design = db.query(DaoDesign).filter(DaoDesign.dao_id == db_dao.id).one()
+    governance = db.query(Governance).filter(Governance.dao_id == db_dao.id).one()
+    tokenomics = db.query(Tokenomics).filter(Tokenomics.dao_id == db_dao.id).one()
+    tokenomics.token_name, tokenomics.token_ticker, tokenomics.token_decimals = "Token", "TKN", 2
+    db.add(FooterSocialLinks(design_id=design.id, social_network="x", link_url="https://x"))
+    db.add(GovernanceWhitelist(governance_id=governance.id, ergo_address_id=1))
+    db.add(Distribution(tokenomics_id=tokenomics.id, distribution_type="airdrop", balance=10))
+    db.commit()
+
+    state.daos["dao_key"] = ["My Dao", 200, "box_2"]
+    state.configs["dao_key"] = dao_config("token_2")
+    assert sync_daos.sync_daos(db) == ["dao_key"]
+
+    db.expire_all()
+    tokenomics = db.query(Tokenomics).filter(Tokenomics.dao_id == db_dao.id).one()
+    assert tokenomics.token_id == "token_2"
+    assert (tokenomics.token_name, tokenomics.token_ticker, tokenomics.token_decimals) == (
+        None,
+        None,
+        None,
+    )
+    assert state.profiles == [db_dao.id]
+    assert db.query(FooterSocialLinks).filter(FooterSocialLinks.design_id == design.id).count() == 1
+    assert (
+        db.query(GovernanceWhitelist)
+        .filter(GovernanceWhitelist.governance_id == governance.id)
+        .count()
+        == 1
+    )
+    assert db.query(Distribution).filter(Distribution.tokenomics_id == tokenomics.id).count() == 1
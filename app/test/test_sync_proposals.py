@@ -0,0 +1,138 @@
+import uuid
+import pytest
+
+from config import Config, Network
+from db.models.dao import Dao
+from db.models.users import User, UserDetails
+from api.proposals import get_proposals
+from sync import sync_proposals
+
+
+def box_id(upstream, i: int):
+    # only proposal 0 changes box between versions
+    return f"box_{i}_{upstream.box_version if i == 0 else 0}"
+
+
+@pytest.fixture
+def paideia_state(fake_upstream, monkeypatch):
+    # serves /dao/{key}/proposals and /proposal/{key}/{index}
+    fake_upstream.proposal_count = 0
+    fake_upstream.box_version = 0
+
+    def proposals(path, body):
+        return [
+            {
+                "proposalIndex": i,
+                "proposalName": f"proposal {i}",
+                "proposalBoxId": box_id(fake_upstream, i),
+                "proposalHeight": 1000 + i,
+            }
+            for i in range(fake_upstream.proposal_count)
+        ]
+
+    def proposal(path, body):
+        i = int(path.strip("/").split("/")[2])
+        return {
+            "proposalType": "Yes/No",
+            "proposal": {
+                "name": f"proposal {i}",
+                "actions": [],
+                "box_height": 1000 + i,
+                "box_id": box_id(fake_upstream, i),
+                "votes": [0, 0],
+                "passed": -1,
+                "endTime": 1700000000000,
+            },
+        }
+
+    fake_upstream.route("GET", "/dao/", proposals)
+    fake_upstream.route("GET", "/proposal/", proposal)
+    monkeypatch.setitem(Config[Network], "paideia_state", fake_upstream.url)
+    monkeypatch.setattr(sync_proposals, "proposal_box_watermarks", {})
+    return fake_upstream
+
+
+def seed_dao(db):
+    admin_id = Config[Network].admin_id
+    db.add(User(id=admin_id, alias="admin", hashed_password="-"))
+    db_dao = Dao(id=uuid.uuid4(), dao_key="dao_key", dao_name="dao", dao_url="dao")
+    db.add(db_dao)
+    db.add(UserDetails(user_id=admin_id, dao_id=db_dao.id, name="admin", social_links=[]))
+    db.commit()
+    return db_dao.id
+
+
+def detail_requests(stub):
+    return [x for x in stub.requests if x.startswith("/proposal/")]
+
+
+def test_sync_only_fetches_changed_boxes(db, paideia_state):
+    dao_id = seed_dao(db)
+    paideia_state.proposal_count = 5
+
+    sync_proposals.sync_proposals_for_dao(db, dao_id, "dao_key")
+    assert len(detail_requests(paideia_state)) == 5
+    assert len(get_proposals(dao_id, db)) == 5
+
+    paideia_state.requests = []
+    assert sync_proposals.sync_proposals_for_dao(db, dao_id, "dao_key") == 0
+    assert len(detail_requests(paideia_state)) == 0
+
+    paideia_state.box_version = 1
+    assert sync_proposals.sync_proposals_for_dao(db, dao_id, "dao_key") == 1
+    assert detail_requests(paideia_state) == ["/proposal/dao_key/0"]
+    updated = next(x for x in get_proposals(dao_id, db) if x.on_chain_id == 0)
+    assert updated.box_height == 1000
+
+
+def test_unchanged_boxes_make_no_create_or_update(db, paideia_state, monkeypatch):
+    dao_id = seed_dao(db)
+    paideia_state.proposal_count = 5
+    sync_proposals.sync_proposals_for_dao(db, dao_id, "dao_key")
+
+    calls = []
+    monkeypatch.setattr(
+        sync_proposals, "create_proposal_from_chain", lambda *args: calls.append("create")
+    )
+    monkeypatch.setattr(
+        sync_proposals, "update_proposal_from_chain", lambda *args: calls.append("update")
+    )
+    sync_proposals.sync_proposals_for_dao(db, dao_id, "dao_key")
+    assert calls == []
+
+    paideia_state.box_version = 1
+    sync_proposals.sync_proposals_for_dao(db, dao_id, "dao_key")
+    assert calls == ["update"]
+
+
+def test_failed_create_is_retried(db, paideia_state, monkeypatch):
+    dao_id = seed_dao(db)
+    paideia_state.proposal_count = 2
+    create_proposal_from_chain = sync_proposals.create_proposal_from_chain
+
+    def failing_create(db, dao_id, dao_key, proposal_index):
+        if proposal_index == 1:
+            raise Exception("paideia_state unavailable")
+        return create_proposal_from_chain(db, dao_id, dao_key, proposal_index)
+
+    monkeypatch.setattr(sync_proposals, "create_proposal_from_chain", failing_create)
+    sync_proposals.sync_proposals_for_dao(db, dao_id, "dao_key")
+    assert sorted(x.on_chain_id for x in get_proposals(dao_id, db)) == [0]
+    assert 1 not in sync_proposals.proposal_box_watermarks[dao_id]
+
+    monkeypatch.setattr(
+        sync_proposals, "create_proposal_from_chain", create_proposal_from_chain
+    )
+    assert sync_proposals.sync_proposals_for_dao(db, dao_id, "dao_key") == 1
+    assert sorted(x.on_chain_id for x in get_proposals(dao_id, db)) == [0, 1]
+
+
+def test_reads_never_reach_paideia_state(db, paideia_state):
+    dao_id = seed_dao(db)
+    paideia_state.proposal_count = 50
+    sync_proposals.sync_proposals_for_dao(db, dao_id, "dao_key")
+
+    paideia_state.requests = []
+    for _ in range(10):
+        get_proposals(dao_id, db)
+    assert paideia_state.requests == []
@@ -0,0 +1,164 @@
+import threading
+
+from sqlalchemy.orm import sessionmaker
+
+from api import assets
+from cache.cache import cache
+from ergo import token_data_provider
+from ergo.schemas import TokenIdList
+from ergo.token_data_provider import (
+    BaseDataProvider,
+    CandleStore,
+    LocalDataProvider,
+    OhlcvSeries,
+    TokenDataBuilder,
+)
+
+
+HOUR = 60 * 60
+
+
+class FakeCrux:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def record(self, *call):
+        with self.lock:
+            self.calls.append(call)
+
+    def get_ergo_price(self):
+        self.record("erg_price")
+        return {"price": 2.0}
+
+    def get_token_details_by_id(self, token_id):
+        self.record("token_info", token_id)
+        return {
+            "token_name": "name_" + token_id,
+            "value_in_erg": 0.5,
+            "liquid_supply": 1000,
+            "minted": 2000,
+        }
+
+    def get_ohclv_by_token_name(self, token_name, start_time, end_time, resolution, countback):
+        self.record("ohclv", token_name, resolution, countback, end_time)
+        step = {"60": HOUR, "1D": 24 * HOUR, "1M": 30 * 24 * HOUR}[resolution]
+        bars = range(countback, 0, -1)
+        return {
+            "s": "ok",
+            "t": [end_time - i * step for i in bars],
+            "o": [float(i) for i in bars],
+            "h": [float(i) + 1 for i in bars],
+            "l": [float(i) - 1 for i in bars],
+            "c": [float(i) + 0.5 for i in bars],
+            "v": [10.0 for i in bars],
+        }
+
+
+def use_fake_crux(monkeypatch, db, token_ids):
+    crux = FakeCrux()
+    for name in ["get_ergo_price", "get_token_details_by_id", "get_ohclv_by_token_name"]:
+        monkeypatch.setattr(BaseDataProvider, name, getattr(crux, name))
+    monkeypatch.setattr(LocalDataProvider, "get_dao_token_ids", lambda: token_ids)
+    stored = {}
+    monkeypatch.setattr(cache, "set_fresh", lambda key, value: stored.update({key: value}))
+    monkeypatch.setattr(token_data_provider, "SessionLocal", sessionmaker(bind=db.bind))
+    return crux, stored
+
+
+def test_update_token_data_cache_fetches_each_series_once(monkeypatch, db):
+    crux, stored = use_fake_crux(monkeypatch, db, ["a", "b", "c"])
+    # one thread at a time on the shared sqlite connection
+    monkeypatch.setattr(token_data_provider, "TOKEN_STATS_WORKERS", 1)
+    token_data_provider.update_token_data_cache()
+
+    assert len(stored) == 3
+    assert len([x for x in crux.calls if x[0] == "erg_price"]) == 1
+    ohclv = [x for x in crux.calls if x[0] == "ohclv"]
+    assert len(ohclv) == 3 * len(CandleStore.BACKFILL)
+    assert len(set(ohclv)) == len(ohclv)
+
+
+def test_candle_store_only_fetches_new_candles(monkeypatch, db):
+    crux, stored = use_fake_crux(monkeypatch, db, ["a"])
+    TokenDataBuilder.build_stats_for_token_id("a", db=db)
+    backfill = {x[2]: x[3] for x in crux.calls if x[0] == "ohclv"}
+    assert backfill == CandleStore.BACKFILL
+
+    crux.calls = []
+    TokenDataBuilder.build_stats_for_token_id("a", db=db)
+    # the last stored candle and anything after it
+    assert all(x[3] <= 3 for x in crux.calls if x[0] == "ohclv")
+
+
+def test_summaries_match_separate_fetches(monkeypatch, db):
+    crux, stored = use_fake_crux(monkeypatch, db, ["a"])
+    stats = TokenDataBuilder.build_stats_for_token_id("a", db=db)
+    summary = stats.token_price_history_summary
+
+    # bars count down to 1 at the latest bar, open of the first bar in a window of n is n
+    assert summary.hour_24.open == 24
+    assert summary.hour_24.close == 1.5
+    # the bar starting exactly a day ago is the last one of yesterday, as with to=now-day
+    assert summary.yesterday.open == 47
+    assert summary.yesterday.close == 24.5
+    assert summary.day_7.open == 7
+    assert summary.day_90.volume == 30
+    assert summary.all_time.high == 61
+    assert stats.price == 1.0
+
+
+def test_custom_range_uses_stored_candles(monkeypatch, db):
+    crux, stored = use_fake_crux(monkeypatch, db, ["a"])
+    TokenDataBuilder.build_stats_for_token_id("a", db=db)
+    calls = len(crux.calls)
+    now = next(x[4] for x in crux.calls if x[0] == "ohclv")
+
+    summary = TokenDataBuilder.summarize_range(db, "a", now - 6 * HOUR, now)
+    assert summary.open == 6
+    assert summary.close == 1.5
+    assert summary.volume == 60
+
+    # too many hourly candles, the daily ones are used
+    summary = TokenDataBuilder.summarize_range(db, "a", now - 100 * 24 * HOUR, now)
+    assert summary.open == 100
+    assert len(crux.calls) == calls
+
+
+def test_token_stats_batch_reports_failures_per_token(monkeypatch):
+    monkeypatch.setattr(cache, "get_fresh_many", lambda keys: [{"token_id": "a"}, None, None])
+
+    def get_or_compute(key, compute):
+        if key == "token_stats_cache_broken":
+            raise Exception("no market")
+        return compute()
+
+    monkeypatch.setattr(cache, "get_or_compute", get_or_compute)
+    monkeypatch.setattr(assets, "build_token_stats", lambda token_id: {"token_id": token_id})
+
+    res = assets.get_token_stats_batch(TokenIdList(token_ids=["a", "b", "broken", "a"]))
+    assert res["stats"] == {"a": {"token_id": "a"}, "b": {"token_id": "b"}}
+    assert res["errors"] == {"broken": "no market"}
+
+
+def test_last_bars_counts_bars_across_gaps():
+    # hourly bars with a five hour gap before the last two
+    t = [0, HOUR, 2 * HOUR, 8 * HOUR, 9 * HOUR]
+    series = OhlcvSeries(
+        {
+            "s": "ok",
+            "t": t,
+            "o": [1.0, 2, 3, 4, 5],
+            "h": [1.0] * 5,
+            "l": [1.0] * 5,
+            "c": [1.0, 2, 3, 4, 5],
+            "v": [1.0] * 5,
+        },
+        "60",
+    )
+    assert series.last_bars(3) == (2 * HOUR, 9 * HOUR)
+    assert series.summarize([series.last_bars(3)])[0].volume == 3
+    assert series.last_bars(2, 8 * HOUR) == (2 * HOUR, 8 * HOUR)
+    assert series.last_bars(10) == (0, 9 * HOUR)
+    # nothing at or before the end time
+    assert series.summarize([series.last_bars(2, -1)])[0].volume is None
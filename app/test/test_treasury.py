@@ -0,0 +1,124 @@
+import pytest
+
+from config import Config, Network
+from cache.cache import cache
+from cache.lru import LRUCache
+from core.http_client import node
+from ergo import crux_client, indexed_node_client, token_registry
+from api.dao import label_treasury_transactions
+
+
+TREASURY = "treasury_address"
+DELAY = 0.03
+
+
+def token(path, body):
+    token_id = path.strip("/").split("/")[1]
+    return {
+        "token_name": "token " + token_id,
+        "token_description": "",
+        "decimals": 2,
+        "minted": 1000,
+    }
+
+
+def box(path, body):
+    box_id = path.strip("/").split("/")[-1]
+    address = TREASURY if box_id.startswith("treasury") else "contract_" + box_id
+    return {
+        "boxId": box_id,
+        "inclusionHeight": None if box_id.startswith("mempool") else 1000,
+        "spentTransactionId": "spent",
+        "address": address,
+        "value": 2 * 10**9,
+        "assets": [{"tokenId": "t" + box_id[-1], "amount": 100}],
+    }
+
+
+@pytest.fixture
+def fake_node(fake_upstream, monkeypatch):
+    # serves boxes, token info and contract signatures with a fixed latency
+    fake_upstream.delay = DELAY
+    fake_upstream.route("GET", "/token/", token)
+    fake_upstream.route("GET", "/", box)
+    fake_upstream.route("POST", "/", lambda path, body: {"className": "ProfitSharing"})
+    url = fake_upstream.url
+    monkeypatch.setitem(Config[Network], "node", url)
+    monkeypatch.setitem(Config[Network], "paideia_state", url)
+    monkeypatch.setattr(
+        crux_client,
+        "get_token_info",
+        lambda token_id: node.get(url + "/token/" + token_id).json(),
+    )
+    monkeypatch.setattr(indexed_node_client, "box_lru", LRUCache())
+    monkeypatch.setattr(token_registry, "token_lru", LRUCache())
+    monkeypatch.setattr(cache, "get", lambda key: None)
+    monkeypatch.setattr(cache, "set", lambda key, value, timeout=-1: None)
+    monkeypatch.setattr(cache, "get_or_compute", lambda key, compute: compute())
+    return fake_upstream
+
+
+def page(n: int):
+    # every transaction spends one treasury box and one contract box
+    return [
+        {
+            "id": f"tx{i}",
+            "timestamp": i,
+            "inputs": [{"boxId": f"treasury{i}"}, {"boxId": f"contract{i}"}],
+            "outputs": [
+                {"address": TREASURY, "value": 1 * 10**9, "assets": []},
+            ],
+        }
+        for i in range(n)
+    ]
+
+
+def test_label_treasury_transactions(db, fake_node):
+    transactions = page(2)
+    transactions[1]["inputs"].append({"boxId": "contract0"})
+    labeled = label_treasury_transactions(db, TREASURY, transactions)
+
+    assert [x.transaction_id for x in labeled] == ["tx0", "tx1"]
+    assert labeled[0].label == "Profit Sharing"
+    assert labeled[0].amount[0].token_name == "Erg"
+    assert labeled[0].amount[0].amount == -1
+    assert labeled[0].amount[1].token_name == "token t0"
+    assert labeled[0].amount[1].amount == -1
+    # contract0 and its address are shared by both transactions
+    assert fake_node.requests.count("/blockchain/box/byId/contract0") == 1
+    assert fake_node.requests.count("/util/contractSignature") == 2
+
+
+def test_label_fetches_run_concurrently(db, fake_node):
+    label_treasury_transactions(db, TREASURY, page(10))
+
+    assert len(fake_node.requests) == 20 + 10 + 10
+    # the boxes of the page are fetched together, not one after another
+    assert fake_node.peak >= 10
+
+
+def test_confirmed_boxes_are_served_from_store(db, fake_node):
+    ids = ["treasury0", "contract0", "mempool0"]
+    boxes = indexed_node_client.get_boxes_by_ids(ids, db)
+    assert "spentTransactionId" not in boxes["contract0"]
+    assert len(fake_node.requests) == 3
+
+    fake_node.requests = []
+    indexed_node_client.box_lru.clear()
+    assert indexed_node_client.get_boxes_by_ids(ids, db) == boxes
+    # only the unconfirmed box goes back to the node
+    assert fake_node.requests == ["/blockchain/box/byId/mempool0"]
+
+
+def test_token_registry_fetches_unknown_tokens_once(db, fake_node):
+    tokens = token_registry.resolve_many(["a", "b", "a"], db)
+    assert tokens["a"]["name"] == "token a"
+    assert tokens["b"]["decimals"] == 2
+    assert sorted(fake_node.requests) == ["/token/a", "/token/b"]
+
+    fake_node.requests = []
+    token_registry.token_lru.clear()
+    # metadata never changes, later lookups come from chain_tokens
+    assert token_registry.resolve_many(["b", "a"], db) == tokens
+    assert token_registry.resolve("c", db)["name"] == "token c"
+    assert fake_node.requests == ["/token/c"]
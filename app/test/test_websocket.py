@@ -0,0 +1,156 @@
+import asyncio
+import queue
+import threading
+import time
+
+from websocket.connection_manager import ConnectionManager
+
+
+class FakePubSub:
+    def __init__(self, broker):
+        self.broker = broker
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        with self.broker.lock:
+            self.broker.subscribers.append(self.messages)
+
+    def listen(self):
+        while True:
+            yield {"data": self.messages.get()}
+
+
+class FakeBroker:
+    # redis pub/sub shared by several "processes"
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = []
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+    def publish(self, channel, data):
+        with self.lock:
+            for subscriber in self.subscribers:
+                subscriber.put(data.encode())
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, broker):
+        self.broker = broker
+        self.calls = []
+
+    def publish(self, channel, data):
+        self.calls.append((channel, data))
+
+    def execute(self):
+        for call in self.calls:
+            self.broker.publish(*call)
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0, broken: bool = False):
+        self.delay = delay
+        self.broken = broken
+        self.sent = []
+        self.received = None
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        await asyncio.sleep(self.delay)
+        if self.broken:
+            raise RuntimeError("socket closed")
+        self.sent.append(message)
+        self.received = time.perf_counter()
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+async def wait_for(condition, timeout=2):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+def test_messages_reach_sockets_held_by_other_processes():
+    broker = FakeBroker()
+
+    async def run():
+        api_worker = ConnectionManager(broker)
+        background_worker = ConnectionManager(broker)
+        socket = FakeWebSocket()
+        await api_worker.connect("notification_user_details_id_1", socket)
+        await wait_for(lambda: len(broker.subscribers) == 1)
+
+        await background_worker.send_personal_message("notification_user_details_id_1", {"n": 1})
+        await background_worker.send_personal_message("notification_user_details_id_2", {"n": 2})
+        await background_worker.broadcast("notification_user_details_id_1", {"n": 3})
+        await wait_for(lambda: len(socket.sent) == 2)
+        # the background worker holds no sockets and does not subscribe
+        assert len(broker.subscribers) == 1
+        return socket, api_worker
+
+    socket, api_worker = asyncio.run(run())
+    assert socket.sent == [{"n": 1}, {"n": 3}]
+    assert api_worker.stats()["delivered"] == 2
+
+
+def test_slow_consumer_is_disconnected_without_blocking_others():
+    broker = FakeBroker()
+
+    async def run():
+        manager = ConnectionManager(broker, queue_size=5)
+        slow = FakeWebSocket(delay=10)
+        fast = FakeWebSocket()
+        await manager.connect("proposal_comments_a", slow)
+        fast_connection = await manager.connect("proposal_comments_a", fast)
+        await wait_for(lambda: len(broker.subscribers) == 1)
+        for i in range(20):
+            await manager.broadcast("proposal_comments_a", {"n": i})
+        await wait_for(lambda: len(fast.sent) == 20)
+        return manager, slow, fast_connection
+
+    manager, slow, fast_connection = asyncio.run(run())
+    assert slow.closed == 1008
+    assert manager.topics == {"proposal_comments_a": {fast_connection}}
+    assert manager.stats()["slow_consumers"] == 1
+
+
+def test_broadcast_latency_with_stuck_and_dead_sockets():
+    broker = FakeBroker()
+    count = 5000
+
+    async def run():
+        manager = ConnectionManager(broker, send_timeout=2)
+        sockets = [FakeWebSocket() for _ in range(count)]
+        stuck = FakeWebSocket(delay=10)
+        dead = FakeWebSocket(broken=True)
+        for socket in sockets + [stuck, dead]:
+            await manager.connect("proposal_comments_a", socket)
+        await manager.connect("proposal_comments_b", FakeWebSocket())
+        await wait_for(lambda: len(broker.subscribers) == 1)
+
+        start = time.perf_counter()
+        await manager.broadcast("proposal_comments_a", {"comment": "hello"})
+        await wait_for(lambda: all(x.sent for x in sockets), timeout=5)
+        latency = max(x.received for x in sockets) - start
+        await wait_for(lambda: manager.stats()["connections"] == count + 1, timeout=5)
+        return manager, stuck, latency
+
+    manager, stuck, latency = asyncio.run(run())
+    # each socket sends on its own task, the stuck one does not hold up the rest
+    assert latency < 2
+    assert stuck.closed == 1008
+    stats = manager.stats()
+    assert stats["send_timeouts"] == 1
+    assert stats["send_errors"] == 1
+    assert stats["topics"] == 2
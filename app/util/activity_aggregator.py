@@ -12,9 +12,13 @@ from db.models.notifications import Notification
 
 
 def get_aggregated_activities(db: Session, dao_id: uuid.UUID):
-    cached = cache.get("get_aggregated_activities_" + str(dao_id))
-    if cached:
-        return cached
+    return cache.get_or_compute(
+        "get_aggregated_activities_" + str(dao_id),
+        lambda: aggregate_activities(db, dao_id),
+    )
+
+
+def aggregate_activities(db: Session, dao_id: uuid.UUID):
     db_activities = get_activities_by_dao_id(db, dao_id)
     notification_activites = get_notification_activities_by_dao_id(db, dao_id)
     treasury_activities = get_tresuary_activites_by_dao_id(db, dao_id)
@@ -29,7 +33,6 @@ def get_aggregated_activities(db: Session, dao_id: uuid.UUID):
         activities.append(activity)
     activities.sort(key=lambda x: datetime.strptime(
         x["date"].split("+")[0], "%Y-%m-%d %H:%M:%S.%f").timestamp(), reverse=True)
-    cache.set("get_aggregated_activities_" + str(dao_id), activities)
     return activities
 
 
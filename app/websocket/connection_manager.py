@@ -1,28 +1,192 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import typing as t
+
 from fastapi import WebSocket
 
+from cache.redis_client import redisClient
+from config import Config, Network
+
+
+CFG = Config[Network]
+WEBSOCKET_CHANNEL = "websocket_messages"
+# policy violation close code for clients that can not keep up or stopped reading
+SLOW_CONSUMER_CLOSE_CODE = 1008
+
+
+class Connection:
+    """
+    One socket with its own bounded send queue, drained by a sender task so
+    a slow client never blocks the publisher or other sockets.
+    """
+
+    def __init__(self, topic: str, websocket: WebSocket, queue_size: int):
+        self.topic = topic
+        self.websocket = websocket
+        self.queue = asyncio.Queue(queue_size)
+        self.sender = None
+
+    def put(self, message) -> bool:
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def send_loop(self, timeout: float):
+        while True:
+            message = await self.queue.get()
+            await asyncio.wait_for(self.websocket.send_json(message), timeout)
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections = {}
+    """
+    Sockets are indexed by topic, several sockets can share one. Messages
+    are published on a redis channel and delivered by whichever process
+    holds the sockets, so api workers and the background worker can all
+    reach every connected client.
+    """
 
-    async def connect(self, id: str, websocket: WebSocket):
+    def __init__(
+        self,
+        client=redisClient,
+        queue_size: int = CFG.websocket_queue_size,
+        send_timeout: float = CFG.websocket_send_timeout,
+    ):
+        self.client = client
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.topics = {}
+        self.loop = None
+        self.listener = None
+        self.listener_lock = threading.Lock()
+        self.counter_lock = threading.Lock()
+        self.counters = {
+            "published": 0,
+            "delivered": 0,
+            "slow_consumers": 0,
+            "send_timeouts": 0,
+            "send_errors": 0,
+        }
+
+    async def connect(self, topic: str, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections[id] = websocket
-
-    def disconnect(self, id: str):
-        if id in self.active_connections:
-            del self.active_connections[id]
-
-    async def send_personal_message(self, id: str, message):
-        if id in self.active_connections:
-            await self.active_connections[id].send_json(message)
-
-    async def send_personal_message_by_substring_matcher(self, key: str, message):
-        # sends message to all matching web socket ids
-        for id in self.active_connections:
-            # if key is substring
-            if key in id:
-                await self.active_connections[id].send_json(message)
+        self.loop = asyncio.get_running_loop()
+        self.start_listener()
+        connection = Connection(topic, websocket, self.queue_size)
+        connection.sender = asyncio.create_task(self.run_sender(connection))
+        self.topics.setdefault(topic, set()).add(connection)
+        return connection
+
+    def disconnect(self, connection: Connection):
+        connections = self.topics.get(connection.topic)
+        if connections is None or connection not in connections:
+            return
+        connections.discard(connection)
+        if len(connections) == 0:
+            del self.topics[connection.topic]
+        connection.sender.cancel()
+
+    async def send_personal_message(self, topic: str, message):
+        await self.broadcast(topic, message)
+
+    async def broadcast(self, topic: str, message):
+        # sends message to every socket on the topic, in any process
+        await self.broadcast_many([(topic, message)])
+
+    async def broadcast_many(self, messages: t.List[t.Tuple[str, t.Any]]):
+        try:
+            await asyncio.to_thread(self.publish_many, messages)
+        except Exception as e:
+            # without the broker only sockets of this process can be reached
+            logging.error(f"websocket publish: {str(e)}")
+            for topic, message in messages:
+                self.deliver(json.loads(json.dumps({"topic": topic, "message": message}, default=str)))
+
+    def publish_many(self, messages: t.List[t.Tuple[str, t.Any]]):
+        """
+        Blocking publish for code outside the event loop, all messages go out
+        in one round trip
+        """
+        if len(messages) == 0:
+            return
+        pipeline = self.client.pipeline(transaction=False)
+        for topic, message in messages:
+            pipeline.publish(
+                WEBSOCKET_CHANNEL,
+                json.dumps({"topic": topic, "message": message}, default=str),
+            )
+        pipeline.execute()
+        with self.counter_lock:
+            self.counters["published"] += len(messages)
+
+    def deliver(self, envelope: dict):
+        # only queues the message, the sender tasks write to the sockets concurrently
+        for connection in list(self.topics.get(envelope["topic"], ())):
+            if connection.put(envelope["message"]):
+                self.count("delivered")
+            else:
+                # dropping messages silently would leave the client out of sync
+                self.count("slow_consumers")
+                self.evict(connection)
+
+    async def run_sender(self, connection: Connection):
+        try:
+            await connection.send_loop(self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.count("send_timeouts")
+            self.evict(connection)
+        except Exception as e:
+            # closed or broken socket
+            self.count("send_errors")
+            logging.info(f"websocket send to {connection.topic}: {str(e)}")
+            self.evict(connection)
+
+    def evict(self, connection: Connection):
+        self.disconnect(connection)
+        asyncio.ensure_future(self.close(connection, SLOW_CONSUMER_CLOSE_CODE))
+
+    async def close(self, connection: Connection, code: int):
+        try:
+            await connection.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def stats(self):
+        with self.counter_lock:
+            ret = dict(self.counters)
+        ret["topics"] = len(self.topics)
+        ret["connections"] = sum(len(x) for x in list(self.topics.values()))
+        return ret
+
+    def count(self, counter: str):
+        with self.counter_lock:
+            self.counters[counter] += 1
+
+    def start_listener(self):
+        # only processes holding sockets subscribe, publishing needs no listener
+        if self.listener is not None:
+            return
+        with self.listener_lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, daemon=True)
+                self.listener.start()
+
+    def listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(WEBSOCKET_CHANNEL)
+                for message in pubsub.listen():
+                    self.loop.call_soon_threadsafe(self.deliver, json.loads(message["data"]))
+            except Exception as e:
+                logging.error(f"websocket listener: {str(e)}")
+            time.sleep(1)
 
 
 connection_manager = ConnectionManager()
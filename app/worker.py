@@ -0,0 +1,40 @@
+import asyncio
+import logging
+import signal
+
+from core.async_handler import scheduler
+from ergo.token_data_provider import update_token_data_cache
+from notifcations.sync_notifications import sync_notifications
+from sync.sync_daos import sync_daos
+from sync.sync_proposals import sync_proposals
+
+
+logging.basicConfig(
+    format='{asctime}:{name:>8s}:{levelname:<8s}::{message}',
+    style='{',
+    level=logging.INFO,
+)
+
+
+def register_jobs():
+    scheduler.register(update_token_data_cache)
+    scheduler.register(sync_notifications)
+    scheduler.register(sync_daos)
+    scheduler.register(sync_proposals)
+
+
+async def run():
+    # background jobs, run apart from the api processes with python -m worker
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    register_jobs()
+    scheduler.start()
+    logging.info("worker started: " + ", ".join(scheduler.jobs))
+    await stop.wait()
+    await scheduler.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())